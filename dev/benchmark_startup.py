@@ -0,0 +1,88 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(REPO_DIR,'bin','sssm.py')
+
+# modules that commands that do not touch data should never import
+HEAVY_MODULES = ['numpy','pandas','sssparser.ScenariosDataset','sssmatch.request']
+
+DEFAULT_COMMANDS = [['--help'],
+                    ['browse','datasets']]
+
+
+def run_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([REPO_DIR] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    return env
+
+
+def heavy_imports():
+    """
+    Returns the HEAVY_MODULES that are loaded by importing sssmatch.cli.
+    """
+    code = "import sys; import sssmatch.cli; print(','.join(m for m in {} if m in sys.modules))".format(repr(HEAVY_MODULES))
+    out = subprocess.check_output([sys.executable,'-c',code],env=run_env())
+    return [m for m in out.decode().strip().split(',') if m]
+
+
+def time_command(command,repeats):
+    """
+    Returns the median wall clock time, in seconds, of running sssm.py with
+    command in a fresh Python process.
+    """
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable,CLI_PATH] + command,env=run_env(),
+                              stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def benchmark(max_seconds,repeats):
+    """
+    Returns True if sssmatch.cli imports none of HEAVY_MODULES and every
+    command in DEFAULT_COMMANDS runs in at most max_seconds.
+    """
+    ok = True
+    heavy = heavy_imports()
+    if heavy:
+        logger.error("Importing sssmatch.cli loads {}".format(heavy))
+        ok = False
+    for command in DEFAULT_COMMANDS:
+        t = time_command(command,repeats)
+        msg = "sssm.py {}: {:.3f} s (limit {:.3f} s)".format(' '.join(command),t,max_seconds)
+        if t > max_seconds:
+            logger.error(msg)
+            ok = False
+        else:
+            logger.info(msg)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="""Startup-time regression
+        check for the sssm.py commands that do not need to load any data.
+        Exits with a non-zero status if they import pandas or any other
+        heavy dependency, or take longer than the allowed time.""")
+    parser.add_argument('-t','--max_seconds',type=float,default=0.5,
+        help="""Maximum allowed median run time per command, in seconds.""")
+    parser.add_argument('-r','--repeats',type=int,default=5,
+        help="""Number of times to run each command.""")
+    parser.add_argument("-d","--debug",action='store_true',default=False,
+        help="Option to output debug information.")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s|%(message)s',
+                        level=logging.DEBUG if args.debug else logging.INFO)
+
+    sys.exit(0 if benchmark(args.max_seconds,args.repeats) else 1)
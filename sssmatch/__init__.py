@@ -18,6 +18,7 @@
 
 from ._version import __version__
 
+from enum import Enum, auto
 import os
 import sys
 
@@ -28,3 +29,29 @@ datasets_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)),'sssmixes
 models_dir = os.path.join(os.path.dirname(__file__),'models')
 
 class SSSMatchError(Exception): pass
+
+
+class AML(Enum):
+    """
+    Supported Algebraic Modeling Languages. GAMS_API runs the GAMS model 
+    through the GAMS Python API, passing it the inputs in memory. SCIPY and 
+    NETWORK are not AMLs, but build and solve the matching model directly, 
+    with scipy.optimize.linprog and as a minimum cost flow problem, 
+    respectively.
+    """
+    GAMS = auto()
+    SCIPY = auto()
+    NETWORK = auto()
+    GAMS_API = auto()
+
+
+class OutputFormat(Enum):
+    """
+    Formats in which match results can be saved. CSV writes a tree of csv 
+    files, including R2PD inputs. PARQUET and HDF5 write all result tables 
+    and the result summary to one compressed file, see 
+    sssmatch.results.save_result_tables.
+    """
+    CSV = auto()
+    PARQUET = auto()
+    HDF5 = auto()
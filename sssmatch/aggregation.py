@@ -0,0 +1,236 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pds
+
+logger = logging.getLogger(__name__)
+
+
+class NodeAggregation(object):
+    """
+    Groups the nodes of a Request into clusters of nearby nodes with similar 
+    generator and resource profiles, so that the match can be solved on a 
+    reduced system and then disaggregated back to the individual nodes.
+
+    Each cluster's kept capacity is split among its nodes pro rata by 
+    current_capacity. Swaps are split pro rata by how much of the source type 
+    each node still has and of the target type it may still take, and added 
+    capacity (plus any swaps that did not fit) pro rata by remaining 
+    maximum_capacity, or current_indep_capacity for resource-independent 
+    types. Thus every node's limits are respected. Finally, capacity that 
+    would be added at a node where current capacity is removed is kept or 
+    swapped instead, and the current capacity left over is removed.
+    """
+    # relative weight of the generator and resource profile features, as 
+    # compared to latitude and longitude
+    PROFILE_WEIGHT = 1.0
+    KMEANS_SEED = 42
+
+    def __init__(self,request,ratio):
+        """
+        :param request: preprocessed Request to aggregate
+        :param ratio: number of clusters as a fraction of the number of nodes, 
+            in (0, 1]
+        """
+        if not (0.0 < ratio <= 1.0):
+            raise ValueError("The aggregation ratio must be in (0, 1], but is {}.".format(ratio))
+        self.request = request
+        self.ratio = ratio
+        self.labels = self.cluster_nodes()
+
+    @property
+    def num_clusters(self):
+        return self.labels.max() + 1 if len(self.labels) else 0
+
+    @property
+    def cluster_ids(self):
+        return np.array(['cluster_{}'.format(label) for label in range(self.num_clusters)],dtype=object)
+
+    def profiles(self):
+        """
+        Returns a DataFrame indexed like request.nodes of current capacity by 
+        generator type and of maximum capacity by resource type.
+        """
+        request = self.request
+        current = request.generators[request.generators['generator type'].isin(request.gentypes)]
+        current = current.groupby(['node_id','generator type'])['capacity (MW)'].sum().unstack(fill_value=0.0)
+        current = current.reindex(request.nodes['node_id']).fillna(0.0)
+        re_types = [g for g in request.gentypes if (g in request.nodes) and (g not in request.RESOURCE_INDEPENDENT)]
+        maximum = request.nodes[re_types].fillna(0.0)
+        maximum.columns = ['max {}'.format(g) for g in re_types]
+        return pds.concat([current.reset_index(drop=True),maximum.reset_index(drop=True)],axis=1)
+
+    def cluster_nodes(self):
+        """
+        Returns an np.array of cluster labels, 0 to num_clusters - 1, aligned 
+        with request.nodes. Clusters are found with k-means on standardized 
+        latitude, longitude, and log-scaled profiles().
+        """
+        nodes = self.request.nodes
+        k = max(1,int(round(self.ratio * len(nodes))))
+        if k >= len(nodes):
+            return np.arange(len(nodes))
+
+        def standardize(values):
+            std = values.std(axis=0)
+            return (values - values.mean(axis=0)) / np.where(std > 0.0,std,1.0)
+
+        location = standardize(nodes[['latitude','longitude']].values.astype(float))
+        profile = standardize(np.log1p(self.profiles().values))
+        if profile.shape[1]:
+            profile *= np.sqrt(self.PROFILE_WEIGHT * location.shape[1] / profile.shape[1])
+        features = np.hstack([location,profile])
+
+        from scipy.cluster.vq import kmeans2
+        _centroids, labels = kmeans2(features,k,minit='++',seed=self.KMEANS_SEED)
+        # renumber, dropping empty clusters
+        _unique, labels = np.unique(labels,return_inverse=True)
+        logger.info("Aggregated {} nodes into {} clusters.".format(len(nodes),labels.max() + 1))
+        return labels
+
+    def reduced_request(self):
+        """
+        Returns a preprocessed copy of request whose nodes are the clusters, 
+        with summed loads and resource limits and mean locations, and whose 
+        generators are the original generators moved to their clusters.
+        """
+        request = self.request
+        node_ids = self.cluster_ids
+        nodes = request.nodes.copy()
+        nodes['node_id'] = node_ids[self.labels]
+        columns = list(nodes.columns)
+        means = nodes.groupby('node_id',sort=False)[['latitude','longitude']].mean()
+        sums = nodes.groupby('node_id',sort=False)[columns[3:]].sum(min_count=1)
+        nodes = pds.concat([means,sums],axis=1).reset_index()[columns]
+
+        cluster_of = pds.Series(node_ids[self.labels],index=request.nodes['node_id'].values)
+        generators = request.generators.copy()
+        generators['node_id'] = generators['node_id'].map(cluster_of)
+        generators = generators.groupby(['node_id','generator type'],as_index=False,sort=False)['capacity (MW)'].sum()
+
+        result = copy.copy(request)
+        result.nodes = nodes
+        result.generators = generators
+        return result
+
+    def disaggregate(self,reduced,problem):
+        """
+        Returns the arguments of request.register_results for the matched 
+        reduced request, at the level of the original nodes.
+
+        :param reduced: reduced_request() after a successful fulfill
+        :param problem: ProblemArrays of the full request
+        """
+        p = problem
+        num_nodes, G = p.allowed.shape
+        cluster_index = pds.Index(self.cluster_ids)
+        gentype_index = pds.Index(p.gentypes)
+        labels = self.labels
+
+        def cluster_values(df,*gentype_columns):
+            result = np.zeros((self.num_clusters,) + (G,) * len(gentype_columns))
+            index = (cluster_index.get_indexer(df['node_id']),) + \
+                    tuple(gentype_index.get_indexer(df[column]) for column in gentype_columns)
+            np.add.at(result,index,df['capacity (MW)'].values)
+            return result
+
+        def cluster_totals(values):
+            return np.bincount(labels,weights=values,minlength=self.num_clusters)
+
+        placed = np.zeros((num_nodes,G))
+        current_left = p.current.copy()
+        def headroom(gg):
+            if p.indep[gg]:
+                return p.current_indep - placed[:,p.indep].sum(axis=1)
+            return p.maximum[:,gg] - placed[:,gg]
+
+        def allocate(targets,limits):
+            # splits each cluster's target among its nodes pro rata by limits
+            totals = cluster_totals(limits)
+            fraction = np.divide(targets,totals,out=np.zeros_like(targets),where=totals > 0.0)
+            return limits * np.minimum(fraction,1.0)[labels]
+
+        # kept capacity, pro rata by current capacity
+        current_clusters = np.zeros((self.num_clusters,G))
+        np.add.at(current_clusters,labels,p.current)
+        kept_clusters = cluster_values(reduced.capacity_kept,'generator type')
+        fraction = np.divide(kept_clusters,current_clusters,out=np.zeros_like(kept_clusters),where=current_clusters > 0.0)
+        kept = p.current * np.minimum(fraction,1.0)[labels]
+        placed += kept; current_left -= kept
+
+        # swaps, pro rata by how much each node can swap
+        swapped_clusters = cluster_values(reduced.capacity_swapped,'from generator type','to generator type')
+        swaps = []
+        _c, g, gg = np.nonzero(swapped_clusters)
+        for g, gg in sorted(set(zip(g,gg)),key=lambda pair: p.dist[pair]):
+            amount = allocate(swapped_clusters[:,g,gg],np.maximum(np.minimum(current_left[:,g],headroom(gg)),0.0))
+            n = np.nonzero(amount > 0.0)[0]
+            if len(n):
+                swaps.append((n,np.full(len(n),g),np.full(len(n),gg),amount[n]))
+                placed[n,gg] += amount[n]; current_left[n,g] -= amount[n]
+
+        # added capacity, including any swaps that did not fit, pro rata by 
+        # remaining headroom
+        final_clusters = cluster_values(reduced.capacity,'generator type')
+        placed_clusters = np.zeros((self.num_clusters,G))
+        np.add.at(placed_clusters,labels,placed)
+        added = np.zeros((num_nodes,G))
+        for gg in range(G):
+            targets = np.maximum(final_clusters[:,gg] - placed_clusters[:,gg],0.0)
+            if targets.any():
+                added[:,gg] = allocate(targets,np.maximum(headroom(gg),0.0))
+                placed[:,gg] += added[:,gg]
+
+        # capacity that is added where current capacity is removed is better 
+        # kept or swapped
+        local = np.minimum(current_left,added)
+        kept += local; current_left -= local; added -= local
+        g, gg = np.nonzero((p.dist < p.DOMINATED_DISTANCE) & ~np.eye(G,dtype=bool))
+        for i in np.argsort(p.dist[g,gg],kind='stable'):
+            amount = np.minimum(current_left[:,g[i]],added[:,gg[i]])
+            n = np.nonzero(amount > 0.0)[0]
+            if len(n):
+                swaps.append((n,np.full(len(n),g[i]),np.full(len(n),gg[i]),amount[n]))
+                current_left[n,g[i]] -= amount[n]; added[n,gg[i]] -= amount[n]
+
+        gentypes = np.asarray(p.gentypes,dtype=object)
+        def to_dataframe(values,column_names):
+            n, g = np.nonzero(values > 0.0)
+            return pds.DataFrame(dict(zip(column_names,[p.nodes[n],gentypes[g],values[n,g]])),columns=column_names)
+
+        columns = self.request.generators_columns()
+        swapped_columns = self.request.generators_swapped_columns()
+        if swaps:
+            n, g, gg, amount = [np.concatenate(values) for values in zip(*swaps)]
+            swapped = pds.DataFrame(dict(zip(swapped_columns,[p.nodes[n],gentypes[g],gentypes[gg],amount])),columns=swapped_columns)
+            swapped = swapped.groupby(swapped_columns[:-1],as_index=False,sort=False).sum()
+            swap_distance = (amount * p.dist[g,gg]).sum()
+        else:
+            swapped = pds.DataFrame(columns=swapped_columns)
+            swap_distance = 0.0
+        distance = added.sum() + current_left.sum() + swap_distance
+        return [to_dataframe(placed,columns),
+                to_dataframe(added,columns),
+                to_dataframe(kept,columns),
+                swapped,
+                to_dataframe(current_left,columns),
+                distance]
@@ -0,0 +1,191 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pandas as pds
+
+from sssmatch import AML, OutputFormat
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_COLUMNS = ['scenario_year','scenario','geography','outdir']
+GEOGRAPHY_SEPARATOR = ';'
+
+# One match of a batch. geography is a list.
+MatchJob = namedtuple('MatchJob',MANIFEST_COLUMNS)
+
+# Request only uses its dataset for the list of generator types, so workers 
+# get this instead of the whole ScenariosDataset
+DatasetGentypes = namedtuple('DatasetGentypes',['gentypes'])
+
+
+def read_manifest(filename,default_scenario,default_geography):
+    """
+    Reads a csv file of matches to run, see MANIFEST_COLUMNS. Only 
+    scenario_year is required. Blank scenarios and geographies take the 
+    given defaults, and blank outdirs are made from the other columns.
+
+    :return: list of MatchJob
+    """
+    df = pds.read_csv(filename,dtype=str)
+    df.columns = [col.strip() for col in df.columns]
+    if 'scenario_year' not in df.columns:
+        raise ValueError("The manifest {} has no scenario_year column.".format(filename))
+    for col in MANIFEST_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    result = []
+    for _i, row in df.iterrows():
+        scenario = row['scenario'] if isinstance(row['scenario'],str) else default_scenario
+        geography = [geo.strip() for geo in row['geography'].split(GEOGRAPHY_SEPARATOR)] \
+            if isinstance(row['geography'],str) else default_geography
+        if isinstance(geography,str):
+            geography = [geography]
+        outdir = row['outdir'] if isinstance(row['outdir'],str) else \
+            '_'.join([row['scenario_year'],scenario] + geography).replace(' ','_')
+        result.append(MatchJob(row['scenario_year'],scenario,geography,outdir))
+    return result
+
+
+# transmission system and match options shared by all jobs in a worker 
+# process, set once by _init_worker
+_shared = {}
+
+def _init_worker(nodes,generators,gentypes,exclusions,fulfill_kwargs,output_format):
+    _shared['nodes'] = nodes
+    _shared['generators'] = generators
+    _shared['dataset'] = DatasetGentypes(gentypes)
+    _shared['exclusions'] = exclusions
+    _shared['fulfill_kwargs'] = fulfill_kwargs
+    _shared['output_format'] = output_format
+
+
+def _run_job(job,genmix,outdir):
+    """
+    Runs one match in a worker process. Returns the Request's distance and, 
+    unless the output format is CSV, its result_tables, or raises.
+    """
+    from sssmatch.request import Request
+    from sssmatch.results import result_tables
+
+    request = Request(_shared['nodes'],
+                      _shared['generators'],
+                      _shared['dataset'],
+                      genmix,
+                      exclusions=_shared['exclusions'])
+    request.preprocess()
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    if _shared['output_format'] == OutputFormat.CSV:
+        request.fulfill(outdir,**_shared['fulfill_kwargs'])
+        request.result_summary.to_csv(os.path.join(outdir,'result_summary.csv'))
+        return request.distance, None
+    # the results of all jobs are saved to one store by the main process
+    request.fulfill(outdir,output_format=None,**_shared['fulfill_kwargs'])
+    return request.distance, result_tables(request)
+
+
+def match_batch(nodes,generators,dataset,jobs,outdir,exclusions=None,
+                gendists=None,precision=0,aml=AML.GAMS,aggregation_ratio=None,
+                report_gap=False,timeout=None,solve_cache=None,workers=None,
+                output_format=OutputFormat.CSV):
+    """
+    Runs many matches of one transmission system. The generation mixes are 
+    pulled from dataset in this process, and the matches themselves are 
+    fanned out to a pool of worker processes that each receive nodes and 
+    generators once.
+
+    :param nodes: pandas.DataFrame in Request.nodes_columns format
+    :param generators: pandas.DataFrame in Request.generators_columns format
+    :param dataset: sssparser.ScenariosDataset
+    :param jobs: list of MatchJob
+    :param outdir: directory in which each job's outdir is created
+    :param workers: number of worker processes. Defaults to the number of 
+        CPUs. If 1, jobs are run in this process.
+    :param output_format: OutputFormat. For CSV, each job's results are 
+        saved in its outdir. Otherwise the results of all jobs are saved to 
+        one results.parquet or results.h5 store in outdir, keyed by 
+        scenario, scenario_year and geography.
+    :return: pandas.DataFrame with one row per job, listing its status and 
+        distance. Also saved as batch_summary.csv in outdir.
+    """
+    fulfill_kwargs = dict(gendists=gendists,precision=precision,aml=aml,
+                          aggregation_ratio=aggregation_ratio,report_gap=report_gap,
+                          timeout=timeout,solve_cache=solve_cache)
+    init_args = (nodes,generators,dataset.gentypes,exclusions,fulfill_kwargs,output_format)
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    store = None
+    if output_format != OutputFormat.CSV:
+        from sssmatch.results import RESULT_FILE_EXTENSIONS, save_result_tables
+        store = os.path.join(outdir,'results' + RESULT_FILE_EXTENSIONS[output_format])
+
+    workers = workers or os.cpu_count() or 1
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers,initializer=_init_worker,initargs=init_args)
+    else:
+        _init_worker(*init_args)
+
+    results = []
+    try:
+        outcomes = []
+        for job in jobs:
+            job_outdir = os.path.join(outdir,job.outdir)
+            try:
+                genmix = dataset.get_genmix(job.scenario_year,job.scenario,job.geography)
+                if executor is None:
+                    outcomes.append(_run_job(job,genmix,job_outdir))
+                else:
+                    outcomes.append(executor.submit(_run_job,job,genmix,job_outdir))
+            except Exception as e:
+                outcomes.append(e)
+
+        for job, outcome in zip(jobs,outcomes):
+            distance = None; error = None
+            if isinstance(outcome,Exception):
+                error = outcome
+            else:
+                try:
+                    distance, tables = outcome.result() if isinstance(outcome,Future) else outcome
+                    if tables is not None:
+                        save_result_tables(tables,store,output_format,key=[
+                            ('scenario',job.scenario),
+                            ('scenario_year',job.scenario_year),
+                            ('geography',GEOGRAPHY_SEPARATOR.join(job.geography))])
+                except Exception as e:
+                    error = e
+            if error is None:
+                logger.info("Matched {} with distance {}.".format(job.outdir,distance))
+            else:
+                logger.error("Match {} failed: {!r}".format(job.outdir,error))
+            results.append([job.scenario_year,job.scenario,GEOGRAPHY_SEPARATOR.join(job.geography),
+                            job.outdir,'failed' if error else 'ok',distance,
+                            repr(error) if error else None])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    result = pds.DataFrame(results,columns=MANIFEST_COLUMNS + ['status','distance','error'])
+    result.to_csv(os.path.join(outdir,'batch_summary.csv'),index=False)
+    return result
@@ -17,14 +17,15 @@
 # [/LICENSE]
 
 import argparse
+import csv
 import logging
 import os
 
-import pandas as pds
-
-from sssmatch import datasets_dir, SSSMatchError
-from sssparser.ScenariosDataset import ScenariosDataset
-from .request import Request, AML
+# pandas, ScenariosDataset and Request are only imported in the code paths 
+# that need them, so that --help and browse datasets start quickly
+from sssmatch import datasets_dir, SSSMatchError, AML, OutputFormat
+from sssparser.DatasetCache import CACHE_DIR_ENV_VAR
+from sssparser.Regions import REGION_TYPES
 
 logger = logging.getLogger(__name__)
 
@@ -51,9 +52,80 @@ def cli_parser():
             scenario.""")
         parser.add_argument('-g','--geography',help="""Geography from which to 
             pull generation mix data. If multiple geographies are listed, the 
-            union will be taken.""",nargs='+',default=DEFAULT_GEOGRAPHY)
+            union will be taken. Named regions (interconnections, NERC regions, 
+            and ISO/RTOs; see browse regions) may be listed in place of their 
+            states.""",nargs='+',default=DEFAULT_GEOGRAPHY)
         add_dataset_argument(parser)
 
+    def add_match_arguments(parser):
+        # existing system
+        parser.add_argument('nodes',help='''Path to csv file describing nodes, 
+            or list of tuples describing nodes. Each tuple or each row of the csv file
+            should contain (node_id, latitude, longitude, peak load (MW), 
+            annual load (GWh), max allowed capacity of each RE type (MW))''')
+        parser.add_argument('-rt','--re_types',help='''RE types in order they 
+            appear in the nodes tuples/csv. RE types must be a subset of the selected 
+            dataset's generator types. This only needs to be specified if specifying 
+            tuples or csv column names do not match generator types.''',nargs='*')
+        parser.add_argument('generators',help='''Path to csv file describing 
+            existing generators, or list of tuples describing generators. Each tuple 
+            or each row of the csv file should contain (node_id, generator type, 
+            capacity (MW)). Generator type must match the dataset's generator 
+            types.''')
+        parser.add_argument('-eg','--excluded_gentypes',nargs='*',help='''List 
+            of generator types that should not be included in the match results. RE 
+            types with no existing unit and no allowed capacity will also be 
+            excluded.''') 
+
+        # outputs
+        parser.add_argument('-o','--outdir',default='.',help='''Where to write
+            out match information.''')
+        parser.add_argument('-of','--output_format',choices=[val.name for val in OutputFormat],
+            help='''Format in which to save the results. CSV writes a tree of 
+            csv files, including R2PD inputs. PARQUET and HDF5 write all 
+            results and the result summary to one compressed file per match, 
+            or for match-batch and match-pathway to one store for all of 
+            them.''',default=OutputFormat.CSV.name)
+        parser.add_argument('-gd','--gendists',help='''Path to csv file 
+            containing rows with (gentype_to, gentype_from, distance). Distances are 
+            generally between 0 and 1. A distance of 0 means switching capacity from 
+            gentype_to to gentype_from is equivalent to keeping the original 
+            generator. A distance of 1 means that such a switch is no better than 
+            removing old capacity and placing new capacity with no regard to where 
+            the previous generators were. Default is to use default_gendists.csv.''')
+        parser.add_argument('-p','--precision',type=int,help='''The precision 
+            to which the desired capacity is to be matched, in MW. Thus 0 
+            corresponds to rounding to the nearest MW, 1 corresponds to the nearest
+            100 kW, and 3 is the nearest kW.''',default=0)
+        parser.add_argument('-a','--aml',choices=[val.name for val in AML],
+            help='''Algebraic modeling language to use to solve the matching problem. 
+            GAMS_API runs the GAMS model through the GAMS Python API, passing 
+            it the inputs in memory rather than through in.gdx. SCIPY solves 
+            the model in-process with scipy.optimize.linprog, and so does not 
+            require GAMS. NETWORK solves it as a minimum cost flow 
+            problem. That is exact only if swaps between resource-independent 
+            generator types are free, which is not the case for the shipped 
+            gendists files; otherwise, if the network solution exceeds a 
+            node's resource-independent capacity, the model is re-solved as 
+            with SCIPY.''',
+            default=AML.GAMS.name)
+        parser.add_argument('-ar','--aggregation_ratio',type=float,help='''If 
+            specified, nodes are clustered by location and by generator and resource 
+            profile down to this fraction of their original number (e.g. 0.1), the 
+            match is solved on the clustered system, and the results are split back 
+            out to the original nodes. Useful for very large systems.''')
+        parser.add_argument('--report_gap',action='store_true',default=False,
+            help='''With --aggregation_ratio, also solve the full system and report 
+            the objective gap of the aggregated solution.''')
+        parser.add_argument('-t','--timeout',type=float,help='''Maximum number 
+            of seconds to let the optimization run. Default is no limit.''')
+        parser.add_argument('--no_solve_cache',action='store_true',default=False,
+            help='''Always solve the match model, without using or updating the 
+            cache of match results (kept in solves under the cache directory).''')
+        parser.add_argument('--solve_cache_size',type=float,default=1024.0,
+            help='''Maximum size of the cache of match results, in MB. The least 
+            recently used results are evicted first.''')
+
     # Define CLI modes
     subparsers = parser.add_subparsers(dest='cmd')
     browse_parser = subparsers.add_parser('browse',help='''Browse NREL Standard 
@@ -61,6 +133,14 @@ def cli_parser():
     match_parser = subparsers.add_parser('match',help='''Create and place 
         generation mix for your transmission system based on NREL Standard 
         Scenarios data.''')
+    match_batch_parser = subparsers.add_parser('match-batch',help='''Run many 
+        matches of the same transmission system, as listed in a manifest, in 
+        parallel.''')
+    match_pathway_parser = subparsers.add_parser('match-pathway',help='''Match 
+        the same transmission system to a sequence of scenario years. With 
+        --persist_added, each year must keep what earlier years built.''')
+    dataset_parser = subparsers.add_parser('dataset',help='''Manage the 
+        NREL Standard Scenarios datasets.''')
 
     # Define CLI arguments per mode
     # Browse mode - items that can be listed
@@ -84,6 +164,10 @@ def cli_parser():
     list_geographies_parser = browse_subparsers.add_parser('geographies',
         help='''List available geographies in chosen dataset.''')
     add_dataset_argument(list_geographies_parser)
+    # regions
+    list_regions_parser = browse_subparsers.add_parser('regions',
+        help='''List named regions that can be used in place of a list of 
+        states.''')
     # generator mixes
     list_generator_mixes_parser = browse_subparsers.add_parser('mixes',
         help='''List a particular generator mix represented in the chosen dataset.''')
@@ -92,48 +176,56 @@ def cli_parser():
     browse_parser.add_argument('-f','--filename',help='''Where to save listed 
         information in csv format. Default is to print to screen only.''')
 
+    # Dataset mode - actions
+    dataset_subparsers = dataset_parser.add_subparsers(dest='action')
+    # compile
+    compile_dataset_parser = dataset_subparsers.add_parser('compile',
+        help='''Parse the selected dataset once and save it in a compact binary 
+        format that is loaded in place of the csv files until they change.''')
+    add_dataset_argument(compile_dataset_parser)
+    compile_dataset_parser.add_argument('--all',action='store_true',default=False,
+        help='''Compile all available datasets.''')
+
     # Match mode - standard scenarios
     add_genmix_arguments(match_parser)
 
-    # Match mode - existing system
-    match_parser.add_argument('nodes',help='''Path to csv file describing nodes, 
-        or list of tuples describing nodes. Each tuple or each row of the csv file
-        should contain (node_id, latitude, longitude, peak load (MW), 
-        annual load (GWh), max allowed capacity of each RE type (MW))''')
-    match_parser.add_argument('-rt','--re_types',help='''RE types in order they 
-        appear in the nodes tuples/csv. RE types must be a subset of the selected 
-        dataset's generator types. This only needs to be specified if specifying 
-        tuples or csv column names do not match generator types.''',nargs='*')
-    match_parser.add_argument('generators',help='''Path to csv file describing 
-        existing generators, or list of tuples describing generators. Each tuple 
-        or each row of the csv file should contain (node_id, generator type, 
-        capacity (MW)). Generator type must match the dataset's generator 
-        types.''')
-    match_parser.add_argument('-eg','--excluded_gentypes',nargs='*',help='''List 
-        of generator types that should not be included in the match results. RE 
-        types with no existing unit and no allowed capacity will also be 
-        excluded.''') 
-
-    # Match mode - outputs
-    match_parser.add_argument('-o','--outdir',default='.',help='''Where to write
-        out match information.''')
-    match_parser.add_argument('-gd','--gendists',help='''Path to csv file 
-        containing rows with (gentype_to, gentype_from, distance). Distances are 
-        generally between 0 and 1. A distance of 0 means switching capacity from 
-        gentype_to to gentype_from is equivalent to keeping the original 
-        generator. A distance of 1 means that such a switch is no better than 
-        removing old capacity and placing new capacity with no regard to where 
-        the previous generators were. Default is to use default_gendists.csv.''')
-    match_parser.add_argument('-p','--precision',type=int,help='''The precision 
-        to which the desired capacity is to be matched, in MW. Thus 0 
-        corresponds to rounding to the nearest MW, 1 corresponds to the nearest
-        100 kW, and 3 is the nearest kW.''',default=0)
-    match_parser.add_argument('-a','--aml',type=AML,choices=[val.name for val in AML],
-        help='''Algebraic modeling language to use to solve the matching problem.''',
-        default=AML.GAMS)
+    add_match_arguments(match_parser)
+
+    # Match batch mode
+    add_dataset_argument(match_batch_parser)
+    match_batch_parser.add_argument('manifest',help='''Path to csv file listing 
+        the matches to run, one per row, in columns scenario_year (required), 
+        scenario, geography (multiple geographies separated by semicolons), and 
+        outdir (relative to --outdir). Blank values take the match defaults, and 
+        the default outdir is made from the scenario year, scenario and 
+        geography.''')
+    add_match_arguments(match_batch_parser)
+    match_batch_parser.add_argument('-w','--workers',type=int,help='''Number 
+        of worker processes. Defaults to the number of CPUs. With 1 worker all 
+        matches are run in this process.''')
+
+    # Match pathway mode
+    match_pathway_parser.add_argument('-y','--years',nargs='+',help='''Scenario 
+        years to match, in order. Defaults to all of the dataset's years.''')
+    match_pathway_parser.add_argument('-s','--scenario',help='''Scenario on 
+        which to base the generation mixes. Defaults to the central or mid-case 
+        scenario.''')
+    match_pathway_parser.add_argument('-g','--geography',help='''Geography 
+        from which to pull generation mix data. If multiple geographies are 
+        listed, the union will be taken.''',nargs='+',default=DEFAULT_GEOGRAPHY)
+    add_dataset_argument(match_pathway_parser)
+    add_match_arguments(match_pathway_parser)
+    match_pathway_parser.add_argument('--persist_added',action='store_true',
+        default=False,help='''Require capacity added or swapped in during a 
+        year to remain in the final mix of all later years.''')
 
     parser.add_argument('-d','--debug',action='store_true',default=False,
         help="Option to output debug information.")
+    parser.add_argument('--cache_dir',help='''Directory in which to cache 
+        parsed dataset files between calls. Defaults to ${} if set, or else 
+        to sssmatch in the user cache directory.'''.format(CACHE_DIR_ENV_VAR))
+    parser.add_argument('--no_cache',action='store_true',default=False,
+        help='''Read dataset files without using or updating the cache.''')
 
     return parser
 
@@ -155,12 +247,23 @@ def cli_main():
     fmt = '%(asctime)s|%(levelname)s|%(name)s|\n    %(message)s'
     logging.basicConfig(format=fmt,level=log_level) # to console
 
-    def display_browse_info(result,filename):
-        if filename is None:
-            if isinstance(result,pds.Series):
-                for i, value in result.iteritems():
+    def display_browse_info(result,filename,name=None):
+        """
+        result is either a list of values, to be labeled name in csv output, 
+        or a pandas.DataFrame.
+        """
+        if isinstance(result,list):
+            if filename is None:
+                for value in result:
                     print("  " + str(value))
                 return
+            with open(filename,'w',newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow([name])
+                for value in result:
+                    writer.writerow([value])
+            return
+        if filename is None:
             print(result)
             return
         result.to_csv(filename,index=False,header=True)
@@ -169,37 +272,59 @@ def cli_main():
     # List all available or determine which generation mix dataset is to be 
     # viewed or used
     if args.cmd == 'browse' and args.what == 'datasets':
-        display_browse_info(pds.Series(datasets(),name="Datasets"),args.filename)
+        display_browse_info(datasets(),args.filename,name="Datasets")
+        return
+
+    if args.cmd == 'browse' and args.what == 'regions':
+        import pandas as pds
+        display_browse_info(pds.DataFrame([[region_type, region, ','.join(states)] 
+                                           for region_type, regions in REGION_TYPES.items()
+                                           for region, states in regions.items()],
+                                          columns=['Region Type','Region','States']),
+                            args.filename)
         return
 
     dataset_dir = os.path.join(datasets_dir,args.dataset)
     if not os.path.exists(dataset_dir):
         raise SSSMatchError('No dataset exists in {}. Call sssmatch browse datasets to see available datasets.'.format(dataset_dir))
 
+    if args.cmd == 'dataset':
+        assert args.action == 'compile'
+        from sssparser.CompiledDataset import compile_dataset
+        dataset_names = datasets() if args.all else [args.dataset]
+        for dataset_name in dataset_names:
+            compile_dataset(os.path.join(datasets_dir,dataset_name))
+        return
+
+    import pandas as pds
+    from sssparser.ScenariosDataset import ScenariosDataset
+
     # Load the chosen generation mix dataset
-    dataset = ScenariosDataset(dataset_dir)
+    dataset = ScenariosDataset(dataset_dir,
+                               use_cache=not args.no_cache,
+                               cache_dir=args.cache_dir)
 
     if args.cmd == 'browse':
         # Display dataset information as requested
-        result = None
+        result = None; name = None
         if args.what == 'gentypes':
-            result = pds.Series(dataset.gentypes,name='Generator Type') 
+            result = dataset.gentypes; name = 'Generator Type'
         elif args.what == 'years': 
-            result = pds.Series(dataset.years,name='Years')
+            result = dataset.years; name = 'Years'
         elif args.what == 'scenarios': 
-            result = pds.Series(dataset.scenarios,name="Scenarios")
+            result = dataset.scenarios; name = "Scenarios"
         elif args.what == 'geographies': 
-            result = pds.Series(dataset.geographies,name="Geographies")
+            result = dataset.geographies; name = "Geographies"
         else:
             assert args.what == 'mixes'
             if args.scenario is None:
                 args.scenario = DEFAULT_SCENARIOS[args.dataset]
             result = dataset.get_genmix(args.scenario_year,args.scenario,args.geography)
 
-        display_browse_info(result,args.filename)
+        display_browse_info(result,args.filename,name=name)
         return
 
-    assert args.cmd == 'match'
+    from .request import Request
 
     def load_dataframe(arg):
         if isinstance(arg,str):
@@ -215,7 +340,58 @@ def cli_main():
     #     - existing generators: node, type, and capacity
     generators = load_dataframe(args.generators)
     generators.columns = Request.generators_columns()
-    
+
+    solve_cache = None
+    if not args.no_solve_cache:
+        from .solvecache import SolveCache
+        solve_cache = SolveCache(cache_dir=args.cache_dir,
+                                 max_bytes=int(args.solve_cache_size * 1024 * 1024))
+
+    if args.cmd == 'match-batch':
+        from .batch import match_batch, read_manifest
+        jobs = read_manifest(args.manifest,DEFAULT_SCENARIOS[args.dataset],DEFAULT_GEOGRAPHY)
+        result = match_batch(nodes,
+                             generators,
+                             dataset,
+                             jobs,
+                             args.outdir,
+                             exclusions=args.excluded_gentypes,
+                             gendists=args.gendists,
+                             precision=args.precision,
+                             aml=AML[args.aml],
+                             aggregation_ratio=args.aggregation_ratio,
+                             report_gap=args.report_gap,
+                             timeout=args.timeout,
+                             solve_cache=solve_cache,
+                             workers=args.workers,
+                             output_format=OutputFormat[args.output_format])
+        print(result)
+        return
+
+    if args.cmd == 'match-pathway':
+        from .pathway import match_pathway
+        if args.aggregation_ratio is not None:
+            raise SSSMatchError('--aggregation_ratio is not supported by match-pathway.')
+        result = match_pathway(nodes,
+                               generators,
+                               dataset,
+                               args.years if args.years else dataset.years,
+                               args.scenario if args.scenario else DEFAULT_SCENARIOS[args.dataset],
+                               args.geography,
+                               args.outdir,
+                               exclusions=args.excluded_gentypes,
+                               persist_added=args.persist_added,
+                               gendists=args.gendists,
+                               precision=args.precision,
+                               aml=AML[args.aml],
+                               timeout=args.timeout,
+                               solve_cache=solve_cache,
+                               output_format=OutputFormat[args.output_format])
+        print(result)
+        return
+
+    assert args.cmd == 'match'
+
     # Create the request
     if args.scenario is None:
         args.scenario = DEFAULT_SCENARIOS[args.dataset]
@@ -233,7 +409,12 @@ def cli_main():
     request.fulfill(args.outdir,
                     gendists=args.gendists,
                     precision=args.precision,
-                    aml=args.aml)
+                    aml=AML[args.aml],
+                    aggregation_ratio=args.aggregation_ratio,
+                    report_gap=args.report_gap,
+                    timeout=args.timeout,
+                    solve_cache=solve_cache,
+                    output_format=OutputFormat[args.output_format])
 
     # Write out the match, including input arguments for R2PD
     request.print_report()
@@ -0,0 +1,237 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pds
+
+from sssmatch import SSSMatchError
+
+logger = logging.getLogger(__name__)
+
+
+# keys is a tuple of integer arrays, one per dimension, of codes into a UEL 
+# table, and values is an array of parameter values, or None for a set
+GdxSymbolData = namedtuple('GdxSymbolData',['name','dims','keys','values'])
+
+
+def _gdxcc():
+    try:
+        import gdxcc
+    except ImportError:
+        from gams.core import gdx as gdxcc
+    return gdxcc
+
+
+class GdxReader(object):
+    """
+    Reads variable levels from a gdx file without building a DataFrame per 
+    record. Uses gams.transfer, which reads each symbol's records in bulk, 
+    if it is available, and otherwise reads record by record through the 
+    low-level gdxcc API. Keys are returned as integer UEL codes into uels.
+    """
+
+    def __init__(self,filename,gams_dir=None):
+        self.filename = filename
+        self.gams_dir = gams_dir
+        self.container = None
+        self.H = None
+
+    def __enter__(self):
+        try:
+            import gams.transfer as gt
+        except ImportError:
+            return self.__open_raw()
+        kwargs = {} if self.gams_dir is None else {'system_directory': self.gams_dir}
+        self.container = gt.Container(self.filename,**kwargs)
+        # UEL codes start at 1, as in the gdxcc API
+        self.uels = np.array([None] + list(self.container.getUELs()),dtype=object)
+        self.uel_index = pds.Index(self.uels[1:])
+        return self
+
+    def __open_raw(self):
+        from gdxpds.tools import GamsDirFinder
+
+        self.gams_dir = GamsDirFinder(self.gams_dir).gams_dir
+        self.gdxcc = gdxcc = _gdxcc()
+        self.H = gdxcc.new_gdxHandle_tp()
+        rc, msg = gdxcc.gdxCreateD(self.H,self.gams_dir,gdxcc.GMS_SSSIZE)
+        if not rc:
+            raise SSSMatchError("Unable to load the gdx library from {}: {}".format(self.gams_dir,msg))
+        rc, errnr = gdxcc.gdxOpenRead(self.H,self.filename)
+        if not rc:
+            raise SSSMatchError("Unable to open {}: error {}".format(self.filename,errnr))
+        _rc, _num_symbols, num_uels = gdxcc.gdxSystemInfo(self.H)
+        self.uels = np.empty(num_uels + 1,dtype=object)
+        for i in range(1,num_uels + 1):
+            self.uels[i] = gdxcc.gdxUMUelGet(self.H,i)[1]
+        return self
+
+    def __exit__(self,*args):
+        self.container = None
+        if self.H is not None:
+            self.gdxcc.gdxClose(self.H)
+            self.gdxcc.gdxFree(self.H)
+            self.H = None
+
+    def __records(self,name):
+        """
+        Returns the records DataFrame of symbol name read by gams.transfer, 
+        or None if it has no records.
+        """
+        try:
+            symbol = self.container[name]
+        except KeyError:
+            raise SSSMatchError("{} is not in {}".format(name,self.filename))
+        records = symbol.records
+        return None if (records is None) or records.empty else records
+
+    def read_levels(self,name,dims):
+        """
+        Returns (keys, levels) for the records of variable name whose level 
+        is positive. keys is a (number of records, dims) int32 array of UEL 
+        codes, and levels a float array.
+        """
+        if self.container is not None:
+            records = self.__records(name)
+            if records is None:
+                return np.empty((0,dims),dtype=np.int32), np.empty(0)
+            levels = records['level'].values.astype(float)
+            keep = levels > 0.0
+            keys = np.empty((keep.sum(),dims),dtype=np.int32)
+            # domain columns come first, as categoricals of UELs
+            for d, column in enumerate(records.columns[:dims]):
+                values = records[column].astype('category')
+                codes = self.uel_index.get_indexer(values.cat.categories) + 1
+                keys[:,d] = codes[values.cat.codes.values[keep]]
+            return keys, levels[keep]
+
+        gdxcc = self.gdxcc
+        rc, symbol_number = gdxcc.gdxFindSymbol(self.H,name)
+        if not rc:
+            raise SSSMatchError("{} is not in {}".format(name,self.filename))
+        _rc, num_records = gdxcc.gdxDataReadRawStart(self.H,symbol_number)
+        keys = np.empty((num_records,dims),dtype=np.int32)
+        levels = np.empty(num_records)
+        k = 0
+        for _i in range(num_records):
+            rc, record_keys, values, _dimfirst = gdxcc.gdxDataReadRaw(self.H)
+            if not rc:
+                break
+            level = values[gdxcc.GMS_VAL_LEVEL]
+            if level > 0.0:
+                keys[k] = record_keys[:dims]
+                levels[k] = level
+                k += 1
+        gdxcc.gdxDataReadDone(self.H)
+        return keys[:k], levels[:k]
+
+    def read_scalar_level(self,name):
+        if self.container is not None:
+            records = self.__records(name)
+            return 0.0 if records is None else float(records['level'].iloc[0])
+
+        gdxcc = self.gdxcc
+        rc, symbol_number = gdxcc.gdxFindSymbol(self.H,name)
+        if not rc:
+            raise SSSMatchError("{} is not in {}".format(name,self.filename))
+        _rc, num_records = gdxcc.gdxDataReadRawStart(self.H,symbol_number)
+        level = 0.0
+        if num_records:
+            _rc, _keys, values, _dimfirst = gdxcc.gdxDataReadRaw(self.H)
+            level = values[gdxcc.GMS_VAL_LEVEL]
+        gdxcc.gdxDataReadDone(self.H)
+        return level
+
+
+def to_container(uels,symbols):
+    """
+    Returns a gams.transfer.Container holding symbols, a list of 
+    GdxSymbolData whose keys index into uels. Key columns are passed as 
+    categoricals built directly from the codes.
+    """
+    import gams.transfer as gt
+
+    categories = pds.Index(uels)
+    container = gt.Container()
+    for symbol in symbols:
+        records = pds.DataFrame({dim: pds.Categorical.from_codes(keys,categories=categories)
+                                 for dim, keys in zip(symbol.dims,symbol.keys)},
+                                columns=symbol.dims)
+        domain = ['*'] * len(symbol.dims)
+        if symbol.values is None:
+            gt.Set(container,symbol.name,domain,records=records)
+        else:
+            records['value'] = symbol.values
+            gt.Parameter(container,symbol.name,domain,records=records)
+    return container
+
+
+def write_gdx(filename,uels,symbols,gams_dir=None):
+    """
+    Writes symbols, a list of GdxSymbolData whose keys index into uels, to 
+    the gdx file filename. Uses gams.transfer if it is available, and 
+    otherwise registers uels and writes the records by UEL number through 
+    the low-level gdxcc API.
+    """
+    try:
+        import gams.transfer
+    except ImportError:
+        pass
+    else:
+        to_container(uels,symbols).write(filename)
+        return
+
+    from gdxpds.tools import GamsDirFinder
+
+    gdxcc = _gdxcc()
+    gams_dir = GamsDirFinder(gams_dir).gams_dir
+    H = gdxcc.new_gdxHandle_tp()
+    rc, msg = gdxcc.gdxCreateD(H,gams_dir,gdxcc.GMS_SSSIZE)
+    if not rc:
+        raise SSSMatchError("Unable to load the gdx library from {}: {}".format(gams_dir,msg))
+    try:
+        rc, errnr = gdxcc.gdxOpenWrite(H,filename,'sssmatch')
+        if not rc:
+            raise SSSMatchError("Unable to open {}: error {}".format(filename,errnr))
+        gdxcc.gdxUELRegisterRawStart(H)
+        for uel in uels:
+            gdxcc.gdxUELRegisterRaw(H,str(uel))
+        gdxcc.gdxUELRegisterDone(H)
+
+        key_buffer = gdxcc.intArray(gdxcc.GMS_MAX_INDEX_DIM)
+        value_buffer = gdxcc.doubleArray(gdxcc.GMS_VAL_MAX)
+        for symbol in symbols:
+            data_type = gdxcc.GMS_DT_SET if symbol.values is None else gdxcc.GMS_DT_PAR
+            gdxcc.gdxDataWriteRawStart(H,symbol.name,'',len(symbol.dims),data_type,0)
+            # UEL numbers start at 1, and raw records must be written in 
+            # increasing order
+            keys = np.column_stack(symbol.keys).astype(np.int64) + 1
+            order = np.lexsort(keys.T[::-1])
+            values = np.zeros(len(keys)) if symbol.values is None else np.asarray(symbol.values,dtype=float)
+            for i in order:
+                for d in range(len(symbol.dims)):
+                    key_buffer[d] = int(keys[i,d])
+                value_buffer[gdxcc.GMS_VAL_LEVEL] = float(values[i])
+                gdxcc.gdxDataWriteRaw(H,key_buffer,value_buffer)
+            gdxcc.gdxDataWriteDone(H)
+    finally:
+        gdxcc.gdxClose(H)
+        gdxcc.gdxFree(H)
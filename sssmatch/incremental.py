@@ -0,0 +1,196 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pds
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDiff(object):
+    """
+    Differences between the inputs of a Request and those of a previously 
+    fulfilled Request of the same transmission system, used to re-match 
+    only what changed.
+
+    A node is affected if its row of nodes or any of its generators changed, 
+    or if it is new. The results of the previous match at all other nodes are 
+    fixed, and the desired capacity they do not account for is matched on a 
+    subrequest of just the affected nodes. This is not guaranteed to be as 
+    good as solving the whole request again, but it leaves the unaffected 
+    part of the system exactly as it was.
+    """
+    # compare capacities to this many MW
+    TOLERANCE = 1.0e-6
+    # digits beyond the requested precision to which the subrequest is 
+    # matched, so that the fixed and re-matched capacities add up to the 
+    # desired capacity
+    EXTRA_DIGITS = 3
+
+    def __init__(self,previous,request,precision=0):
+        """
+        :param previous: Request after a successful fulfill
+        :param request: preprocessed Request
+        :param precision: precision at which both are matched, see 
+            Request.fulfill
+        """
+        self.previous = previous
+        self.request = request
+        self.precision = precision
+        self.reason = None
+
+        node_ids = request.nodes['node_id']
+        if (list(previous.nodes.columns) != list(request.nodes.columns)) or \
+           (not node_ids.is_unique) or (not previous.nodes['node_id'].is_unique):
+            self.reason = "the nodes columns changed"
+            self.affected_nodes = pds.Index(node_ids)
+        else:
+            self.affected_nodes = self.changed_nodes()
+
+        self.affected_gentypes = self.changed_gentypes()
+        if self.reason is None:
+            self.reason = self.full_solve_reason()
+
+    def changed_nodes(self):
+        prev = self.previous.nodes.set_index('node_id')
+        new = self.request.nodes.set_index('node_id')
+        common = new.index.intersection(prev.index)
+        a = prev.loc[common]; b = new.loc[common]
+        same = ((a == b) | (a.isnull() & b.isnull())).all(axis=1)
+        result = new.index.difference(common).union(common[~same.values])
+
+        diff = self.generator_changes()
+        changed = diff[diff.abs() > self.TOLERANCE].index.get_level_values('node_id')
+        return result.union(changed.intersection(new.index).unique())
+
+    def generator_changes(self):
+        """
+        Returns the change in capacity by node and generator type, as a 
+        pandas.Series indexed by (node_id, generator type).
+        """
+        def totals(request):
+            return request.generators.groupby(['node_id','generator type'])['capacity (MW)'].sum()
+        prev = totals(self.previous); new = totals(self.request)
+        return new.subtract(prev,fill_value=0.0)
+
+    def changed_gentypes(self):
+        diff = self.generator_changes()
+        result = set(diff[diff.abs() > self.TOLERANCE].index.get_level_values('generator type'))
+        prev = self.previous.nodes.set_index('node_id')
+        new = self.request.nodes.set_index('node_id')
+        common = new.index.intersection(prev.index)
+        for gentype in self.request.gentypes:
+            if gentype not in new:
+                continue
+            if gentype not in prev:
+                result.add(gentype); continue
+            if not np.allclose(prev.loc[common,gentype].fillna(0.0),new.loc[common,gentype].fillna(0.0)):
+                result.add(gentype)
+        return sorted(result)
+
+    def full_solve_reason(self):
+        """
+        Returns why the request must be solved from scratch, or None.
+        """
+        if not hasattr(self.previous,'distance'):
+            return "the previous request has no results"
+        if self.previous.gentypes != self.request.gentypes:
+            return "the generator types changed"
+        if (self.previous.minimum_capacity is not None) or (self.request.minimum_capacity is not None):
+            return "minimum_capacity is not supported"
+        prev = self.previous.summary['Desired Capacity (MW)'].round(self.precision)
+        new = self.request.summary['Desired Capacity (MW)'].round(self.precision)
+        prev, new = prev.align(new,fill_value=0.0)
+        if (prev - new).abs().max() > self.TOLERANCE:
+            return "the desired capacity changed"
+        if len(self.affected_nodes) == len(self.request.nodes):
+            return "all nodes changed"
+        return None
+
+    @property
+    def full_solve_needed(self):
+        return self.reason is not None
+
+    def fixed(self,df):
+        """
+        Returns the rows of df, a previous result, at unaffected nodes that 
+        are still in the system. Node ids are matched on their string form 
+        and returned as they are in request.nodes, so a previous result 
+        whose node ids are labels (e.g. read back from a gdx file) still 
+        lines up with integer node ids.
+        """
+        node_ids = self.request.nodes['node_id']
+        if not df['node_id'].isin(node_ids).all():
+            pos = pds.Index(node_ids.astype(str)).get_indexer(df['node_id'].astype(str))
+            df = df[pos >= 0].copy()
+            df['node_id'] = node_ids.values[pos[pos >= 0]]
+        return df[~df['node_id'].isin(self.affected_nodes)]
+
+    def subrequest(self):
+        """
+        Returns a copy of request with only the affected nodes, and with 
+        desired capacity reduced by the final capacity fixed at the other 
+        nodes, or None if the fixed capacity exceeds the desired capacity.
+        """
+        request = self.request
+        fixed = self.fixed(self.previous.capacity).groupby('generator type')['capacity (MW)'].sum()
+        summary = request.summary.copy()
+        desired = summary['Desired Capacity (MW)'].round(self.precision) - \
+                  fixed.reindex(summary.index,fill_value=0.0)
+        if (desired < -self.TOLERANCE).any():
+            logger.info("The capacity fixed at unchanged nodes exceeds the desired capacity of " + 
+                        "{}.".format(list(desired.index[desired < -self.TOLERANCE])))
+            return None
+        summary['Desired Capacity (MW)'] = desired.clip(lower=0.0)
+
+        result = copy.copy(request)
+        result.nodes = request.nodes[request.nodes['node_id'].isin(self.affected_nodes)].reset_index(drop=True)
+        result.generators = request.generators[request.generators['node_id'].isin(self.affected_nodes)].reset_index(drop=True)
+        summary['Current Capacity (MW)'] = result.generators.groupby('generator type')['capacity (MW)'].sum() \
+            .reindex(summary.index,fill_value=0.0)
+        result.summary = summary
+        return result
+
+    def merge(self,sub,gendists_df):
+        """
+        Returns the arguments of request.register_results made of the 
+        previous results at unaffected nodes and sub's results at the 
+        affected ones.
+
+        :param sub: subrequest() after a successful solve
+        :param gendists_df: gendists in (g,gg,Value) format, see 
+            Model.problem_inputs
+        """
+        prev = self.previous
+        results = []
+        for name in ['capacity','capacity_added','capacity_kept','capacity_swapped','capacity_removed']:
+            frames = [df for df in [self.fixed(getattr(prev,name)),getattr(sub,name)] if len(df)]
+            results.append(pds.concat(frames,ignore_index=True) if frames else getattr(sub,name))
+
+        swapped = self.fixed(prev.capacity_swapped)
+        dist = swapped.merge(gendists_df,how='left',
+                             left_on=['from generator type','to generator type'],
+                             right_on=['g','gg'])['Value'].fillna(0.0).values
+        fixed_distance = self.fixed(prev.capacity_added)['capacity (MW)'].sum() + \
+                         self.fixed(prev.capacity_removed)['capacity (MW)'].sum() + \
+                         (swapped['capacity (MW)'].values * dist).sum()
+        results.append(fixed_distance + sub.distance)
+        return results
@@ -0,0 +1,106 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def min_cost_flow(num_nodes,tails,heads,costs,capacities,source,sink,time_limit=None):
+    """
+    Sends as much flow as possible from source to sink at least total cost 
+    using the primal-dual successive shortest path algorithm: each phase 
+    finds shortest path distances in the residual network (Dijkstra on 
+    reduced costs), and then augments a maximum flow along all of the 
+    shortest paths at once. Since the number of phases is bounded by the 
+    number of distinct source-sink path lengths, problems with only a few 
+    distinct arc costs are solved in a handful of phases, each of which runs 
+    in compiled code (scipy.sparse.csgraph).
+
+    :param num_nodes: number of nodes in the network
+    :param tails: np.array of arc tail node indices
+    :param heads: np.array of arc head node indices
+    :param costs: np.array of non-negative arc costs per unit flow
+    :param capacities: np.array of non-negative integer arc capacities. The 
+        total capacity out of source must fit in a 32-bit integer.
+    :param source: index of the source node
+    :param sink: index of the sink node
+    :param time_limit: maximum number of seconds to spend, checked between 
+        phases. TimeoutError is raised if it is exceeded.
+    :return: (flows, flow_value, cost) where flows is an integer np.array 
+        aligned with the arcs
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra, maximum_flow
+
+    start_time = time.perf_counter()
+    tails = np.asarray(tails,dtype=np.int64)
+    heads = np.asarray(heads,dtype=np.int64)
+    costs = np.asarray(costs,dtype=float)
+    capacities = np.asarray(capacities,dtype=np.int64)
+    assert (costs >= 0.0).all(), "Arc costs must be non-negative."
+    supply = capacities[tails == source].sum()
+    assert supply < np.iinfo(np.int32).max, "Flows must fit in 32-bit integers."
+    # no arc can carry more than the source supplies
+    capacities = np.minimum(capacities,supply)
+    pairs = np.concatenate([tails * num_nodes + heads,heads * num_nodes + tails])
+    assert len(np.unique(pairs)) == len(pairs), "Parallel and anti-parallel arcs are not supported."
+
+    tolerance = 1.0E-9 * (1.0 + costs.max(initial=0.0))
+    flows = np.zeros(len(tails),dtype=np.int64)
+    potentials = np.zeros(num_nodes)
+    flow_value = 0
+    phase = 0
+    while True:
+        if (time_limit is not None) and (time.perf_counter() - start_time > time_limit):
+            raise TimeoutError("No minimum cost flow found within {} seconds.".format(time_limit))
+        # residual network, with reduced costs as weights
+        reduced = costs + potentials[tails] - potentials[heads]
+        forward = flows < capacities
+        backward = flows > 0
+        residual_tails = np.concatenate([tails[forward],heads[backward]])
+        residual_heads = np.concatenate([heads[forward],tails[backward]])
+        residual_costs = np.maximum(np.concatenate([reduced[forward],-reduced[backward]]),0.0)
+        graph = csr_matrix((residual_costs,(residual_tails,residual_heads)),shape=(num_nodes,num_nodes))
+        distances = dijkstra(graph,indices=source)
+        if not np.isfinite(distances[sink]):
+            break
+        potentials += np.minimum(distances,distances[sink])
+
+        # augment along the admissible (zero reduced cost) residual arcs
+        reduced = costs + potentials[tails] - potentials[heads]
+        forward = (flows < capacities) & (reduced <= tolerance)
+        backward = (flows > 0) & (reduced >= -tolerance)
+        residual = np.concatenate([(capacities - flows)[forward],flows[backward]]).astype(np.int32)
+        graph = csr_matrix((residual,(np.concatenate([tails[forward],heads[backward]]),
+                                      np.concatenate([heads[forward],tails[backward]]))),
+                           shape=(num_nodes,num_nodes))
+        result = maximum_flow(graph,source,sink)
+        if result.flow_value == 0:
+            break
+        flows += np.asarray(result.flow[tails,heads]).ravel()
+        flow_value += result.flow_value
+        phase += 1
+        logger.debug("Phase {}: augmented {} units along paths of length {}.".format(phase,result.flow_value,potentials[sink] - potentials[source]))
+
+    cost = (flows * costs).sum()
+    logger.info("Found a minimum cost flow of {} units in {} phases.".format(flow_value,phase))
+    return flows, flow_value, cost
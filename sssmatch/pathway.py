@@ -0,0 +1,123 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import logging
+import os
+
+import pandas as pds
+
+from sssmatch import AML, OutputFormat
+
+logger = logging.getLogger(__name__)
+
+PATHWAY_SUMMARY_COLUMNS = ['scenario_year','distance','kept (MW)','swapped in (MW)',
+                           'added (MW)','removed (MW)','final (MW)']
+
+
+def new_capacity(request):
+    """
+    Capacity that a fulfilled request built, that is, capacity added plus 
+    capacity swapped in, summed by node and generator type.
+
+    :return: pandas.DataFrame in Request.generators_columns format
+    """
+    swapped = request.capacity_swapped[['node_id','to generator type','capacity (MW)']]
+    swapped.columns = request.generators_columns()
+    return sum_capacity(pds.concat([request.capacity_added,swapped]))
+
+
+def sum_capacity(generators,how='sum'):
+    result = generators.groupby(['node_id','generator type'],as_index=False)['capacity (MW)'].agg(how)
+    return result[result['capacity (MW)'] > 0.0]
+
+
+def match_pathway(nodes,generators,dataset,years,scenario,geography,outdir,
+                  exclusions=None,persist_added=False,gendists=None,precision=0,
+                  aml=AML.GAMS,timeout=None,solve_cache=None,
+                  output_format=OutputFormat.CSV):
+    """
+    Matches one transmission system to a sequence of years of one scenario. 
+    Every year is matched against the original nodes and generators, which 
+    set the capacity limits and the distance of each year. With 
+    persist_added, each year's solution is carried forward as the 
+    minimum_capacity of the next; otherwise the years are independent.
+
+    :param nodes: pandas.DataFrame in Request.nodes_columns format
+    :param generators: pandas.DataFrame in Request.generators_columns format, 
+        the system that every year is matched from
+    :param dataset: sssparser.ScenariosDataset
+    :param years: list of scenario years, solved in the order given
+    :param outdir: directory in which a subdirectory is created per year
+    :param persist_added: if True, capacity added or swapped in during a year 
+        must remain in the final mix of all later years, as far as their 
+        desired capacity of each type allows, see Request.minimum_capacity
+    :param output_format: OutputFormat. For CSV, each year's results are 
+        saved in its subdirectory. Otherwise the results of all years are 
+        saved to one results.parquet or results.h5 store in outdir, keyed by 
+        scenario_year.
+    :return: pandas.DataFrame with one row per year, also saved as 
+        pathway_summary.csv in outdir
+    """
+    from sssmatch.request import Request
+
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    store = None
+    if output_format != OutputFormat.CSV:
+        from sssmatch.results import RESULT_FILE_EXTENSIONS, result_tables, save_result_tables
+        store = os.path.join(outdir,'results' + RESULT_FILE_EXTENSIONS[output_format])
+
+    results = []; minimum = None
+    for year in years:
+        request = Request(nodes,
+                          generators,
+                          dataset,
+                          dataset.get_genmix(year,scenario,geography),
+                          exclusions=exclusions,
+                          minimum_capacity=minimum)
+        request.preprocess()
+        year_outdir = os.path.join(outdir,str(year))
+        if not os.path.exists(year_outdir):
+            os.mkdir(year_outdir)
+        logger.info("Matching scenario year {}.".format(year))
+        request.fulfill(year_outdir,gendists=gendists,precision=precision,
+                        aml=aml,timeout=timeout,solve_cache=solve_cache,
+                        output_format=None if store else output_format)
+        if store:
+            save_result_tables(result_tables(request),store,output_format,key=[('scenario_year',year)])
+
+        summary = request.result_summary.loc['TOTAL']
+        results.append([year,request.distance] + 
+                       [summary[col] for col in PATHWAY_SUMMARY_COLUMNS[2:]])
+
+        if persist_added:
+            # what was built this year, and what earlier years required, 
+            # must remain. both are relative to the original generators, so 
+            # take the larger of the two, capped at this year's final 
+            # capacity so that the next year's limits can be met
+            built = new_capacity(request)
+            if minimum is not None:
+                built = sum_capacity(pds.concat([minimum,built]),how='max')
+            built = built.merge(sum_capacity(request.capacity),on=['node_id','generator type'],
+                                how='inner',suffixes=('',' final'))
+            built['capacity (MW)'] = built[['capacity (MW)','capacity (MW) final']].min(axis=1)
+            minimum = built[request.generators_columns()]
+
+    result = pds.DataFrame(results,columns=PATHWAY_SUMMARY_COLUMNS)
+    result.to_csv(os.path.join(outdir,'pathway_summary.csv'),index=False)
+    return result
@@ -17,42 +17,48 @@
 # [/LICENSE]
 
 import copy
-from enum import Enum, auto
 import logging
 import os
+import tempfile
+import time
 from shutil import copyfile
-from subprocess import call
+from subprocess import Popen, STDOUT, TimeoutExpired
 
 import numpy as np
 import pandas as pds
 
-from sssmatch import SSSMatchError, models_dir
+from sssmatch import AML, OutputFormat, SSSMatchError, models_dir
+from sssmatch.mincostflow import min_cost_flow
+from sssmatch.results import MatchResult, SparseResults
 
 logger = logging.getLogger(__name__)
 
 
-class AML(Enum):
-    """
-    Supported Algebraic Modeling Languages
-    """
-    GAMS = auto()
-
-
 class Request(object):
 
     RESOURCE_INDEPENDENT = ['Biopower','Coal','NG-CC','NG-CT','Nuclear','Oil-Gas-Steam','Storage']
+    RESOURCE_INDEPENDENT_ROW = 'Resource-independent'
+    FEASIBILITY_COLUMNS = ['Desired Capacity (MW)','Available Capacity (MW)',
+                           'Slack (MW)','Shortfall (MW)','Feasible','Limit']
     R2PD_TECHS_MAP = {'Land-based Wind': ['wind'],
                       'Rooftop PV': ['solar','rooftop'],
                       'Utility PV': ['solar','one-axis-tracking']}
     DEFAULT_GENTYPE_DISTANCE_FILE = os.path.join(models_dir,'default_gendists.csv')
 
 
-    def __init__(self,nodes,generators,dataset,desired_mix,exclusions=[]):
+    def __init__(self,nodes,generators,dataset,desired_mix,exclusions=[],
+                 minimum_capacity=None):
+        """
+        minimum_capacity is an optional DataFrame in the same format as 
+        generators of capacity that must remain in the final mix, for 
+        example capacity added in earlier years of a pathway.
+        """
         self.nodes = nodes
         self.generators = generators
         self.dataset = dataset
         self.original_desired_mix = desired_mix
         self.exclusions = exclusions if exclusions is not None else []
+        self.minimum_capacity = minimum_capacity
 
 
     @classmethod
@@ -72,14 +78,26 @@ class Request(object):
     def gentypes(self):
         return [gentype for gentype in self.dataset.gentypes if gentype not in self.exclusions]
 
+    @property
+    def generators(self):
+        return self._generators
+
+    @generators.setter
+    def generators(self,value):
+        self._generators = value
+        self._current_mix = None
+
     @property
     def current_mix(self):
-        result = pds.pivot_table(self.generators,
-                                 values='capacity (MW)',
-                                 index='generator type',
-                                 aggfunc=np.sum)
-        result.columns = ['Current Capacity (MW)']
-        return result
+        """
+        Current capacity by generator type. Computed once per generators 
+        DataFrame; assign a new DataFrame to generators rather than 
+        modifying it in place.
+        """
+        if self._current_mix is None:
+            result = self.generators.groupby('generator type')['capacity (MW)'].sum()
+            self._current_mix = result.to_frame('Current Capacity (MW)')
+        return self._current_mix
 
 
     def drop_default_gendists(self,filename=None):
@@ -101,7 +119,13 @@ class Request(object):
         pds.DataFrame(data,columns=['g','gg','Value']).to_csv(filename,index=False)
 
 
-    def preprocess(self):
+    def preprocess(self,per_node_limits=False):
+        """
+        Filters and scales the desired mix to the system load, tabulates 
+        self.summary, and checks that the request is feasible, see 
+        check_feasibility. Raises an SSSMatchError listing every generator 
+        type whose desired capacity cannot be met.
+        """
         self.desired_mix = copy.deepcopy(self.original_desired_mix)
         del self.desired_mix['Capacity Fraction']; del self.desired_mix['Generation Fraction']
 
@@ -126,41 +150,78 @@ class Request(object):
         self.summary.fillna(0.0,inplace=True)
         logger.info("Request summary:\n{}".format(self.summary))
 
-        assert self._resource_independent_test()
-        assert self._resource_dependent_test()
-
-        
-    def _resource_independent_test(self):
-        totals = self.summary[self.summary.index.isin(self.RESOURCE_INDEPENDENT)].sum()
-        if totals['Desired Capacity (MW)'] > totals['Current Capacity (MW)']:
-            msg = "Unable to create a new generation mix that has more " + \
-                  "resource-independent capacity than the current system." + \
-                  "Resource-independent generation types are: {}.".format(self.RESOURCE_INDEPENDENT) + \
-                  "Current and desired capacity of this sort is:\n{}".format(totals)
+        self.feasibility_report = self.check_feasibility(per_node=per_node_limits)
+        infeasible = self.feasibility_report[~self.feasibility_report['Feasible']]
+        if not infeasible.empty:
+            msg = "Unable to create the new generation mix, because the desired " + \
+                  "capacity exceeds the available capacity of {}. ".format(list(infeasible.index))
+            if self.RESOURCE_INDEPENDENT_ROW in infeasible.index:
+                msg += "Resource-independent generation types ({}) ".format(self.RESOURCE_INDEPENDENT) + \
+                       "can only be placed where there is current resource-independent capacity, " + \
+                       "so in total cannot exceed that capacity. "
+            unbounded = [g for g in infeasible.index[infeasible['Limit'] == 'current capacity'] 
+                         if g != self.RESOURCE_INDEPENDENT_ROW]
+            if unbounded:
+                msg += "No maximum quantity is specified for each node for {}. ".format(unbounded)
+            msg += "Feasibility report:\n{}".format(self.feasibility_report.to_string())
             raise SSSMatchError(msg)
-        logger.debug("Resource-independent generation types are: {}.".format(self.RESOURCE_INDEPENDENT) + \
-                     "Current and desired capacity of this sort is:\n{}".format(totals))
-        return True
+        logger.debug("Feasibility report:\n{}".format(self.feasibility_report.to_string()))
 
 
-    def _resource_dependent_test(self):
-        for gentype in self.summary.index:
-            if gentype in self.RESOURCE_INDEPENDENT:
-                continue
-            desired = self.summary.loc[gentype,'Desired Capacity (MW)']
-            current = self.summary.loc[gentype,'Current Capacity (MW)']
-            if desired > current:
-                if gentype not in self.nodes:
-                    msg = "Unable to create a new generation mix with {} MW {} capacity,".format(desired,gentype) + \
-                          "because there is only {} MW in current capacity, ".format(current) + \
-                          "and no maximum quantity is specified for each node."
-                    raise SSSMatchError(msg)
-                maximum = self.nodes[gentype].sum()
-                if desired > maximum:
-                    msg = "Unable to create a new generation mix with {} MW {} capacity, ".format(desired,gentype) + \
-                          "because the specified maximum supply only {} MW.".format(maximum)
-                    raise SSSMatchError(msg)
-        return True
+    def check_feasibility(self,per_node=False):
+        """
+        Checks every generator type in self.summary against the capacity 
+        that can be placed, all at once. Resource-independent types can only 
+        replace each other's current capacity, so they are checked in total 
+        in the RESOURCE_INDEPENDENT_ROW. Each resource-dependent type is 
+        limited to its current capacity, or to the maximum specified for it 
+        in self.nodes, whichever is greater.
+
+        Arguments:
+            - per_node (bool) - if True, apply the nodes' maximums node by 
+              node, as the match model does: the available capacity is 
+              the sum over nodes of the greater of each node's maximum and 
+              its current capacity. Otherwise the nodes' maximums are 
+              compared in total.
+
+        Returns a DataFrame with FEASIBILITY_COLUMNS, indexed by 
+        RESOURCE_INDEPENDENT_ROW and then the resource-dependent generator 
+        types. Slack is available less desired capacity, and Shortfall is 
+        the capacity by which desired exceeds available, if any. Limit 
+        says what the available capacity is based on.
+        """
+        indep = self.summary.index.isin(self.RESOURCE_INDEPENDENT)
+        dep = self.summary[~indep]
+        has_maximum = dep.index.isin(self.nodes.columns)
+        maximums = list(dep.index[has_maximum])
+
+        if per_node:
+            current = self.generators[self.generators['generator type'].isin(dep.index)]
+            current = current.groupby(['node_id','generator type'])['capacity (MW)'].sum()
+            current = current.unstack('generator type',fill_value=0.0).reindex(
+                index=self.nodes['node_id'],columns=dep.index,fill_value=0.0)
+            maximum = pds.DataFrame(0.0,index=current.index,columns=dep.index)
+            maximum[maximums] = self.nodes[maximums].fillna(0.0).values
+            available = np.maximum(current.values,maximum.values).sum(axis=0)
+        else:
+            maximum = pds.Series(0.0,index=dep.index)
+            maximum[maximums] = self.nodes[maximums].sum().values
+            available = np.maximum(dep['Current Capacity (MW)'].values,maximum.values)
+
+        totals = self.summary[indep].sum()
+        desired = np.concatenate([[totals['Desired Capacity (MW)']],dep['Desired Capacity (MW)'].values])
+        available = np.concatenate([[totals['Current Capacity (MW)']],available])
+        limit = np.where(has_maximum,'per-node maximum' if per_node else 'nodes maximum','current capacity')
+
+        result = pds.DataFrame({'Desired Capacity (MW)': desired,
+                                'Available Capacity (MW)': available,
+                                'Slack (MW)': available - desired,
+                                'Shortfall (MW)': np.maximum(desired - available,0.0),
+                                'Feasible': desired <= available,
+                                'Limit': np.concatenate([['current capacity'],limit])},
+                               index=[self.RESOURCE_INDEPENDENT_ROW] + list(dep.index),
+                               columns=self.FEASIBILITY_COLUMNS)
+        return result
 
 
     @classmethod
@@ -174,32 +235,197 @@ class Request(object):
         return result
 
 
-    def fulfill(self,outdir,gendists=None,precision=0,aml=AML.GAMS):
+    def fulfill(self,outdir=None,gendists=None,precision=0,aml=AML.GAMS,
+                aggregation_ratio=None,report_gap=False,timeout=None,
+                solve_cache=None,previous=None,output_format=OutputFormat.CSV):
         """
         Arguments:
             - outdir (str) - directory in which to run matching model and place 
-              results
+              results. If None, the model is run in a temporary directory and 
+              the results are not saved.
             - gendists (str) - path to csv of (gentype_from, gentype_to, 
               distance)
             - precision (int) - number of digits after the decimal point to 
               match desired mix to, in MW
             - aml (AML) - value of the AML enum that corresponds to the 
               algebraic modeling language you would like to use
+            - aggregation_ratio (float) - if not None, solve the match on a 
+              system whose nodes are clustered down to this fraction of the 
+              original number, and then disaggregate the results, see 
+              NodeAggregation
+            - report_gap (bool) - if aggregating, also solve the full system 
+              to report the objective gap of the aggregated solution
+            - timeout (float) - maximum number of seconds to let each solve 
+              run, see Model.run
+            - solve_cache (SolveCache) - if not None, results of solving the 
+              same model inputs with the same aml are reused from, and new 
+              results are stored in, this cache. No model files are written 
+              to outdir on a cache hit.
+            - previous (Request) - if not None, a fulfilled request of the 
+              same system with the same gendists and precision. Only the 
+              nodes whose inputs differ from previous are re-matched, see 
+              solve_incremental.
+            - output_format (OutputFormat) - format in which to save the 
+              results to outdir, see MatchResult.save. If None, the results 
+              are not saved.
+
+        Returns a MatchResult, which is also stored in self.result.
         """
         if not hasattr(self,'summary'):
             self.preprocess()
 
+        tmpdir = None
+        if outdir is None:
+            tmpdir = tempfile.TemporaryDirectory(prefix='sssmatch_')
+        workdir = outdir if tmpdir is None else tmpdir.name
+        try:
+            if previous is not None:
+                if aggregation_ratio is not None:
+                    raise SSSMatchError("Incremental matching does not support node aggregation.")
+                self.solve_incremental(workdir,previous,gendists=gendists,precision=precision,
+                                       aml=aml,timeout=timeout,solve_cache=solve_cache)
+            elif aggregation_ratio is None:
+                self.solve(workdir,gendists=gendists,precision=precision,aml=aml,timeout=timeout,
+                           solve_cache=solve_cache)
+            else:
+                self.solve_aggregated(workdir,aggregation_ratio,gendists=gendists,
+                                      precision=precision,aml=aml,report_gap=report_gap,
+                                      timeout=timeout,solve_cache=solve_cache)
+        finally:
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        self.result = MatchResult.from_request(self)
+        if (outdir is not None) and (output_format is not None):
+            self.result.save(outdir,output_format=output_format)
+        return self.result
+
+    def make_model(self,outdir,aml):
         model = None
         if aml == AML.GAMS:
             model = GamsModel(self,outdir)
+        elif aml == AML.GAMS_API:
+            model = GamsApiModel(self,outdir)
+        elif aml == AML.SCIPY:
+            model = ScipyModel(self,outdir)
+        elif aml == AML.NETWORK:
+            if self.minimum_capacity is not None:
+                # the network has no lower bounds on final capacity
+                logger.info("Solving with ScipyModel because the network flow model does not support minimum_capacity.")
+                model = ScipyModel(self,outdir)
+            else:
+                model = NetworkFlowModel(self,outdir)
         assert model is not None, "Choose from one of the available algebraic modeling languages: {}".format(",".join([val.name for val in AML]))
+        return model
 
+    def solve(self,outdir,gendists=None,precision=0,aml=AML.GAMS,timeout=None,
+              solve_cache=None):
+        """
+        Runs the match model and registers its results. Returns the model, or 
+        None if the results were found in solve_cache.
+        """
+        if solve_cache is not None:
+            key = solve_cache.key(ProblemArrays(self,*Model.problem_inputs(self,gendists,precision)),aml)
+            results = solve_cache.get(key)
+            if results is not None:
+                logger.info("Using cached results {} for the match in {}.".format(key,outdir))
+                self.solver_statistics = {'aml': aml.name, 'cached': True}
+                self.register_results(*results)
+                return None
+
+        model = self.make_model(outdir,aml)
+        start = time.perf_counter()
         model.setup(gendists=gendists,precision=precision)
-        model.run()
+        setup_done = time.perf_counter()
+        model.run(timeout=timeout)
+        run_done = time.perf_counter()
+        self.solver_statistics = dict(model.statistics(),aml=aml.name,model=type(model).__name__,cached=False,
+                                      setup_seconds=setup_done - start,solve_seconds=run_done - setup_done)
         ret = model.collect_results()
         if not ret:
-            raise SSSMatchError('Running the match model {} failed. Examine outputs in {}.'.format(model.MODEL_FILE,outdir))
-        self.save_results(outdir)
+            raise SSSMatchError('Running the match model {} failed. Examine outputs in {}.'.format(model.MODEL_FILE or type(model).__name__,outdir))
+        if solve_cache is not None:
+            solve_cache.put(key,(self.capacity,self.capacity_added,self.capacity_kept,
+                                 self.capacity_swapped,self.capacity_removed,self.distance))
+        return model
+
+    def solve_aggregated(self,outdir,ratio,gendists=None,precision=0,aml=AML.GAMS,report_gap=False,timeout=None,
+                         solve_cache=None):
+        """
+        Solves the match on a clustered copy of this request in 
+        outdir/aggregated, and registers the disaggregated results. If 
+        report_gap, also solves the full request in outdir/full and stores 
+        both objective values in self.aggregation_report.
+        """
+        from sssmatch.aggregation import NodeAggregation
+
+        if self.minimum_capacity is not None:
+            raise SSSMatchError("Node aggregation does not support minimum_capacity.")
+        if not os.path.exists(outdir):
+            os.mkdir(outdir)
+        aggregation = NodeAggregation(self,ratio)
+        reduced = aggregation.reduced_request()
+        reduced.solve(os.path.join(outdir,'aggregated'),gendists=gendists,precision=precision,aml=aml,timeout=timeout,
+                      solve_cache=solve_cache)
+
+        model = Model(self,outdir)
+        model.setup(gendists=gendists,precision=precision)
+        self.solver_statistics = dict(reduced.solver_statistics,aggregated_nodes=int(aggregation.num_clusters))
+        self.register_results(*aggregation.disaggregate(reduced,model.problem))
+
+        self.aggregation_report = pds.Series([len(self.nodes),aggregation.num_clusters,reduced.distance,self.distance],
+            index=['nodes','clusters','aggregated distance','disaggregated distance'])
+        if report_gap:
+            full = copy.copy(self)
+            full.solve(os.path.join(outdir,'full'),gendists=gendists,precision=precision,aml=aml,timeout=timeout,
+                       solve_cache=solve_cache)
+            self.aggregation_report['full distance'] = full.distance
+            self.aggregation_report['gap'] = (self.distance - full.distance) / full.distance if full.distance else 0.0
+        logger.info("Aggregation report:\n{}".format(self.aggregation_report))
+
+
+    def solve_incremental(self,outdir,previous,gendists=None,precision=0,aml=AML.GAMS,
+                          timeout=None,solve_cache=None):
+        """
+        Registers previous's results at the nodes whose inputs are unchanged 
+        and re-matches only the other nodes, in outdir/incremental, see 
+        RequestDiff. Solves the whole request instead if the desired 
+        capacity changed, or if the re-match is infeasible.
+        """
+        from sssmatch.incremental import RequestDiff
+
+        diff = RequestDiff(previous,self,precision=precision)
+        if diff.full_solve_needed:
+            logger.info("Solving the whole request because {}.".format(diff.reason))
+            return self.solve(outdir,gendists=gendists,precision=precision,aml=aml,
+                              timeout=timeout,solve_cache=solve_cache)
+        logger.info("Re-matching {} of {} nodes. Changed generator types: {}.".format(
+            len(diff.affected_nodes),len(self.nodes),diff.affected_gentypes))
+
+        gendists_df, _desired_capacity_df = Model.problem_inputs(self,gendists,precision)
+        sub = diff.subrequest()
+        if sub is not None and len(sub.nodes) == 0:
+            if (sub.summary['Desired Capacity (MW)'] > diff.TOLERANCE).any():
+                sub = None
+            else:
+                sub.register_results(*[df.iloc[:0] for df in [previous.capacity,previous.capacity_added,
+                    previous.capacity_kept,previous.capacity_swapped,previous.capacity_removed]] + [0.0])
+        elif sub is not None:
+            if not os.path.exists(outdir):
+                os.mkdir(outdir)
+            try:
+                sub.solve(os.path.join(outdir,'incremental'),gendists=gendists,
+                          precision=precision + diff.EXTRA_DIGITS,aml=aml,timeout=timeout,
+                          solve_cache=solve_cache)
+            except SSSMatchError as e:
+                logger.info("Re-matching the changed nodes failed: {}".format(e))
+                sub = None
+        if sub is None:
+            logger.info("Solving the whole request because the changed nodes cannot be re-matched on their own.")
+            return self.solve(outdir,gendists=gendists,precision=precision,aml=aml,
+                              timeout=timeout,solve_cache=solve_cache)
+        self.solver_statistics = dict(getattr(sub,'solver_statistics',{}),rematched_nodes=len(diff.affected_nodes))
+        self.register_results(*diff.merge(sub,gendists_df))
 
 
     def register_results(self,capacity,capacity_added,capacity_kept,
@@ -209,95 +435,84 @@ class Request(object):
         format as self.generators. Distance is the scalar objective function 
         value.
         """
-        self.capacity = capacity
-        self.capacity_added = capacity_added
-        self.capacity_kept = capacity_kept
-        self.capacity_swapped = capacity_swapped
-        self.capacity_removed = capacity_removed
-        self.distance = distance
+        self.register_sparse_results(SparseResults.from_dataframes(
+            capacity,capacity_added,capacity_kept,capacity_swapped,capacity_removed,distance,
+            nodes=self.nodes['node_id'],gentypes=self.gentypes))
+
+    def register_sparse_results(self,results):
+        """
+        Registers a SparseResults. The capacity DataFrames are only built 
+        when they are first accessed.
+        """
+        self.sparse_results = results
+        self.distance = results.distance
         self.compile_result_summary()
 
+    @property
+    def capacity(self):
+        return self.sparse_results.dataframe('capacity')
+
+    @property
+    def capacity_added(self):
+        return self.sparse_results.dataframe('capacity_added')
+
+    @property
+    def capacity_kept(self):
+        return self.sparse_results.dataframe('capacity_kept')
+
+    @property
+    def capacity_swapped(self):
+        return self.sparse_results.dataframe('capacity_swapped')
+
+    @property
+    def capacity_removed(self):
+        return self.sparse_results.dataframe('capacity_removed')
+
+
+    # (result name, column that is summed over, result_summary column)
+    RESULT_SUMMARY_TOTALS = [('capacity_kept','generator type','kept (MW)'),
+                             ('capacity_swapped','from generator type','swapped out (MW)'),
+                             ('capacity_swapped','to generator type','swapped in (MW)'),
+                             ('capacity_added','generator type','added (MW)'),
+                             ('capacity_removed','generator type','removed (MW)'),
+                             ('capacity','generator type','final (MW)')]
 
     def compile_result_summary(self):
-        self.result_summary = copy.deepcopy(self.summary)
-
-        kept_mw = pds.pivot_table(self.capacity_kept,
-                                  values='capacity (MW)',
-                                  index='generator type',
-                                  aggfunc=np.sum)
-        kept_mw.columns = ['kept (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(kept_mw),how='outer',left_index=True,right_index=True)
-
-        swapped_out = pds.pivot_table(self.capacity_swapped,
-                                      values='capacity (MW)',
-                                      index='from generator type',
-                                      aggfunc=np.sum)
-        swapped_out.columns = ['swapped out (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(swapped_out),how='outer',left_index=True,right_index=True)
-
-        swapped_in = pds.pivot_table(self.capacity_swapped,
-                                     values='capacity (MW)',
-                                     index='to generator type',
-                                     aggfunc=np.sum)
-        swapped_in.columns = ['swapped in (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(swapped_in),how='outer',left_index=True,right_index=True)
-
-        added = pds.pivot_table(self.capacity_added,
-                                values='capacity (MW)',
-                                index='generator type',
-                                aggfunc=np.sum)
-        added.columns = ['added (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(added),how='outer',left_index=True,right_index=True)
-
-        removed = pds.pivot_table(self.capacity_removed,
-                                  values='capacity (MW)',
-                                  index='generator type',
-                                  aggfunc=np.sum)
-        removed.columns = ['removed (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(removed),how='outer',left_index=True,right_index=True)
-
-        final = pds.pivot_table(self.capacity,
-                                values='capacity (MW)',
-                                index='generator type',
-                                aggfunc=np.sum)
-        final.columns = ['final (MW)']
-        self.result_summary = self.result_summary.merge(pds.DataFrame(final),how='outer',left_index=True,right_index=True)
-
-        self.result_summary.fillna(0.0,inplace=True)
-
-        total = self.result_summary.sum()
-        total.name = 'TOTAL'
-        self.result_summary = pds.concat([self.result_summary,pds.DataFrame(total).T])
+        """
+        Tabulates summary and the result totals by generator type. All of the 
+        columns are stacked into one long Series and unstacked in a single 
+        step, rather than being merged in one at a time.
+        """
+        parts = [self.summary[column] for column in self.summary.columns]
+        keys = list(self.summary.columns)
+        for name, column, label in self.RESULT_SUMMARY_TOTALS:
+            parts.append(self.sparse_results.totals(name,column))
+            keys.append(label)
+        parts = [part.rename_axis('generator type') for part in parts]
+        long_table = pds.concat(parts,keys=keys,names=['column','generator type'])
+        result = long_table.groupby(level=['generator type','column'],sort=True).sum()
+        result = result.unstack('column',fill_value=0.0).reindex(columns=keys,fill_value=0.0)
+        result.columns.name = None
+        result.index.name = None
+        result = result.astype(float)
+
+        result.loc['TOTAL'] = result.sum()
+        self.result_summary = result
         return
 
 
-    def save_results(self,outdir):
+    def save_results(self,outdir,output_format=OutputFormat.CSV):
+        """
+        Saves the results to outdir, see MatchResult.save.
+        """
         assert hasattr(self,'distance'), 'This method can only be run after a successful call to self.fulfill.'
-        self.capacity.to_csv(os.path.join(outdir,'new_generators.csv'),index=False)
-
-        details_dir = os.path.join(outdir,'match_details')
-        if not os.path.exists(details_dir):
-            os.mkdir(details_dir)
-        self.capacity.to_csv(os.path.join(details_dir,'capacity.csv'),index=False)
-        self.capacity_added.to_csv(os.path.join(details_dir,'capacity_added.csv'),index=False)
-        self.capacity_kept.to_csv(os.path.join(details_dir,'capacity_kept.csv'),index=False)
-        self.capacity_swapped.to_csv(os.path.join(details_dir,'capacity_swapped.csv'),index=False)
-        self.capacity_removed.to_csv(os.path.join(details_dir,'capacity_removed.csv'),index=False)
-
-        for gentype, r2pd_call in self.R2PD_TECHS_MAP.items():
-            r2pd_dir = os.path.join(outdir,"_".join(r2pd_call))
-            df = self.capacity[self.capacity['generator type'] == gentype][['node_id','capacity (MW)']]
-            if df.empty:
-                continue
-            if not os.path.exists(r2pd_dir):
-                os.mkdir(r2pd_dir)
-            df.to_csv(os.path.join(r2pd_dir,'generators.csv'),index=False)
-            self.nodes.iloc[:,:3].to_csv(os.path.join(r2pd_dir,'nodes.csv'),index=False)
-        return        
+        MatchResult.from_request(self).save(outdir,output_format=output_format)
 
 
     def print_report(self):
         print(self.result_summary)
+        if hasattr(self,'aggregation_report'):
+            print(self.aggregation_report)
 
 
 class Model(object):
@@ -310,27 +525,76 @@ class Model(object):
     def __init__(self,request,outdir):
         self.request = request
         self.outdir = outdir
+        self.timeout = None
 
     def setup(self,gendists=None,precision=0): 
         if not os.path.exists(self.outdir):
             os.mkdir(self.outdir)
-        copyfile(os.path.join(models_dir,self.MODEL_FILE),os.path.join(self.outdir,self.MODEL_FILE))
+        if self.MODEL_FILE is not None:
+            copyfile(os.path.join(models_dir,self.MODEL_FILE),os.path.join(self.outdir,self.MODEL_FILE))
+
+        gendists_df, desired_capacity_df = self.problem_inputs(self.request,gendists,precision)
+        self.problem = ProblemArrays(self.request,gendists_df,desired_capacity_df)
+        self.problem.presolve()
 
-        gendists_filename = gendists if gendists is not None else self.request.DEFAULT_GENTYPE_DISTANCE_FILE
+        return gendists_df, desired_capacity_df
+
+    @classmethod
+    def problem_inputs(cls,request,gendists=None,precision=0):
+        """
+        Returns the gendists and desired capacity DataFrames, in (g,gg,Value) 
+        and (g,Value) format, that the model is built from.
+        """
+        gendists_filename = gendists if gendists is not None else request.DEFAULT_GENTYPE_DISTANCE_FILE
         gendists_df = pds.read_csv(gendists_filename)
         gendists_df.columns = ['g','gg','Value']
-        gendists_df = gendists_df[gendists_df.g.isin(self.request.gentypes) & gendists_df.gg.isin(self.request.gentypes)]
+        gendists_df = gendists_df[gendists_df.g.isin(request.gentypes) & gendists_df.gg.isin(request.gentypes)]
 
-        desired_capacity_df = pds.DataFrame(self.request.summary['Desired Capacity (MW)'].apply(lambda x: round(x,precision)))
+        desired_capacity_df = pds.DataFrame(request.summary['Desired Capacity (MW)'].apply(lambda x: round(x,precision)))
         desired_capacity_df = desired_capacity_df.reset_index()
         desired_capacity_df.columns = ['g','Value']
-
         return gendists_df, desired_capacity_df
 
-    def run(self): pass
+    def start(self):
+        """
+        Starts solving the model. Models that solve in-process have finished 
+        when this returns.
+        """
+        pass
+
+    def wait(self,timeout=None):
+        """
+        Waits up to timeout seconds (forever if None) for the solve begun by 
+        start to finish. Returns True if it has finished.
+        """
+        return True
+
+    def cancel(self):
+        """
+        Stops a solve begun by start that has not finished.
+        """
+        pass
+
+    def run(self,timeout=None):
+        """
+        Solves the model, raising SSSMatchError if that takes more than 
+        timeout seconds.
+        """
+        self.timeout = timeout
+        self.start()
+        if not self.wait(timeout=timeout):
+            self.cancel()
+            raise SSSMatchError("Solving {} did not finish within {} seconds. Examine outputs in {}.".format(
+                self.MODEL_FILE or type(self).__name__,timeout,self.outdir))
 
     def collect_results(self): pass
 
+    def statistics(self):
+        """
+        Returns a dict describing the model and how its solve went.
+        """
+        return {}
+
 
 class GamsModel(Model):
     """
@@ -338,113 +602,660 @@ class GamsModel(Model):
     a Python package available on github.com.
     """
     MODEL_FILE = 'match_generators.gms'
+    LOG_FILE = 'gams.log'
 
     def __init__(self,request,outdir):
         super().__init__(request,outdir)
+        self.process = None
 
     def setup(self,gendists=None,precision=0):
         gendists_df, desired_capacity_df = super().setup(gendists=gendists,precision=precision)
 
-        from gdxpds.gdx import GdxFile, GdxSymbol, GamsDataType
-        with GdxFile() as ingdx:
-            # Sets
-            ingdx.append(GdxSymbol('n',GamsDataType.Set,dims=['n']))
-            df = pds.DataFrame(self.request.nodes['node_id'])
-            df['Value'] = True
-            ingdx[-1].dataframe = df
-
-            ingdx.append(GdxSymbol('g',GamsDataType.Set,dims=['g']))
-            df = pds.DataFrame([[g, True] for g in self.request.gentypes],
-                               columns=['g','Value'])
-            ingdx[-1].dataframe = df
-
-            ingdx.append(GdxSymbol('g_indep',GamsDataType.Set,dims=['g']))
-            df = pds.DataFrame([[g, True] for g in self.request.gentypes if g in self.request.RESOURCE_INDEPENDENT],
-                               columns=['g','Value'])
-            ingdx[-1].dataframe = df
-
-            ingdx.append(GdxSymbol('g_dep',GamsDataType.Set,dims=['g']))
-            df = pds.DataFrame([[g, True] for g in self.request.gentypes if g not in self.request.RESOURCE_INDEPENDENT],
-                               columns=['g','Value'])
-            ingdx[-1].dataframe = df
+        from sssmatch.gdxio import write_gdx
+        write_gdx(os.path.join(self.outdir,'in.gdx'),*self.gdx_data())
+
+    def node_labels(self):
+        """
+        Returns the UEL labels of self.problem.nodes, in the same order.
+        """
+        return [str(node) for node in self.problem.nodes]
+
+    def gdx_data(self):
+        """
+        Returns the UEL table and the list of GdxSymbolData that 
+        match_generators.gms loads, built from self.problem. Only nonzero 
+        parameter values are included.
+        """
+        from sssmatch.gdxio import GdxSymbolData
+
+        p = self.problem
+        node_labels = self.node_labels()
+        uels = pds.Index(node_labels).append(pds.Index(p.gentypes)).unique()
+        n_codes = uels.get_indexer(node_labels)
+        g_codes = uels.get_indexer(p.gentypes)
 
+        def parameter(name,dims,values,*codes):
+            index = np.nonzero(values)
+            return GdxSymbolData(name,dims,tuple(c[i] for c, i in zip(codes,index)),values[index])
+
+        n, g, gg = p.swap_arcs()
+        symbols = [
+            # Sets
+            GdxSymbolData('n',['n'],(n_codes,),None),
+            GdxSymbolData('g',['g'],(g_codes,),None),
+            GdxSymbolData('g_indep',['g'],(g_codes[p.indep],),None),
+            GdxSymbolData('g_dep',['g'],(g_codes[~p.indep],),None),
+            GdxSymbolData('swappable',['n','g','gg'],(n_codes[n],g_codes[g],g_codes[gg]),None),
             # Parameters
-            ingdx.append(GdxSymbol('desired_capacity',GamsDataType.Parameter,dims=['g']))
-            ingdx[-1].dataframe = desired_capacity_df
-
-            ingdx.append(GdxSymbol('current_capacity',GamsDataType.Parameter,dims=['n','g']))
-            # pivot with sum on capacity in case there are multiple units of type g at node n
-            df = pds.pivot_table(self.request.generators,
-                                 values='capacity (MW)',
-                                 index=['node_id','generator type'],
-                                 aggfunc=np.sum)
-            df = df.reset_index()
-            df.columns = ['n','g','Value']
-            ingdx[-1].dataframe = df
-
-            ingdx.append(GdxSymbol('g_dist',GamsDataType.Parameter,dims=['g','gg']))
-            ingdx[-1].dataframe = gendists_df
-
-            ingdx.append(GdxSymbol('current_indep_capacity',GamsDataType.Parameter,dims=['n']))
-            df = pds.pivot_table(self.request.generators[self.request.generators['generator type'].isin(self.request.RESOURCE_INDEPENDENT)],
-                                 values='capacity (MW)',
-                                 index=['node_id'],
-                                 aggfunc=np.sum)
-            df = df.reset_index()
-            df.columns = ['n','Value']
-            ingdx[-1].dataframe = df
-
-            ingdx.append(GdxSymbol('maximum_capacity',GamsDataType.Parameter,dims=['n','g_dep']))
-            data = []
-            for g in self.request.gentypes:
-                if g in self.request.RESOURCE_INDEPENDENT:
-                    continue
-                if g in self.request.nodes:
-                    tmp = pds.DataFrame(self.request.nodes['node_id'])
-                    tmp['g_dep'] = g
-                    tmp['Value'] = self.request.nodes[g]
-                    data.append(tmp)
-            df = pds.concat(data)
-            df.columns = ['n','g_dep','Value']
-            ingdx[-1].dataframe = df
-
-            ingdx.write(os.path.join(self.outdir,'in.gdx'))
-
-    def run(self):
-        curdir = os.getcwd()
-        os.chdir(self.outdir)
-        call(['gams',self.MODEL_FILE])
-        os.chdir(curdir)
+            parameter('desired_capacity',['g'],p.desired,g_codes),
+            parameter('current_capacity',['n','g'],p.current,n_codes,g_codes),
+            parameter('g_dist',['g','gg'],p.dist,g_codes,g_codes),
+            parameter('current_indep_capacity',['n'],p.current_indep,n_codes),
+            parameter('maximum_capacity',['n','g_dep'],p.maximum,n_codes,g_codes),
+            parameter('minimum_capacity',['n','g'],p.minimum,n_codes,g_codes)]
+        return uels, symbols
+
+    def start(self):
+        # run in outdir without changing this process's working directory, 
+        # so that several models can be run at once
+        self.log = open(os.path.join(self.outdir,self.LOG_FILE),'w')
+        try:
+            self.process = Popen(['gams',self.MODEL_FILE],cwd=self.outdir,
+                                 stdout=self.log,stderr=STDOUT)
+        except OSError as e:
+            self.log.close()
+            raise SSSMatchError("Could not run gams. Is it installed and on the PATH? {}".format(e))
+
+    def wait(self,timeout=None):
+        try:
+            self.process.wait(timeout=timeout)
+        except TimeoutExpired:
+            return False
+        self.log.close()
+        return True
+
+    def cancel(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
 
     def collect_results(self):
         result_file = os.path.join(self.outdir,'MatchGenerationMix_p.gdx')
         if not os.path.exists(result_file):
             return False
 
-        from gdxpds.gdx import GdxFile
-        with GdxFile() as p_gdx:
-            p_gdx.read(result_file)
-
-            variables = [('Capacity',self.request.generators_columns()),
-                         ('CapacityAdded',self.request.generators_columns()),
-                         ('CapacityKept',self.request.generators_columns()),
-                         ('CapacitySwapped',self.request.generators_swapped_columns()),
-                         ('CapacityRemoved',self.request.generators_columns()),
-                         ('Distance',['Level'])]
-
-            capacity_column = self.request.generators_columns()[-1]
-
-            args = []
-            for variable_name, column_names in variables:
-                p_gdx[variable_name].load()
-                tmp = p_gdx[variable_name].dataframe.iloc[:,:(len(column_names))]
-                tmp.columns = column_names
-                # clear out 0 capacity entries
-                if capacity_column in tmp.columns:
-                    tmp = tmp[tmp[capacity_column] > 0.0]
-                args.append(tmp)
-
-            args[-1] = args[-1]['Level'].values[0]
-            self.request.register_results(*args)
+        from sssmatch.gdxio import GdxReader
+        with GdxReader(result_file) as reader:
+            variables = [('capacity','Capacity',2),
+                         ('capacity_added','CapacityAdded',2),
+                         ('capacity_kept','CapacityKept',2),
+                         ('capacity_swapped','CapacitySwapped',3),
+                         ('capacity_removed','CapacityRemoved',2)]
+
+            # keys are UEL codes. map them back to positions in 
+            # self.problem.nodes and gentypes, so that node ids keep the 
+            # type they have in request.nodes rather than becoming labels
+            p = self.problem
+            to_node = pds.Index(self.node_labels()).get_indexer(reader.uels)
+            to_gentype = pds.Index(p.gentypes).get_indexer(reader.uels)
+            results = SparseResults(p.nodes,p.gentypes,reader.read_scalar_level('Distance'))
+            for name, variable_name, dims in variables:
+                # only records with positive levels are kept
+                keys, levels = reader.read_levels(variable_name,dims)
+                codes = (to_node[keys[:,0]],) + tuple(to_gentype[keys[:,i]] for i in range(1,dims))
+                if any((c < 0).any() for c in codes):
+                    raise SSSMatchError("{} in {} has records for ".format(variable_name,result_file) + 
+                                        "nodes or generator types that are not in the problem.")
+                results.set(name,codes,levels)
+            self.request.register_sparse_results(results)
+
+        return True
+
+
+class GamsApiModel(GamsModel):
+    """
+    Realization of Model that runs match_generators.gms through the GAMS 
+    Python API, passing the inputs to GAMS in memory with gams.transfer 
+    instead of through in.gdx.
+    """
+
+    def setup(self,gendists=None,precision=0):
+        Model.setup(self,gendists=gendists,precision=precision)
+
+        from gams import GamsWorkspace
+        from sssmatch.gdxio import to_container
+        self.workspace = GamsWorkspace(working_directory=os.path.abspath(self.outdir))
+        self.database = self.workspace.add_database()
+        to_container(*self.gdx_data()).write(self.database)
+
+    def start(self):
+        import threading
+
+        self.log = open(os.path.join(self.outdir,self.LOG_FILE),'w')
+        self.job = self.workspace.add_job_from_file(os.path.abspath(os.path.join(self.outdir,self.MODEL_FILE)))
+        options = self.workspace.add_options()
+        options.defines['gdxincname'] = self.database.name
+        self.error = None
+
+        def run():
+            try:
+                self.job.run(options,databases=self.database,output=self.log)
+            except Exception as e:
+                self.error = e
+
+        self.thread = threading.Thread(target=run,daemon=True)
+        self.thread.start()
+
+    def wait(self,timeout=None):
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            return False
+        self.log.close()
+        if self.error is not None:
+            logger.error("Running {} failed: {}".format(self.MODEL_FILE,self.error))
+        return True
+
+    def cancel(self):
+        if self.thread.is_alive():
+            self.job.interrupt()
+            self.thread.join()
+        self.log.close()
+
+
+class ProblemArrays(object):
+    """
+    The sets and parameters of match_generators.gms as numpy arrays over 
+    nodes (n) and generator types (g), with the same preprocessing as the 
+    GAMS model:
+
+        - current (n,g) - current capacity, summed over units
+        - current_indep (n) - current resource-independent capacity
+        - maximum (n,g) - for resource-dependent g, the larger of the 
+          node's maximum and current capacity; 0 for resource-independent g
+        - allowed (n,g) - whether capacity of type g may be placed at n
+        - desired (g) - desired capacity
+        - dist (g,gg) - distance of swapping g for gg; 0 if not specified
+        - minimum (n,g) - capacity that must remain in the final mix, from 
+          request.minimum_capacity, scaled down where needed so that it does 
+          not exceed desired (g)
+    """
+    # swapping g for gg at this distance or more is never cheaper than 
+    # removing g and adding gg
+    DOMINATED_DISTANCE = 2.0
+
+    def __init__(self,request,gendists_df,desired_capacity_df):
+        self.nodes = np.asarray(request.nodes['node_id'])
+        self.gentypes = list(request.gentypes)
+        self.indep = np.array([g in request.RESOURCE_INDEPENDENT for g in self.gentypes])
+        node_index = pds.Index(self.nodes)
+        gentype_index = pds.Index(self.gentypes)
+
+        self.desired = np.zeros(len(self.gentypes))
+        g = gentype_index.get_indexer(desired_capacity_df['g'])
+        self.desired[g[g >= 0]] = desired_capacity_df['Value'].values[g >= 0]
+
+        self.current = np.zeros((len(self.nodes),len(self.gentypes)))
+        n = node_index.get_indexer(request.generators['node_id'])
+        g = gentype_index.get_indexer(request.generators['generator type'])
+        keep = (n >= 0) & (g >= 0)
+        if not keep.all():
+            logger.warning("Ignoring {} generators that are not at a listed node ".format((~keep).sum()) + 
+                           "or are not of an included generator type.")
+        np.add.at(self.current,(n[keep],g[keep]),request.generators['capacity (MW)'].values[keep])
+        self.current_indep = self.current[:,self.indep].sum(axis=1)
+
+        self.minimum = np.zeros((len(self.nodes),len(self.gentypes)))
+        if request.minimum_capacity is not None:
+            n = node_index.get_indexer(request.minimum_capacity['node_id'])
+            g = gentype_index.get_indexer(request.minimum_capacity['generator type'])
+            keep = (n >= 0) & (g >= 0)
+            np.add.at(self.minimum,(n[keep],g[keep]),request.minimum_capacity['capacity (MW)'].values[keep])
+            total = self.minimum.sum(axis=0)
+            over = total > self.desired
+            if over.any():
+                logger.info("Scaling down minimum_capacity of {} to the desired capacity.".format(
+                    [gentype for gentype, o in zip(self.gentypes,over) if o]))
+                self.minimum[:,over] *= self.desired[over] / total[over]
+
+        self.maximum = np.zeros((len(self.nodes),len(self.gentypes)))
+        for j, gentype in enumerate(self.gentypes):
+            if (not self.indep[j]) and (gentype in request.nodes):
+                self.maximum[:,j] = request.nodes[gentype].fillna(0.0).values
+        self.maximum[:,~self.indep] = np.maximum(self.maximum[:,~self.indep],self.current[:,~self.indep])
+
+        self.allowed = np.zeros((len(self.nodes),len(self.gentypes)),dtype=bool)
+        self.allowed[:,self.indep] = (self.current_indep > 0.0)[:,np.newaxis]
+        self.allowed[:,~self.indep] = self.maximum[:,~self.indep] > 0.0
+        self.minimum[~self.allowed] = 0.0
+
+        self.dist = np.zeros((len(self.gentypes),len(self.gentypes)))
+        g = gentype_index.get_indexer(gendists_df['g'])
+        gg = gentype_index.get_indexer(gendists_df['gg'])
+        keep = (g >= 0) & (gg >= 0)
+        self.dist[g[keep],gg[keep]] = gendists_df['Value'].values[keep]
+        np.fill_diagonal(self.dist,0.0)
+        self.swaps = None
+
+    def presolve(self):
+        """
+        Determines the CapacitySwapped variables that can be non-zero in an 
+        optimal solution: current capacity of type g at node n that may be 
+        swapped for allowed type gg != g at a distance less than 
+        DOMINATED_DISTANCE. Excluded generator types and nodes without 
+        current capacity never appear. Logs the number of variables 
+        eliminated from the full (n,g,gg) cube.
+        """
+        num_nodes, G = self.allowed.shape
+        n, g = np.nonzero(self.current > 0.0)
+        gg = np.tile(np.arange(G),len(n))
+        n = np.repeat(n,G)
+        g = np.repeat(g,G)
+        feasible = self.allowed[n,gg] & (g != gg)
+        keep = feasible & (self.dist[g,gg] < self.DOMINATED_DISTANCE)
+        self.swaps = (n[keep],g[keep],gg[keep])
+
+        full = num_nodes * G * G
+        logger.info("Presolve kept {} of {} CapacitySwapped variables. ".format(keep.sum(),full) + 
+                    "Eliminated {} without current capacity or not allowed, ".format(full - feasible.sum()) + 
+                    "and {} dominated by removing and adding capacity.".format(feasible.sum() - keep.sum()))
+        return self.swaps
+
+    def swap_arcs(self):
+        """
+        Returns (n, g, gg) index arrays of the CapacitySwapped variables 
+        kept by presolve.
+        """
+        if self.swaps is None:
+            self.presolve()
+        return self.swaps
+
+
+class ScipyModel(Model):
+    """
+    Realization of Model that builds the linear program in 
+    match_generators.gms as sparse matrices and solves it in-process with 
+    the HiGHS solver in scipy.optimize.linprog. Depends on SciPy >= 1.6.
+    """
+    ZERO_TOLERANCE = 1.0E-9
+
+    def __init__(self,request,outdir):
+        super().__init__(request,outdir)
+        self.problem = None
+        self.result = None
+
+    def setup(self,gendists=None,precision=0):
+        gendists_df, desired_capacity_df = super().setup(gendists=gendists,precision=precision)
+        p = self.problem
+
+        # variables, in order: Capacity and CapacityAdded over allowed (n,g), 
+        # CapacityKept and CapacityRemoved over (n,g) with current capacity, 
+        # and CapacitySwapped over p.swap_arcs()
+        self.cap_n, self.cap_g = np.nonzero(p.allowed)
+        self.cur_n, self.cur_g = np.nonzero(p.current > 0.0)
+        self.swap_n, self.swap_g, self.swap_gg = p.swap_arcs()
+        n_cap = len(self.cap_n); n_cur = len(self.cur_n); n_swap = len(self.swap_n)
+        cap = np.arange(n_cap)
+        added = n_cap + cap
+        kept = 2 * n_cap + np.arange(n_cur)
+        removed = 2 * n_cap + n_cur + np.arange(n_cur)
+        swapped = 2 * n_cap + 2 * n_cur + np.arange(n_swap)
+        self.num_vars = 2 * n_cap + 2 * n_cur + n_swap
+
+        # position of each allowed (n,g) in the Capacity variables
+        cap_pos = -np.ones(p.allowed.shape,dtype=int)
+        cap_pos[self.cap_n,self.cap_g] = cap
+        cur_pos = -np.ones(p.allowed.shape,dtype=int)
+        cur_pos[self.cur_n,self.cur_g] = np.arange(n_cur)
+
+        # equality constraints
+        rows = []; cols = []; vals = []; b_eq = []
+        def add_rows(row,col,val):
+            rows.append(row); cols.append(col); vals.append(np.broadcast_to(val,np.shape(col)))
+
+        # match_desired_capacity(g)
+        add_rows(self.cap_g,cap,1.0)
+        b_eq.append(p.desired)
+        offset = len(p.gentypes)
+
+        # calculate_final_capacity(n,g)$allowed(n,g)
+        add_rows(offset + cap,cap,1.0)
+        add_rows(offset + cap,added,-1.0)
+        add_rows(offset + cap_pos[self.cur_n,self.cur_g],kept,-1.0)
+        add_rows(offset + cap_pos[self.swap_n,self.swap_gg],swapped,-1.0)
+        b_eq.append(np.zeros(n_cap))
+        offset += n_cap
+
+        # disposition_of_current_capacity(n,g)$current_capacity(n,g)
+        add_rows(offset + np.arange(n_cur),kept,1.0)
+        add_rows(offset + np.arange(n_cur),removed,1.0)
+        add_rows(offset + cur_pos[self.swap_n,self.swap_g],swapped,1.0)
+        b_eq.append(p.current[self.cur_n,self.cur_g])
+        offset += n_cur
+
+        from scipy.sparse import coo_matrix
+        self.A_eq = coo_matrix((np.concatenate(vals),(np.concatenate(rows),np.concatenate(cols))),
+                               shape=(offset,self.num_vars)).tocsr()
+        self.b_eq = np.concatenate(b_eq)
+
+        # limit_indep_capacity(n)
+        indep = p.indep[self.cap_g]
+        self.A_ub = coo_matrix((np.ones(indep.sum()),(self.cap_n[indep],cap[indep])),
+                               shape=(len(p.nodes),self.num_vars)).tocsr()
+        self.b_ub = p.current_indep
+
+        # limit_dep_capacity(n,g_dep) as bounds
+        self.bounds = np.zeros((self.num_vars,2))
+        self.bounds[:,1] = np.inf
+        self.bounds[cap[~indep],1] = p.maximum[self.cap_n[~indep],self.cap_g[~indep]]
+        self.bounds[cap,0] = p.minimum[self.cap_n,self.cap_g]
+
+        # capacity_distance
+        self.c = np.zeros(self.num_vars)
+        self.c[added] = 1.0
+        self.c[removed] = 1.0
+        self.c[swapped] = p.dist[self.swap_g,self.swap_gg]
+
+        logger.info("Match LP has {} variables, {} equality constraints, and {} inequality constraints.".format(
+            self.num_vars,self.A_eq.shape[0],self.A_ub.shape[0]))
+
+    def start(self):
+        from scipy.optimize import linprog
+        options = {} if self.timeout is None else {'time_limit': self.timeout}
+        self.result = linprog(self.c,
+                              A_ub=self.A_ub,b_ub=self.b_ub,
+                              A_eq=self.A_eq,b_eq=self.b_eq,
+                              bounds=self.bounds,
+                              method='highs',
+                              options=options)
+        logger.info("HiGHS finished with status {}: {}".format(self.result.status,self.result.message))
+
+    def wait(self,timeout=None):
+        # linprog has returned by now, but HiGHS reports hitting its time 
+        # limit as a result, with status 1
+        return not ((self.result.status == 1) and self.result.message.startswith('Time limit'))
+
+    def statistics(self):
+        result = {'variables': self.num_vars,
+                  'equality_constraints': self.A_eq.shape[0],
+                  'inequality_constraints': self.A_ub.shape[0]}
+        if self.result is not None:
+            result.update(status=int(self.result.status),message=self.result.message,
+                          iterations=int(self.result.nit))
+        return result
+
+    def collect_results(self):
+        if (self.result is None) or (self.result.status != 0):
+            return False
+
+        p = self.problem
+        x = self.result.x
+        n_cap = len(self.cap_n); n_cur = len(self.cur_n)
+
+        variables = [(x[:n_cap],(self.cap_n,self.cap_g)),
+                     (x[n_cap:2*n_cap],(self.cap_n,self.cap_g)),
+                     (x[2*n_cap:2*n_cap+n_cur],(self.cur_n,self.cur_g)),
+                     (x[2*n_cap+2*n_cur:],(self.swap_n,self.swap_g,self.swap_gg)),
+                     (x[2*n_cap+n_cur:2*n_cap+2*n_cur],(self.cur_n,self.cur_g))]
+
+        results = SparseResults(p.nodes,p.gentypes,self.result.fun)
+        for name, (values, codes) in zip(results.NAMES,variables):
+            # clear out 0 capacity entries
+            values = np.where(values > self.ZERO_TOLERANCE,values,0.0)
+            results.set(name,codes,values)
+        self.request.register_sparse_results(results)
+
+        return True
+
+
+class NetworkFlowModel(Model):
+    """
+    Realization of Model that solves match_generators.gms as a minimum cost 
+    flow problem. Current capacity flows from (n,g) to the final capacity of 
+    g or of an allowed swap type gg at n, or to removal; added capacity flows 
+    from a single addition node; and final capacity flows to the desired 
+    capacity of each generator type.
+
+    limit_indep_capacity(n) is a side constraint, except when swaps between 
+    resource-independent types are free and swaps from each resource-
+    dependent type cost the same for every resource-independent type. Then 
+    all capacity that ends up resource-independent at n can be routed 
+    through one arc with capacity current_indep_capacity(n), and the network 
+    is exact. Neither default_gendists.csv nor equal_gendists.csv has that 
+    structure, so with them the network is a relaxation, and if its solution 
+    violates limit_indep_capacity the model is re-solved with ScipyModel, 
+    which takes longer than using ScipyModel in the first place.
+
+    Flows are integers, in units of 10^-k MW, where k is the largest number 
+    of digits up to precision + 3 for which the flows fit in 32 bits. 
+    Removed capacity, and so the distance, are computed from the unrounded 
+    current capacity.
+
+    Every unit of current and desired capacity reaches the sink, either 
+    through the desired capacity of a generator type or through the removal 
+    node. Added capacity that is not needed goes to the removal node 
+    unused, so to make meeting desired capacity mandatory the arc out of the 
+    removal node costs more than any path through the rest of the network. 
+    When desired capacity is met exactly current capacity passes through 
+    the removal node, so this adds a constant to the cost. If desired 
+    capacity is still not met the model is re-solved with ScipyModel.
+    """
+    EXTRA_DIGITS = 3
+
+    def __init__(self,request,outdir):
+        super().__init__(request,outdir)
+        self.problem = None
+        self.fallback = None
+        self.timed_out = False
+
+    def setup(self,gendists=None,precision=0):
+        gendists_df, desired_capacity_df = super().setup(gendists=gendists,precision=precision)
+        self.gendists = gendists; self.precision = precision
+        p = self.problem
+
+        indep = np.nonzero(p.indep)[0]; dep = np.nonzero(~p.indep)[0]
+        self.pooled = (p.dist[np.ix_(indep,indep)] == 0.0).all() and \
+            (p.dist[np.ix_(dep,indep)] == p.dist[np.ix_(dep,indep[:1])]).all()
+
+        # integer units
+        total = p.current.sum() + p.desired.sum()
+        digits = precision + self.EXTRA_DIGITS
+        while (digits > precision) and (total * 10.0**digits * 2 >= np.iinfo(np.int32).max):
+            digits -= 1
+        if total * 10.0**digits * 2 >= np.iinfo(np.int32).max:
+            raise SSSMatchError("The system is too large to be matched to precision {} ".format(precision) + 
+                                "with the network flow model.")
+        self.scale = 10.0**digits
+        # round current and maximum capacity down, so that no flow exceeds 
+        # them. desired capacity is already rounded to precision
+        current = np.floor(p.current * self.scale + 1.0E-6).astype(np.int64)
+        desired = np.round(p.desired * self.scale).astype(np.int64)
+        maximum = np.floor(p.maximum * self.scale + 1.0E-6).astype(np.int64)
+        current_indep = current[:,p.indep].sum(axis=1)
+        unbounded = current.sum() + desired.sum()
+        self.desired_units = desired; self.current_indep_units = current_indep
+
+        # nodes: 0 source, 1 sink, 2 addition, 3 removal, then E(n,g) for 
+        # current capacity, P(n,g) for final capacity, T(g) for desired 
+        # capacity, and I(n), J(n) for the resource-independent pool
+        self.cur_n, self.cur_g = np.nonzero(p.current > 0.0)
+        self.cap_n, self.cap_g = np.nonzero(p.allowed & ~(self.pooled & p.indep)[np.newaxis,:])
+        self.pool_n = np.nonzero(current_indep > 0)[0] if self.pooled else np.zeros(0,dtype=int)
+        num_nodes, G = p.allowed.shape
+        offsets = np.cumsum([4,len(self.cur_n),len(self.cap_n),G,len(self.pool_n),len(self.pool_n)])
+        E, P, T, I, J = [np.arange(start,stop) for start, stop in zip(offsets[:-1],offsets[1:])]
+        self.num_network_nodes = offsets[-1]
+        E_pos = -np.ones((num_nodes,G),dtype=int); E_pos[self.cur_n,self.cur_g] = E
+        P_pos = -np.ones((num_nodes,G),dtype=int); P_pos[self.cap_n,self.cap_g] = P
+        pool_pos = -np.ones(num_nodes,dtype=int); pool_pos[self.pool_n] = np.arange(len(self.pool_n))
+
+        # kept and swapped arcs go to P, so resource-independent types only 
+        # if not pooled
+        swap_n, swap_g, swap_gg = p.swap_arcs()
+        to_P = P_pos[swap_n,swap_gg] >= 0
+        self.swap_n, self.swap_g, self.swap_gg = swap_n[to_P], swap_g[to_P], swap_gg[to_P]
+        kept = P_pos[self.cur_n,self.cur_g] >= 0
+        self.kept_n, self.kept_g = self.cur_n[kept], self.cur_g[kept]
+        to_pool = pool_pos[self.cur_n] >= 0
+        indep_gg = np.repeat(indep[np.newaxis,:],len(self.pool_n),axis=0).ravel()
+
+        self.arcs = {}
+        arcs = [('supply',0,E,0.0,current[self.cur_n,self.cur_g]),
+                ('addition',0,2,0.0,desired.sum()),
+                ('unused',2,3,0.0,desired.sum()),
+                ('removed',E,3,1.0,current[self.cur_n,self.cur_g]),
+                ('kept',E_pos[self.kept_n,self.kept_g],P_pos[self.kept_n,self.kept_g],0.0,current[self.kept_n,self.kept_g]),
+                ('swapped',E_pos[self.swap_n,self.swap_g],P_pos[self.swap_n,self.swap_gg],
+                 p.dist[self.swap_g,self.swap_gg],current[self.swap_n,self.swap_g]),
+                ('added',2,P,1.0,desired[self.cap_g]),
+                ('capacity',P,T[self.cap_g],0.0,
+                 np.where(p.indep[self.cap_g],current_indep[self.cap_n],maximum[self.cap_n,self.cap_g])),
+                ('to_pool',E[to_pool],I[pool_pos[self.cur_n[to_pool]]],
+                 np.where(p.indep[self.cur_g[to_pool]],0.0,p.dist[self.cur_g[to_pool],indep[:1].repeat(to_pool.sum())]),
+                 current[self.cur_n[to_pool],self.cur_g[to_pool]]),
+                ('added_to_pool',2,I,1.0,desired[p.indep].sum()),
+                ('pool',I,J,0.0,current_indep[self.pool_n]),
+                ('pool_capacity',np.repeat(J,len(indep)),T[indep_gg],0.0,np.repeat(current_indep[self.pool_n],len(indep))),
+                ('desired',T,1,0.0,desired),
+                ('removal',3,1,0.0,unbounded)]
+
+        tails = []; heads = []; costs = []; capacities = []
+        start = 0
+        for name, tail, head, cost, capacity in arcs:
+            tail, head, cost, capacity = np.broadcast_arrays(*np.atleast_1d(tail,head,cost,capacity))
+            self.arcs[name] = slice(start,start + len(tail))
+            start += len(tail)
+            tails.append(tail); heads.append(head); costs.append(cost); capacities.append(capacity)
+        self.tails = np.concatenate(tails); self.heads = np.concatenate(heads)
+        self.costs = np.concatenate(costs).astype(float); self.capacities = np.concatenate(capacities)
+        # no simple path or cycle through the rest of the network costs more 
+        # than this, so leaving desired capacity unmet never saves cost
+        self.costs[self.arcs['removal']] = 1.0 + self.costs.max() * self.num_network_nodes
+        self.required = current.sum() + desired.sum()
+
+        logger.info("Match network has {} nodes and {} arcs{}.".format(
+            self.num_network_nodes,len(self.tails),
+            "" if self.pooled else ", and relaxes limit_indep_capacity"))
+
+    def start(self):
+        import time
+
+        start_time = time.perf_counter()
+        self.timed_out = False
+        try:
+            self.flows, self.flow_value, _cost = min_cost_flow(self.num_network_nodes,self.tails,self.heads,
+                                                               self.costs,self.capacities,0,1,
+                                                               time_limit=self.timeout)
+        except TimeoutError:
+            self.timed_out = True
+            return
+        if self.flow_value != self.required:
+            return
+        timeout = None if self.timeout is None else max(self.timeout - (time.perf_counter() - start_time),0.0)
+        if (self.flows[self.arcs['desired']] != self.desired_units).any():
+            logger.warning("The network flow solution does not meet desired capacity. Re-solving with ScipyModel.")
+            self.solve_fallback(timeout)
+        elif not self.pooled:
+            p = self.problem
+            capacity = self.flows[self.arcs['capacity']]
+            indep = np.bincount(self.cap_n,weights=capacity * p.indep[self.cap_g],minlength=len(p.nodes))
+            if (indep > self.current_indep_units).any():
+                logger.warning("The network flow solution violates limit_indep_capacity. Re-solving with ScipyModel.")
+                self.solve_fallback(timeout)
+
+    def wait(self,timeout=None):
+        return not self.timed_out
+
+    def solve_fallback(self,timeout):
+        self.fallback = ScipyModel(self.request,self.outdir)
+        self.fallback.setup(gendists=self.gendists,precision=self.precision)
+        self.fallback.run(timeout=timeout)
+
+    def statistics(self):
+        if self.fallback is not None:
+            return dict(self.fallback.statistics(),fallback=type(self.fallback).__name__)
+        return {'network_nodes': int(self.num_network_nodes),
+                'arcs': len(self.tails),
+                'pooled': bool(self.pooled),
+                'scale': float(self.scale)}
+
+    def collect_results(self):
+        if self.fallback is not None:
+            return self.fallback.collect_results()
+        if self.flow_value != self.required:
+            logger.error("The network flow model is infeasible. Only {} of {} units could be routed.".format(
+                self.flow_value,self.required))
+            return False
+
+        p = self.problem
+        flows = self.flows
+        capacity = [(self.cap_n,self.cap_g,flows[self.arcs['capacity']])]
+        added = [(self.cap_n,self.cap_g,flows[self.arcs['added']])]
+        kept = [(self.kept_n,self.kept_g,flows[self.arcs['kept']])]
+        swapped = [(self.swap_n,self.swap_g,self.swap_gg,flows[self.arcs['swapped']])]
+
+        if len(self.pool_n):
+            # split the flow through each pool into kept, swapped and added 
+            # capacity. within the pool all assignments cost the same, so 
+            # keep as much as possible and then fill in order
+            G = len(p.gentypes); K = len(self.pool_n)
+            pool_pos = -np.ones(len(p.nodes),dtype=int); pool_pos[self.pool_n] = np.arange(K)
+            to_pool = pool_pos[self.cur_n] >= 0
+            into = np.zeros((K,G),dtype=np.int64)
+            into[pool_pos[self.cur_n[to_pool]],self.cur_g[to_pool]] = flows[self.arcs['to_pool']]
+            indep = np.nonzero(p.indep)[0]
+            out = np.zeros((K,G),dtype=np.int64)
+            out[:,indep] = flows[self.arcs['pool_capacity']].reshape(K,len(indep))
+            capacity.append((np.repeat(self.pool_n,G),np.tile(np.arange(G),K),out.flatten()))
+
+            keep = np.minimum(into,out) * p.indep[np.newaxis,:]
+            kept.append((np.repeat(self.pool_n,G),np.tile(np.arange(G),K),keep.flatten()))
+            into -= keep; out -= keep
+
+            # sources are the remaining flows into each pool, by gentype, 
+            # followed by added capacity (label G); sinks the remaining flows 
+            # out. totals match pool by pool, so one northwest corner 
+            # assignment over all pools respects pool boundaries
+            sources = np.hstack([into,flows[self.arcs['added_to_pool']][:,np.newaxis]]).ravel()
+            source_cum = np.cumsum(sources); sink_cum = np.cumsum(out.ravel())
+            breaks = np.union1d(source_cum[sources > 0],sink_cum[out.ravel() > 0])
+            amounts = np.diff(np.concatenate([[0],breaks]))
+            source = np.searchsorted(source_cum,breaks,side='left')
+            sink = np.searchsorted(sink_cum,breaks,side='left')
+            pool = source // (G + 1); g = source % (G + 1); gg = sink % G
+            is_added = g == G
+            added.append((self.pool_n[pool[is_added]],gg[is_added],amounts[is_added]))
+            swapped.append((self.pool_n[pool[~is_added]],g[~is_added],gg[~is_added],amounts[~is_added]))
+
+        G = len(p.gentypes)
+        def combine(parts):
+            columns = [np.concatenate(values) for values in zip(*parts)]
+            keep = columns[-1] > 0
+            codes = [c[keep] for c in columns[:-1]]
+            # the same (n,g) may appear in more than one part
+            flat = np.ravel_multi_index(codes,(len(p.nodes),) + (G,) * (len(codes) - 1))
+            unique, first, inverse = np.unique(flat,return_index=True,return_inverse=True)
+            order = np.argsort(first,kind='stable')
+            values = np.bincount(inverse,weights=columns[-1][keep],minlength=len(unique))[order] / self.scale
+            return tuple(c[first[order]] for c in codes), values
+
+        parts = [capacity,added,kept,swapped]
+        results = SparseResults(p.nodes,p.gentypes,0.0)
+        for name, part in zip(results.NAMES,parts):
+            results.set(name,*combine(part))
+        # whatever is not kept or swapped is removed. computing this from the 
+        # unrounded current capacity, rather than from the flows, keeps 
+        # rounding out of the distance
+        used = np.zeros(p.current.shape)
+        np.add.at(used,results.codes['capacity_kept'],results.values['capacity_kept'])
+        np.add.at(used,results.codes['capacity_swapped'][:2],results.values['capacity_swapped'])
+        removed = np.maximum(p.current - used,0.0)[self.cur_n,self.cur_g]
+        results.set('capacity_removed',(self.cur_n,self.cur_g),
+                    np.where(removed > ScipyModel.ZERO_TOLERANCE,removed,0.0))
+        distance = results.values['capacity_added'].sum() + results.values['capacity_removed'].sum()
+        _n, from_g, to_g = results.codes['capacity_swapped']
+        distance += (results.values['capacity_swapped'] * p.dist[from_g,to_g]).sum()
+        results.distance = distance
+        self.request.register_sparse_results(results)
 
         return True
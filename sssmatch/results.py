@@ -0,0 +1,370 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import json
+import os
+import re
+from io import StringIO
+
+import numpy as np
+import pandas as pds
+
+from sssmatch import OutputFormat
+
+RESULT_FILE_EXTENSIONS = {OutputFormat.PARQUET: '.parquet',
+                          OutputFormat.HDF5: '.h5'}
+# parquet key-value metadata in which the result summary and distance are 
+# stored
+PARQUET_METADATA_KEY = b'sssmatch'
+
+
+class SparseResults(object):
+    """
+    The nonzero results of a match as integer-coded arrays. Each result is 
+    a tuple of node and generator type codes, indices into nodes and 
+    gentypes, and a matching array of capacities in MW. DataFrames in 
+    Request.generators_columns (or generators_swapped_columns) format are 
+    only built when asked for.
+    """
+    NAMES = ['capacity','capacity_added','capacity_kept','capacity_swapped','capacity_removed']
+    # position of each column among the codes
+    CODE_POSITIONS = {'node_id': 0,
+                      'generator type': 1,
+                      'from generator type': 1,
+                      'to generator type': 2}
+
+    def __init__(self,nodes,gentypes,distance):
+        """
+        :param nodes: array of node ids that node codes index into
+        :param gentypes: array of generator types that generator type codes 
+            index into
+        :param distance: the objective function value
+        """
+        self.nodes = None if nodes is None else np.asarray(nodes)
+        self.gentypes = None if gentypes is None else np.asarray(gentypes,dtype=object)
+        self.distance = distance
+        self.codes = {}
+        self.values = {}
+        self._dataframes = {}
+
+    @classmethod
+    def from_dataframes(cls,capacity,capacity_added,capacity_kept,
+                        capacity_swapped,capacity_removed,distance,
+                        nodes=None,gentypes=None):
+        """
+        Wraps results that are already DataFrames, see 
+        Request.register_results. nodes and gentypes are only needed to 
+        encode them with arrays.
+        """
+        result = cls(nodes,gentypes,distance)
+        result._dataframes = dict(zip(cls.NAMES,[capacity,capacity_added,capacity_kept,
+                                                 capacity_swapped,capacity_removed]))
+        return result
+
+    @classmethod
+    def columns(cls,name):
+        from sssmatch.request import Request
+        if name == 'capacity_swapped':
+            return Request.generators_swapped_columns()
+        return Request.generators_columns()
+
+    def set(self,name,codes,values):
+        """
+        Stores result name, dropping entries that are not positive.
+
+        :param codes: tuple of integer arrays, (n, g) or for 
+            capacity_swapped (n, g, gg)
+        :param values: array of capacities in MW
+        """
+        values = np.asarray(values,dtype=float)
+        keep = values > 0.0
+        self.codes[name] = tuple(np.asarray(c)[keep].astype(np.int32) for c in codes)
+        self.values[name] = values[keep]
+        self._dataframes.pop(name,None)
+
+    def dataframe(self,name):
+        if name not in self._dataframes:
+            codes = self.codes[name]
+            data = [self.nodes[codes[0]]] + [self.gentypes[c] for c in codes[1:]] + [self.values[name]]
+            columns = self.columns(name)
+            self._dataframes[name] = pds.DataFrame(dict(zip(columns,data)),columns=columns)
+        return self._dataframes[name]
+
+    def arrays(self,name):
+        """
+        Returns result name as (codes, values), see set. Results stored as 
+        arrays are returned without copying; results registered as 
+        DataFrames are encoded against nodes and gentypes.
+        """
+        if name not in self.codes:
+            df = self.dataframe(name)
+            columns = self.columns(name)
+            codes = [pds.Index(self.nodes).get_indexer(df[columns[0]])] + \
+                    [pds.Index(self.gentypes).get_indexer(df[column]) for column in columns[1:-1]]
+            self.codes[name] = tuple(c.astype(np.int32) for c in codes)
+            self.values[name] = df[columns[-1]].values.astype(float)
+        return self.codes[name], self.values[name]
+
+    def totals(self,name,column='generator type'):
+        """
+        Returns the capacity of result name summed by column, as a 
+        pandas.Series.
+        """
+        if name not in self.codes:
+            df = self.dataframe(name)
+            return df.groupby(column)[self.columns(name)[-1]].sum()
+        codes = self.codes[name][self.CODE_POSITIONS[column]]
+        labels = self.nodes if column == 'node_id' else self.gentypes
+        sums = np.bincount(codes,weights=self.values[name],minlength=len(labels))
+        present = np.bincount(codes,minlength=len(labels)) > 0
+        return pds.Series(sums[present],index=pds.Index(labels[present],name=column))
+
+
+class MatchResult(object):
+    """
+    The results of Request.fulfill: capacity, capacity_added, capacity_kept, 
+    capacity_swapped and capacity_removed, the distance (objective function 
+    value), the result_summary by generator type, and statistics about how 
+    the match was solved. Results are held as SparseResults, so to_arrays 
+    returns the solver's integer-coded arrays as-is, and DataFrames are only 
+    built when asked for. Nothing is written to disk until save is called.
+    """
+
+    def __init__(self,sparse_results,result_summary,nodes,statistics=None,
+                 aggregation_report=None):
+        """
+        :param sparse_results: SparseResults
+        :param result_summary: pandas.DataFrame, see 
+            Request.compile_result_summary
+        :param nodes: pandas.DataFrame of the matched system's nodes, used 
+            for the R2PD inputs in csv output
+        :param statistics: dict of solver statistics
+        :param aggregation_report: pandas.Series or None, see 
+            Request.solve_aggregated
+        """
+        self.sparse_results = sparse_results
+        self.result_summary = result_summary
+        self.nodes = nodes
+        self.statistics = statistics if statistics is not None else {}
+        self.aggregation_report = aggregation_report
+
+    @classmethod
+    def from_request(cls,request):
+        return cls(request.sparse_results,request.result_summary,request.nodes,
+                   statistics=getattr(request,'solver_statistics',None),
+                   aggregation_report=getattr(request,'aggregation_report',None))
+
+    @property
+    def distance(self):
+        return self.sparse_results.distance
+
+    @property
+    def capacity(self):
+        return self.sparse_results.dataframe('capacity')
+
+    @property
+    def capacity_added(self):
+        return self.sparse_results.dataframe('capacity_added')
+
+    @property
+    def capacity_kept(self):
+        return self.sparse_results.dataframe('capacity_kept')
+
+    @property
+    def capacity_swapped(self):
+        return self.sparse_results.dataframe('capacity_swapped')
+
+    @property
+    def capacity_removed(self):
+        return self.sparse_results.dataframe('capacity_removed')
+
+    @property
+    def node_ids(self):
+        """
+        Array of node ids that the node codes of to_arrays index into.
+        """
+        return self.sparse_results.nodes
+
+    @property
+    def gentypes(self):
+        """
+        Array of generator types that the generator type codes of to_arrays 
+        index into.
+        """
+        return self.sparse_results.gentypes
+
+    def to_arrays(self,name):
+        """
+        Returns result name, one of SparseResults.NAMES, as a tuple of 
+        integer code arrays, (n, g) or for capacity_swapped (n, g, gg), and 
+        an array of capacities in MW.
+        """
+        return self.sparse_results.arrays(name)
+
+    def to_dataframes(self):
+        """
+        Returns a dict of the results as DataFrames, see result_tables.
+        """
+        return result_tables(self)
+
+    def save(self,outdir,output_format=OutputFormat.CSV):
+        """
+        Saves the results to outdir. OutputFormat.CSV writes 
+        new_generators.csv, a csv per result in match_details, and R2PD 
+        inputs per technology. The other formats write all results and the 
+        result summary to one results.parquet or results.h5 file, see 
+        save_result_tables, and no R2PD inputs.
+        """
+        if not os.path.exists(outdir):
+            os.mkdir(outdir)
+        if output_format != OutputFormat.CSV:
+            filename = os.path.join(outdir,'results' + RESULT_FILE_EXTENSIONS[output_format])
+            if os.path.exists(filename):
+                os.remove(filename)
+            save_result_tables(result_tables(self),filename,output_format)
+            return
+
+        from sssmatch.request import Request
+
+        self.capacity.to_csv(os.path.join(outdir,'new_generators.csv'),index=False)
+
+        details_dir = os.path.join(outdir,'match_details')
+        if not os.path.exists(details_dir):
+            os.mkdir(details_dir)
+        for name in SparseResults.NAMES:
+            getattr(self,name).to_csv(os.path.join(details_dir,name + '.csv'),index=False)
+
+        for gentype, r2pd_call in Request.R2PD_TECHS_MAP.items():
+            r2pd_dir = os.path.join(outdir,"_".join(r2pd_call))
+            df = self.capacity[self.capacity['generator type'] == gentype][['node_id','capacity (MW)']]
+            if df.empty:
+                continue
+            if not os.path.exists(r2pd_dir):
+                os.mkdir(r2pd_dir)
+            df.to_csv(os.path.join(r2pd_dir,'generators.csv'),index=False)
+            self.nodes.iloc[:,:3].to_csv(os.path.join(r2pd_dir,'nodes.csv'),index=False)
+
+
+def result_tables(request):
+    """
+    Returns a dict of the results of a fulfilled request (or MatchResult): 
+    a DataFrame for each of SparseResults.NAMES, plus result_summary and 
+    distance.
+    """
+    result = {name: getattr(request,name) for name in SparseResults.NAMES}
+    result['result_summary'] = request.result_summary
+    result['distance'] = request.distance
+    return result
+
+
+def _hdf_prefix(key):
+    if not key:
+        return ''
+    return ''.join('/{}_{}'.format(name,re.sub(r'\W','_',str(value))) for name, value in key)
+
+
+def _parquet_path(filename,key):
+    if not key:
+        return filename
+    # hive-style partitions, so that the store can be read as one dataset
+    parts = ['{}={}'.format(name,value) for name, value in key]
+    return os.path.join(filename,*parts,'results.parquet')
+
+
+def save_result_tables(tables,filename,output_format,key=None):
+    """
+    Saves tables, see result_tables, to filename.
+
+    With OutputFormat.HDF5 each table is stored under its own key in the 
+    file. With OutputFormat.PARQUET the capacity tables are stacked into 
+    one long table with a 'result' column, whose 'generator type' is the 
+    type swapped to for capacity_swapped rows, and the result summary and 
+    distance are kept in the file's metadata.
+
+    :param key: None, or a list of (name, value) pairs that identify the run 
+        within a store of many runs, e.g. [('scenario','Mid_Case'),
+        ('scenario_year','2030')]. For HDF5 the tables are then stored under 
+        a group per pair in filename; for PARQUET filename is the root 
+        directory of a partitioned dataset with one file per run.
+    """
+    if output_format == OutputFormat.HDF5:
+        prefix = _hdf_prefix(key)
+        with pds.HDFStore(filename,mode='a',complevel=9,complib='blosc') as store:
+            for name in SparseResults.NAMES + ['result_summary']:
+                store.put(prefix + '/' + name,tables[name],format='table')
+            store.get_storer(prefix + '/result_summary').attrs.distance = tables['distance']
+        return
+
+    assert output_format == OutputFormat.PARQUET
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _parquet_path(filename,key)
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname,exist_ok=True)
+    frames = []
+    for name in SparseResults.NAMES:
+        df = tables[name]
+        if name == 'capacity_swapped':
+            df = df.rename(columns={'to generator type': 'generator type'})
+        frames.append(df.assign(result=name))
+    df = pds.concat(frames,ignore_index=True,sort=False)
+    columns = ['result','node_id','from generator type','generator type','capacity (MW)']
+    df = df.reindex(columns=columns)
+    df['result'] = pds.Categorical(df['result'],categories=SparseResults.NAMES)
+    table = pa.Table.from_pandas(df,preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[PARQUET_METADATA_KEY] = json.dumps({
+        'result_summary': tables['result_summary'].to_json(orient='split'),
+        'distance': float(tables['distance'])}).encode('utf-8')
+    pq.write_table(table.replace_schema_metadata(metadata),path,compression='zstd')
+
+
+def load_result_tables(filename,output_format,key=None):
+    """
+    Returns the tables saved by save_result_tables.
+    """
+    result = {}
+    if output_format == OutputFormat.HDF5:
+        prefix = _hdf_prefix(key)
+        with pds.HDFStore(filename,mode='r') as store:
+            for name in SparseResults.NAMES:
+                # empty tables are not stored in table format
+                result[name] = store.get(prefix + '/' + name) if (prefix + '/' + name) in store else \
+                    pds.DataFrame(columns=SparseResults.columns(name))
+            result['result_summary'] = store.get(prefix + '/result_summary')
+            result['distance'] = store.get_storer(prefix + '/result_summary').attrs.distance
+        return result
+
+    assert output_format == OutputFormat.PARQUET
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(_parquet_path(filename,key))
+    metadata = json.loads(table.schema.metadata[PARQUET_METADATA_KEY].decode('utf-8'))
+    df = table.to_pandas()
+    df['result'] = df['result'].astype(str)
+    for name in SparseResults.NAMES:
+        columns = SparseResults.columns(name)
+        tmp = df[df['result'] == name]
+        if name == 'capacity_swapped':
+            tmp = tmp.rename(columns={'generator type': 'to generator type'})
+        result[name] = tmp[columns].reset_index(drop=True)
+    result['result_summary'] = pds.read_json(StringIO(metadata['result_summary']),orient='split')
+    result['distance'] = metadata['distance']
+    return result
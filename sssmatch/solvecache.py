@@ -0,0 +1,143 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import hashlib
+import logging
+import os
+import pickle
+
+import numpy as np
+
+from sssparser.DatasetCache import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# bump when the stored results or the meaning of the key change
+CACHE_VERSION = 1
+
+
+class SolveCache(object):
+    """
+    Cache of match results keyed by the SHA-1 of the normalized model inputs 
+    (see ProblemArrays) and the AML used to solve them. Each entry is a 
+    pickle of the Request.register_results arguments in cache_dir/solves. 
+    Entries are evicted least recently used first once there are more than 
+    max_entries of them or they take up more than max_bytes.
+    """
+    DEFAULT_MAX_BYTES = 1 << 30
+
+    def __init__(self,cache_dir=None,max_bytes=DEFAULT_MAX_BYTES,max_entries=None):
+        """
+        Parameters
+        ----------
+        cache_dir : None or str
+            Root cache directory. Defaults to default_cache_dir().
+        max_bytes : None or int
+            Maximum total size of the cached results. None for no limit.
+        max_entries : None or int
+            Maximum number of cached results. None for no limit.
+        """
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.solves_dir = os.path.join(self.cache_dir,'solves')
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        if not os.path.exists(self.solves_dir):
+            os.makedirs(self.solves_dir,exist_ok=True)
+
+    @classmethod
+    def key(cls,problem,aml):
+        """
+        Returns the hex digest identifying the solution of problem 
+        (ProblemArrays) by aml (AML).
+        """
+        h = hashlib.sha1()
+        h.update("{}|{}|".format(CACHE_VERSION,aml.name).encode('utf-8'))
+        for labels in [problem.nodes,problem.gentypes]:
+            h.update('\n'.join(str(label) for label in labels).encode('utf-8'))
+            h.update(b'\0')
+        for values in [problem.indep,problem.desired,problem.current,problem.maximum,
+                       problem.minimum,problem.dist]:
+            values = np.ascontiguousarray(values)
+            h.update("{}{}".format(values.dtype.str,values.shape).encode('utf-8'))
+            h.update(values.tobytes())
+        return h.hexdigest()
+
+    def get(self,key):
+        """
+        Returns the cached register_results arguments for key, or None.
+        """
+        path = self.__path(key)
+        try:
+            with open(path,'rb') as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug("Unable to load {}: {}".format(path,e))
+            return None
+        try:
+            # mark as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self,key,results):
+        """
+        Stores results, the register_results arguments, under key and 
+        evicts entries as needed.
+        """
+        path = self.__path(key)
+        tmp_path = "{}.{}.tmp".format(path,os.getpid())
+        with open(tmp_path,'wb') as f:
+            pickle.dump(results,f,protocol=pickle.HIGHEST_PROTOCOL)
+        # other processes see either no entry or a complete one
+        os.replace(tmp_path,path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for filename in os.listdir(self.solves_dir):
+            if not filename.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.solves_dir,filename))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime,stat.st_size,filename))
+        entries.sort(reverse=True)
+
+        total = 0
+        for i, (_mtime, size, filename) in enumerate(entries):
+            total += size
+            if ((self.max_entries is None) or (i < self.max_entries)) and \
+               ((self.max_bytes is None) or (total <= self.max_bytes)):
+                continue
+            logger.debug("Evicting {} from the solve cache".format(filename))
+            try:
+                os.remove(os.path.join(self.solves_dir,filename))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for filename in os.listdir(self.solves_dir):
+            if filename.endswith('.pkl'):
+                os.remove(os.path.join(self.solves_dir,filename))
+
+    def __path(self,key):
+        return os.path.join(self.solves_dir,key + '.pkl')
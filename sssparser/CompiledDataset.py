@@ -0,0 +1,220 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pds
+
+from sssparser import SSSParserError
+from .DataConfig import DEFAULT_SCENARIO_DATA_DIRNAME, DEFAULT_COMPILED_DATA_DIRNAME
+from .ParseScenarios import list_scenario_data_files
+
+logger = logging.getLogger(__name__)
+
+COMPILED_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+VALUES_FILENAME = 'values.npy'
+CODES_FILENAME = 'codes.npy'
+
+
+def compile_dataset(dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME,
+                    compiled_data_dirname=DEFAULT_COMPILED_DATA_DIRNAME):
+    """
+    Parses every file in the dataset's scenario data directory once and 
+    writes the result to compiled_data_dirname in a columnar binary format 
+    that CompiledDataset can memory-map:
+
+        - values.npy: float64 array holding the 'value' column of every file, 
+          stacked in manifest order
+        - codes.npy: int32 array with one row per value and one column per 
+          non-value column slot, holding indices into the manifest's label 
+          table (-1 if the slot is not used by the file or the entry is 
+          missing)
+        - manifest.json: label table, and per-file column names, column 
+          types, row ranges, and source file sizes and modification times, 
+          and the dataset metadata (see ScenariosDataset.metadata)
+
+    Parameters
+    ----------
+    dataset_dir : str
+        Path to the dataset, e.g. 'sssmixes/NREL Standard Scenarios 2018'
+    scenario_data_dirname : str
+        Name of the directory within dataset_dir that holds the csv files
+    compiled_data_dirname : str
+        Name of the directory within dataset_dir to write to
+
+    Returns
+    -------
+    str
+        Path to the compiled data directory
+    """
+    scenario_data_dir = os.path.join(dataset_dir,scenario_data_dirname)
+    compiled_data_dir = os.path.join(dataset_dir,compiled_data_dirname)
+
+    label_ids = {}
+    files = []; values = []; codes = []
+    n = 0
+    for filename in sorted(list_scenario_data_files(scenario_data_dir)):
+        fp = os.path.join(scenario_data_dir,filename)
+        df = pds.read_csv(fp)
+        columns = [col for col in df.columns if col != 'value']
+        file_codes = []
+        for col in columns:
+            col_codes, uniques = pds.factorize(df[col])
+            uniques = [label_ids.setdefault(str(u),len(label_ids)) for u in uniques]
+            # missing entries are coded -1 by factorize, which picks the appended -1
+            file_codes.append(np.asarray(uniques + [-1],dtype=np.int32)[col_codes])
+        stat = os.stat(fp)
+        files.append({'name': filename,
+                      'size': stat.st_size,
+                      'mtime': stat.st_mtime,
+                      'columns': list(df.columns),
+                      'int_columns': [col for col in columns if pds.api.types.is_integer_dtype(df[col])],
+                      'start': n,
+                      'stop': n + len(df.index)})
+        n += len(df.index)
+        values.append(df['value'].values.astype(np.float64))
+        codes.append(file_codes)
+
+    width = max([len(file_codes) for file_codes in codes] + [1])
+    all_codes = np.full((n,width),-1,dtype=np.int32)
+    for entry, file_codes in zip(files,codes):
+        for j, col_codes in enumerate(file_codes):
+            all_codes[entry['start']:entry['stop'],j] = col_codes
+    labels = sorted(label_ids,key=label_ids.get)
+
+    if not os.path.exists(compiled_data_dir):
+        os.mkdir(compiled_data_dir)
+    np.save(os.path.join(compiled_data_dir,VALUES_FILENAME),
+            np.concatenate(values) if values else np.zeros(0))
+    np.save(os.path.join(compiled_data_dir,CODES_FILENAME),all_codes)
+    # manifest is written last so that an interrupted compile reads as stale
+    manifest = {'version': COMPILED_FORMAT_VERSION,
+                'scenario_data_dirname': scenario_data_dirname,
+                'labels': labels,
+                'files': files}
+    manifest_path = os.path.join(compiled_data_dir,MANIFEST_FILENAME)
+    with open(manifest_path,'w') as f:
+        json.dump(manifest,f)
+
+    # add the dataset metadata, computed from the just-compiled data, so that 
+    # it can be looked up without reading any data
+    from .ScenariosDataset import ScenariosDataset
+    manifest['metadata'] = ScenariosDataset(dataset_dir,scenario_data_dirname=scenario_data_dirname).metadata
+    with open(manifest_path,'w') as f:
+        json.dump(manifest,f)
+    logger.info("Compiled {} files ({} values) from {} into {}".format(
+        len(files),n,scenario_data_dir,compiled_data_dir))
+    return compiled_data_dir
+
+
+class CompiledDataset(object):
+    """
+    Read access to the output of compile_dataset. The arrays are 
+    memory-mapped, so only the rows of files that are actually read are 
+    paged in.
+    """
+
+    def __init__(self,dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME,
+                 compiled_data_dirname=DEFAULT_COMPILED_DATA_DIRNAME):
+        self.scenario_data_dir = os.path.join(dataset_dir,scenario_data_dirname)
+        self.compiled_data_dir = os.path.join(dataset_dir,compiled_data_dirname)
+        self.scenario_data_dirname = scenario_data_dirname
+
+        manifest_path = os.path.join(self.compiled_data_dir,MANIFEST_FILENAME)
+        if not os.path.exists(manifest_path):
+            raise SSSParserError("No compiled data found in {}".format(self.compiled_data_dir))
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        self.__files = {entry['name']: entry for entry in self.manifest['files']}
+        self.__labels = None
+        self.__values = None
+        self.__codes = None
+
+    @classmethod
+    def load(cls,dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME,
+             compiled_data_dirname=DEFAULT_COMPILED_DATA_DIRNAME):
+        """
+        Returns a CompiledDataset if one exists for dataset_dir and is 
+        up-to-date with the csv files, otherwise returns None.
+        """
+        try:
+            result = cls(dataset_dir,scenario_data_dirname=scenario_data_dirname,
+                         compiled_data_dirname=compiled_data_dirname)
+        except SSSParserError:
+            return None
+        if not result.is_current:
+            logger.info("Compiled data in {} is stale. Reading csv files instead. ".format(result.compiled_data_dir) + 
+                        "Call sssm.py dataset compile to refresh it.")
+            return None
+        return result
+
+    @property
+    def is_current(self):
+        """
+        True if the compiled data matches the format version and the names, 
+        sizes, and modification times of the files in the scenario data 
+        directory.
+        """
+        if self.manifest.get('version') != COMPILED_FORMAT_VERSION:
+            return False
+        if self.manifest.get('scenario_data_dirname') != self.scenario_data_dirname:
+            return False
+        filenames = list_scenario_data_files(self.scenario_data_dir)
+        if len(filenames) != len(self.__files):
+            return False
+        for filename in filenames:
+            entry = self.__files.get(filename)
+            if entry is None:
+                return False
+            stat = os.stat(os.path.join(self.scenario_data_dir,filename))
+            if (stat.st_size != entry['size']) or (stat.st_mtime != entry['mtime']):
+                return False
+        return True
+
+    def __load_arrays(self):
+        if self.__values is None:
+            self.__labels = np.array(self.manifest['labels'] + [np.nan],dtype=object)
+            self.__values = np.load(os.path.join(self.compiled_data_dir,VALUES_FILENAME),mmap_mode='r')
+            self.__codes = np.load(os.path.join(self.compiled_data_dir,CODES_FILENAME),mmap_mode='r')
+
+    def read(self,fp):
+        """
+        Returns the data for the scenario data file fp as a pandas.DataFrame 
+        with the same columns as pandas.read_csv(fp).
+        """
+        entry = self.__files.get(os.path.basename(fp))
+        if entry is None:
+            raise SSSParserError("{} is not in the compiled data in {}".format(fp,self.compiled_data_dir))
+        self.__load_arrays()
+        start, stop = entry['start'], entry['stop']
+        codes = self.__codes[start:stop]
+        data = {}; j = 0
+        for col in entry['columns']:
+            if col == 'value':
+                data[col] = np.array(self.__values[start:stop])
+                continue
+            # -1 indexes the trailing nan label
+            data[col] = self.__labels[codes[:,j]]
+            if col in entry['int_columns']:
+                data[col] = data[col].astype(np.int64)
+            j += 1
+        return pds.DataFrame(data,columns=entry['columns'])
@@ -25,6 +25,7 @@ logger = logging.getLogger(__name__)
 FIPS_PATH = '../data/spatial/state_fips_codes.csv'
 
 DEFAULT_SCENARIO_DATA_DIRNAME = 'ScenarioData'
+DEFAULT_COMPILED_DATA_DIRNAME = 'CompiledData'
 
 
 class DataConfig(list):
@@ -36,36 +37,42 @@ class DataConfig(list):
         self.fp = fp
 
         self.headers = None
+        self.__index = {}
         self.fetch()
 
     def fetch(self):
-        with open(self.fp, 'rU') as f:
+        with open(self.fp, newline='') as f:
             reader = csv.DictReader(f)
 
             self.headers = reader.fieldnames
             for row in reader:
                 self.append(row)
 
+        # position of the first config with each id
+        self.__index = {}
+        for i, d in enumerate(self):
+            self.__index.setdefault(d['id'], i)
+
     @property
     def ids(self):
         return [d['id'] for d in self]
 
     def find_by_id(self, config_id):
-
-        def id_matches(config_id, candidate):
-            if config_id == candidate:
-                return True
-            elif config_id.startswith('X'):
-                return config_id[1:] == candidate
-            return False
-
-        try:
-            config = next(d for d in self if id_matches(config_id,d['id']))
-        except StopIteration:
-            logger.error("{} not found in {}".format(config_id, [d['id'] for d in self]))
-            config = None
-
-        return config
+        """
+        Returns the first config whose id is config_id, or, if config_id 
+        starts with 'X', config_id[1:]. Returns None if there is no such 
+        config.
+        """
+        positions = [self.__index.get(config_id)]
+        if config_id.startswith('X'):
+            positions.append(self.__index.get(config_id[1:]))
+        positions = [i for i in positions if i is not None]
+
+        if not positions:
+            logger.error("{} not found in {}".format(config_id, self.ids))
+            return None
+
+        return self[min(positions)]
 
 
 class ConfigSet(object):
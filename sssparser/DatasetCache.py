@@ -0,0 +1,181 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import hashlib
+import json
+import logging
+import os
+import weakref
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV_VAR = 'SSSMATCH_CACHE_DIR'
+
+
+def default_cache_dir():
+    """
+    Returns the directory in which sssmatch caches data between processes: 
+    $SSSMATCH_CACHE_DIR if set, otherwise sssmatch in $XDG_CACHE_HOME 
+    (~/.cache by default).
+    """
+    if os.environ.get(CACHE_DIR_ENV_VAR):
+        return os.environ[CACHE_DIR_ENV_VAR]
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),'.cache')
+    return os.path.join(cache_home,'sssmatch')
+
+
+def file_hash(fp):
+    """
+    Returns the hex SHA-1 digest of the contents of fp.
+    """
+    h = hashlib.sha1()
+    with open(fp,'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20),b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest_files(manifest_path):
+    """
+    Returns the file entries of the manifest at manifest_path, or {}.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f).get('files',{})
+    except ValueError:
+        logger.warning("Ignoring unreadable cache manifest {}".format(manifest_path))
+        return {}
+
+
+def write_manifest(manifest_path,manifest,changed):
+    """
+    Merges changed into the file entries on disk and writes manifest to 
+    manifest_path atomically, if changed is not empty. manifest and changed 
+    are updated in place.
+    """
+    if not changed:
+        return
+    files = load_manifest_files(manifest_path)
+    files.update(changed)
+    manifest['files'] = files
+    tmp_path = "{}.{}.tmp".format(manifest_path,os.getpid())
+    try:
+        with open(tmp_path,'w') as f:
+            json.dump(manifest,f)
+        # other processes see either the old manifest or the new one
+        os.replace(tmp_path,manifest_path)
+    except OSError as e:
+        logger.warning("Unable to write cache manifest {}: {}".format(manifest_path,e))
+        return
+    changed.clear()
+
+
+class DatasetCache(object):
+    """
+    Reader (see ScenarioFile.read) that keeps a parsed copy of each file it 
+    reads in a user-level cache directory. Copies are stored by the SHA-1 of 
+    the file contents, and a manifest per scenario data directory records 
+    each file's size, modification time, and hash. A file whose size and 
+    modification time match the manifest is loaded from the cache directly; 
+    otherwise it is hashed, and only parsed again if its contents changed.
+
+    Changes to the manifest are kept in memory until flush is called, so 
+    that it is written once after a set of files has been read rather than 
+    after every cache miss. flush is also called when the DatasetCache is 
+    garbage collected, or at exit.
+    """
+
+    def __init__(self,scenario_data_dir,cache_dir=None):
+        """
+        Parameters
+        ----------
+        scenario_data_dir : str
+            Directory holding the csv files to be read
+        cache_dir : None or str
+            Root cache directory. Defaults to default_cache_dir().
+        """
+        self.scenario_data_dir = os.path.abspath(scenario_data_dir)
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+        self.objects_dir = os.path.join(self.cache_dir,'datasets','objects')
+        manifests_dir = os.path.join(self.cache_dir,'datasets','manifests')
+        for dirname in [self.objects_dir,manifests_dir]:
+            if not os.path.exists(dirname):
+                os.makedirs(dirname,exist_ok=True)
+        key = hashlib.sha1(self.scenario_data_dir.encode('utf-8')).hexdigest()
+        self.manifest_path = os.path.join(manifests_dir,key + '.json')
+        self.manifest = {'scenario_data_dir': self.scenario_data_dir, 'files': {}}
+        self.manifest['files'].update(load_manifest_files(self.manifest_path))
+        self.changed = {}
+        # holds no reference to self, so does not keep it alive
+        self._finalizer = weakref.finalize(self,write_manifest,self.manifest_path,self.manifest,self.changed)
+
+    def read(self,fp):
+        """
+        Returns the same pandas.DataFrame as pandas.read_csv(fp), from the 
+        cache if possible.
+        """
+        filename = os.path.basename(fp)
+        stat = os.stat(fp)
+        entry = self.manifest['files'].get(filename)
+        if (entry is not None) and (entry['size'] == stat.st_size) and (entry['mtime'] == stat.st_mtime):
+            result = self.__load(entry['sha1'])
+            if result is not None:
+                return result
+
+        digest = file_hash(fp)
+        result = self.__load(digest)
+        if result is None:
+            # pandas is imported where used so that the cli can import this 
+            # module without loading it
+            import pandas as pds
+            logger.debug("Caching {}".format(fp))
+            result = pds.read_csv(fp)
+            object_path = self.__object_path(digest)
+            tmp_path = "{}.{}.tmp".format(object_path,os.getpid())
+            result.to_pickle(tmp_path)
+            # other processes see either no object or a complete one
+            os.replace(tmp_path,object_path)
+
+        entry = {'size': stat.st_size,'mtime': stat.st_mtime,'sha1': digest}
+        self.manifest['files'][filename] = entry
+        self.changed[filename] = entry
+        return result
+
+    def flush(self):
+        """
+        Writes the manifest if any entries changed since it was last written. 
+        Entries written by other processes in the meantime are kept.
+        """
+        write_manifest(self.manifest_path,self.manifest,self.changed)
+
+    def __object_path(self,digest):
+        return os.path.join(self.objects_dir,digest + '.pkl')
+
+    def __load(self,digest):
+        object_path = self.__object_path(digest)
+        if not os.path.exists(object_path):
+            return None
+        import pandas as pds
+        try:
+            return pds.read_pickle(object_path)
+        except Exception as e:
+            # e.g. written by an incompatible version of pandas
+            logger.debug("Unable to load {}: {}".format(object_path,e))
+            return None
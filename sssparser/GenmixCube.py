@@ -0,0 +1,155 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import logging
+
+import numpy as np
+import pandas as pds
+
+logger = logging.getLogger(__name__)
+
+
+class GenmixCube(object):
+    """
+    Dense array of the generation mix data in a ScenariosDataset, indexed 
+    [scenario, geography, year, gentype, attribute]. Entries that are not in 
+    the dataset are NaN.
+    """
+
+    def __init__(self,scenarios,geographies,years,gentypes,attributes,
+                 attribute_labels,values,available,attribute_order=None):
+        """
+        Parameters
+        ----------
+        scenarios : list of str
+            Scenario ids
+        geographies : list of str
+            'national' followed by state ids
+        years : list of str
+        gentypes : list of str
+        attributes : list of str
+            Attribute ids, e.g. ScenariosDataset.GENMIX_ATTRIBUTES
+        attribute_labels : list of str
+            Column label to use for each attribute, e.g. 'Capacity (GW)'
+        values : numpy.ndarray
+            Array of shape (len(scenarios), len(geographies), len(years), 
+            len(gentypes), len(attributes))
+        available : numpy.ndarray
+            Boolean array of shape (len(scenarios), 2, len(attributes)) that 
+            is True if the dataset has national (index 0) or state (index 1) 
+            data for the scenario and attribute
+        attribute_order : None or numpy.ndarray
+            Integer array of the same shape as available giving the position 
+            of each available attribute among the dataset's files for the 
+            scenario and spatial resolution, which is the column order of 
+            ScenariosDataset.get_genmix. Defaults to the order of attributes.
+        """
+        self.scenarios = list(scenarios)
+        self.geographies = list(geographies)
+        self.years = list(years)
+        self.gentypes = list(gentypes)
+        self.attributes = list(attributes)
+        self.attribute_labels = list(attribute_labels)
+        self.values = values
+        self.available = available
+        if attribute_order is None:
+            attribute_order = np.broadcast_to(np.arange(len(self.attributes)),available.shape)
+        self.attribute_order = attribute_order
+
+        self.__scenario_index = {scenario: i for i, scenario in enumerate(self.scenarios)}
+        self.__geography_index = {geography: i for i, geography in enumerate(self.geographies)}
+        self.__year_index = {year: i for i, year in enumerate(self.years)}
+
+    @classmethod
+    def from_dataset(cls,dataset):
+        """
+        Reads all of dataset's national and state-level files for the 
+        attributes in dataset.GENMIX_ATTRIBUTES and stores them in a new 
+        GenmixCube.
+        """
+        scenarios = dataset.scenarios
+        attributes = dataset.GENMIX_ATTRIBUTES
+        spatial_resolutions = ['national','states']
+
+        entries = []; attribute_labels = {}
+        gentypes = set(); states = set()
+        for i, scenario_id in enumerate(scenarios):
+            for f in dataset.find_files(scenario_id=scenario_id):
+                if (f.attribute_id not in attributes) or (f.spatial_resolution_id not in spatial_resolutions):
+                    continue
+                data = dataset._get_series(f)
+                gentype_level = f.additional_columns[0]
+                attribute_labels[f.attribute_id] = "{} ({})".format(f.attribute['label'],f.attribute['units'])
+                gentypes.update(data.index.get_level_values(gentype_level).unique())
+                if f.spatial_resolution_id == 'states':
+                    states.update(data.index.get_level_values('gid').unique())
+                entries.append((i,f,data,gentype_level))
+        years = dataset.years
+        geographies = ['national'] + sorted(states)
+        gentypes = sorted(gentypes)
+
+        values = np.full((len(scenarios),len(geographies),len(years),len(gentypes),len(attributes)),np.nan)
+        available = np.zeros((len(scenarios),len(spatial_resolutions),len(attributes)),dtype=bool)
+        attribute_order = np.zeros(available.shape,dtype=int)
+        geography_index = pds.Index(geographies)
+        year_index = pds.Index(years)
+        gentype_index = pds.Index(gentypes)
+        for i, f, data, gentype_level in entries:
+            k = attributes.index(f.attribute_id)
+            res = spatial_resolutions.index(f.spatial_resolution_id)
+            if not available[i,res,k]:
+                # entries are in the dataset's file order
+                attribute_order[i,res,k] = available[i,res].sum()
+                available[i,res,k] = True
+            if res == 1:
+                geo = geography_index.get_indexer(data.index.get_level_values('gid'))
+            else:
+                geo = np.zeros(len(data.index),dtype=int)
+            yr = year_index.get_indexer(data.index.get_level_values('time'))
+            gen = gentype_index.get_indexer(data.index.get_level_values(gentype_level))
+            keep = yr >= 0
+            values[i,geo[keep],yr[keep],gen[keep],k] = data.values[keep]
+        logger.debug("Built generation mix cube of shape {}".format(values.shape))
+
+        return cls(scenarios,geographies,years,gentypes,attributes,
+                   [attribute_labels.get(attribute,attribute) for attribute in attributes],
+                   values,available,attribute_order=attribute_order)
+
+    def get_genmix(self,year,scenario_id,geography_ids):
+        """
+        Returns a pandas.DataFrame indexed by gentype with one column per 
+        available attribute, summing over geography_ids. Gentypes with no 
+        data in any of the geographies are omitted. Rows and columns are in 
+        the same order as in ScenariosDataset.get_genmix without the cube: 
+        columns in file order, and rows sorted by gentype within the first 
+        column that has data for them. Raises KeyError if year, scenario_id, 
+        or any of the geography_ids are not in the cube.
+        """
+        i = self.__scenario_index[scenario_id]
+        geos = [self.__geography_index[geography] for geography in geography_ids]
+        res = 0 if (geos == [0]) else 1
+        attrs = np.flatnonzero(self.available[i,res,:])
+        attrs = attrs[np.argsort(self.attribute_order[i,res,attrs])]
+        block = self.values[i,geos,self.__year_index[year]][:,:,attrs]
+        present = ~np.isnan(block).all(axis=0)
+        data = np.where(present,np.nansum(block,axis=0),np.nan)
+        keep = np.flatnonzero(present.any(axis=1))
+        rows = keep[np.argsort(present[keep].argmax(axis=1),kind='stable')]
+        return pds.DataFrame(data[rows],
+                             index=[self.gentypes[g] for g in rows],
+                             columns=[self.attribute_labels[k] for k in attrs])
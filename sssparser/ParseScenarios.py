@@ -16,7 +16,6 @@
 # THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # [/LICENSE]
 
-from functools import reduce
 import os
 import sys
 # import string
@@ -46,29 +45,76 @@ def parse_file_name(s,config_set):
     return ScenarioFile(config_set,**file_info)
 
 
-def group_file_info(l, d):
+class ScenarioFileGroups(list):
     """
-    Reduce function for grouping file dicts from parse_file_name by scenario
-    :param l:
-    :param d:
-    :return: list
+    List of lists of ScenarioFiles grouped by scenario, in the order in which 
+    each scenario is first seen, with an index from scenario id to group so 
+    that adding a file is O(1)
+    """
+
+    def __init__(self, groups=()):
+        super().__init__()
+        self.__index = {}
+        for group in groups:
+            for f in group:
+                self.add(f)
+
+    @staticmethod
+    def key(scenario_file):
+        return scenario_file.scenario['id'] if scenario_file.scenario is not None else None
+
+    def add(self, scenario_file):
+        key = self.key(scenario_file)
+        if key not in self.__index:
+            self.__index[key] = len(self)
+            self.append([])
+        self[self.__index[key]].append(scenario_file)
+
+
+def group_scenario_files(scenario_files):
+    """
+    Groups ScenarioFiles from parse_file_name by scenario, keeping the order 
+    in which each scenario is first seen
+    :param scenario_files: iterable of ScenarioFile
+    :return: ScenarioFileGroups
     """
+    result = ScenarioFileGroups()
+    for f in scenario_files:
+        result.add(f)
 
-    if d.scenario in [group[0].scenario for group in l]:
-        group = next(group for group in l if d.scenario == group[0].scenario)
-        group.append(d)
-    else:
-        l.append([d])
+    return result
 
+
+def group_file_info(l, d):
+    """
+    Reduce function for grouping file dicts from parse_file_name by scenario. 
+    Kept for existing callers. l is indexed once, the first time it is seen, 
+    and the ScenarioFileGroups returned then adds each file in O(1)
+    :param l: list of lists of ScenarioFiles, e.g. [] to start a reduce
+    :param d: ScenarioFile
+    :return: ScenarioFileGroups
+    """
+    if not isinstance(l, ScenarioFileGroups):
+        l = ScenarioFileGroups(l)
+    l.add(d)
     return l
 
 
+def list_scenario_data_files(scenario_data_dir):
+    """
+    Lists the names of the data files in scenario_data_dir, skipping hidden files
+    :param scenario_data_dir: path to a dataset's ScenarioData directory
+    :return: list
+    """
+    return [fp for fp in os.listdir(scenario_data_dir) if not fp.startswith('.')]
+
+
 def parse_dataset(dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME):
     config_set = ConfigSet(dataset_dir,scenario_data_dirname=scenario_data_dirname)
 
-    valid_files = filter(lambda fp: not fp.startswith('.'), os.listdir(config_set.scenario_data_dir))
+    valid_files = list_scenario_data_files(config_set.scenario_data_dir)
     scenario_files = map(lambda x: parse_file_name(x,config_set), valid_files)
-    grouped_scenario_files = reduce(group_file_info, scenario_files, [])
+    grouped_scenario_files = group_scenario_files(scenario_files)
 
     return config_set, grouped_scenario_files
 
@@ -0,0 +1,72 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+# Named groups of states that can be used in place of a list of states 
+# wherever ScenariosDataset accepts geography_ids. The Standard Scenarios 
+# state-level data cannot represent regions that split a state, so each state 
+# is assigned to the interconnection, NERC region, and ISO/RTO (if any) that 
+# serves most of its load. The presets are thus approximations of the actual 
+# footprints.
+
+from collections import OrderedDict
+
+INTERCONNECTIONS = OrderedDict([
+    ('Eastern', ['AL','AR','CT','DE','FL','GA','IA','IL','IN','KS','KY','LA',
+                 'MA','MD','ME','MI','MN','MO','MS','NC','ND','NE','NH','NJ',
+                 'NY','OH','OK','PA','RI','SC','SD','TN','VA','VT','WI','WV']),
+    ('Western', ['AZ','CA','CO','ID','MT','NM','NV','OR','UT','WA','WY']),
+    ('Texas',   ['TX'])])
+
+NERC_REGIONS = OrderedDict([
+    ('MRO',  ['IA','KS','MN','ND','NE','OK','SD','WI']),
+    ('NPCC', ['CT','MA','ME','NH','NY','RI','VT']),
+    ('RF',   ['DE','IL','IN','MD','MI','NJ','OH','PA','WV']),
+    ('SERC', ['AL','AR','FL','GA','KY','LA','MO','MS','NC','SC','TN','VA']),
+    ('TRE',  ['TX']),
+    ('WECC', ['AZ','CA','CO','ID','MT','NM','NV','OR','UT','WA','WY'])])
+
+ISO_RTOS = OrderedDict([
+    ('CAISO',  ['CA']),
+    ('ERCOT',  ['TX']),
+    ('ISO-NE', ['CT','MA','ME','NH','RI','VT']),
+    ('MISO',   ['AR','IA','IN','LA','MI','MN','MO','MS','ND','WI']),
+    ('NYISO',  ['NY']),
+    ('PJM',    ['DE','IL','MD','NJ','OH','PA','VA','WV']),
+    ('SPP',    ['KS','NE','OK','SD'])])
+
+REGION_TYPES = OrderedDict([
+    ('Interconnection', INTERCONNECTIONS),
+    ('NERC Region', NERC_REGIONS),
+    ('ISO/RTO', ISO_RTOS)])
+
+REGIONS = OrderedDict()
+for regions in REGION_TYPES.values():
+    REGIONS.update(regions)
+
+
+def expand_geographies(geography_ids):
+    """
+    Replaces any region names in geography_ids with the region's states. 
+    Returns a list of unique geography ids in the order first listed.
+    """
+    result = []
+    for geography_id in geography_ids:
+        for state in REGIONS.get(geography_id,[geography_id]):
+            if state not in result:
+                result.append(state)
+    return result
@@ -16,6 +16,7 @@
 # THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # [/LICENSE]
 
+import numpy as np
 import pandas as pd
 import csv
 import os
@@ -51,6 +52,8 @@ class ScenarioFile(object):
         self.cumulative_temporal = self.temporal_resolution is None
 
         self.__data = None
+        self.__series = None
+        self.__additional_columns = None
         self.temporal_config = None
         self.spatial_config = None
         self.cumulative_data = None
@@ -82,8 +85,17 @@ class ScenarioFile(object):
             repr(self.temporal_resolution_id),
             repr(self.spatial_resolution_id))
 
-    def read(self):
-        self.__data = pd.read_csv(self.fp)
+    def read(self,reader=None):
+        """
+        Loads the file's data. By default the csv file is parsed directly. 
+        Alternatively, reader can be any object with a read(fp) method that 
+        returns the same pandas.DataFrame as pandas.read_csv(fp), e.g. a 
+        CompiledDataset.
+        """
+        if reader is not None:
+            self.__data = reader.read(self.fp)
+        else:
+            self.__data = pd.read_csv(self.fp)
 
         # ETH@20170822 - I think this is mapping state abbreviations to FIPS codes. 
         # I would rather have state abbreviations.
@@ -95,65 +107,91 @@ class ScenarioFile(object):
         #     self.__data = self.__data[self.__data['gid'] != 'MEX']         # Remove Mexico
         #     self.__data['gid'] = self.__data['gid'].map(fips_codes, na_action='ignore')
 
-    def get_data(self):
-        if 'time' in self.__data.columns:
-            self.__data['time'] = self.__data['time'].astype(str)
-        self.__data['value'].round(4)
+    @property
+    def is_read(self):
+        return (self.__data is not None) or (self.__series is not None)
 
-        additional_columns = list(self.__data.columns.difference(['gid', 'value', 'time']))
+    @property
+    def additional_columns(self):
+        """
+        Names of the columns other than 'gid', 'value', and 'time', e.g. 
+        ['tech'] for capacity and generation files.
+        """
+        if not self.is_read:
+            self.read()
+        if self.__series is not None:
+            return list(self.__additional_columns)
+        return list(self.__data.columns.difference(['gid', 'value', 'time']))
+
+    def get_series(self):
+        """
+        Returns the file's data as a pandas.Series of values rounded to 4 
+        decimal places. The index levels are 'gid' (unless the data is 
+        spatially cumulative), then self.additional_columns, then 'time' (if 
+        present, as strings). The series is computed once and the raw 
+        DataFrame is then released.
+        """
+        if self.__series is None:
+            if not self.is_read:
+                self.read()
+            self.__additional_columns = self.additional_columns
+            data = self.__data
+            index_columns = []
+            if (not self.cumulative_spatial) and ('gid' in data.columns):
+                index_columns.append('gid')
+            index_columns.extend(self.__additional_columns)
+            if 'time' in data.columns:
+                data = data.assign(time=data['time'].astype(str))
+                index_columns.append('time')
+            if index_columns:
+                data = data.set_index(index_columns)
+            self.__series = round_values(data['value'])
+            self.__data = None
+        return self.__series
+
+    def get_data(self):
+        """
+        Compatibility view of get_series as nested dicts. Depending on the 
+        spatial resolution and number of additional columns, the dicts are 
+        keyed by [gid][attribute_id][additional column value][time], 
+        [gid][attribute_id][time], [additional column value][time], or 
+        [time]. Temporally cumulative data is keyed by 'value' in place of 
+        time.
+        """
+        data = self.get_series().reset_index()
+        additional_columns = self.__additional_columns
+
+        def values_dict(df):
+            keys = ['value'] * len(df.index) if self.cumulative_temporal else df['time'].tolist()
+            return dict(zip(keys,df['value'].tolist()))
+
+        def grouped_dict(df,column,func):
+            return {name: func(group) for name, group in df.groupby(column)}
 
         if len(additional_columns) == 1:
-            response = {}
             if self.cumulative_spatial:
-                grouped = self.__data.groupby(additional_columns[0])
-                for name, group in grouped:
-                    group = group.drop(additional_columns[0], axis=1)
-
-                    if self.cumulative_temporal:
-                        response[name] = {'value': float("{0:.4f}".format(d['value'])) for d in group.to_dict(orient='records')}
-                    else:
-                        response[name] = {d['time']: float("{0:.4f}".format(d['value'])) for d in group.to_dict(orient='records')}
-            else:
-                try:
-                    spatial_grouped = self.__data.groupby(['gid'])
-                except KeyError as e:
-                    print(self.fp)
-                    print(self.spatial_resolution)
-                    raise e
-                for spatial_name, spatial_group in spatial_grouped:
-                    response[spatial_name] = {
-                        self.attribute['id']: {}
-                    }
-                    spatial_group = spatial_group.drop('gid', axis=1)
-
-                    attr_grouped = spatial_group.groupby(additional_columns[0])
-                    for attr_name, attr_group in attr_grouped:
-                        attr_group = attr_group.drop(additional_columns[0], axis=1)
-                        response[spatial_name][self.attribute['id']][attr_name] = {d['time']: float("{0:.4f}".format(d['value'])) for d in
-                                                             attr_group.to_dict(orient='records')}
+                return grouped_dict(data,additional_columns[0],values_dict)
+            return grouped_dict(data,'gid',
+                lambda df: {self.attribute['id']: grouped_dict(df,additional_columns[0],values_dict)})
 
-        else:
-            if self.cumulative_spatial:
-                if self.cumulative_temporal:
-                    response = {'value': float("{0:.4f}".format(d['value'])) for d in
-                            self.__data.to_dict(orient='records')}
-                else:
-                    response = {d['time']: float("{0:.4f}".format(d['value'])) for d in
-                            self.__data.to_dict(orient='records')}
-            else:
-                response = {}
-                spatial_grouped = self.__data.groupby(['gid'])
-                for spatial_name, spatial_group in spatial_grouped:
-                    response[spatial_name] = {}
-                    spatial_group = spatial_group.drop('gid', axis=1)
-
-                    if self.cumulative_temporal:
-                        response[spatial_name][self.attribute['id']] = {'value': float("{0:.4f}".format(d['value']))
-                                                                        for d
-                                                                        in spatial_group.to_dict(orient='records')}
-                    else:
-                        response[spatial_name][self.attribute['id']] = {d['time']: float("{0:.4f}".format(d['value'])) for d
-                                                                    in
-                                                                    spatial_group.to_dict(orient='records')}
-
-        return response
+        if self.cumulative_spatial:
+            return values_dict(data)
+        return grouped_dict(data,'gid',lambda df: {self.attribute['id']: values_dict(df)})
+
+
+# Helpers
+
+def round_values(values,decimals=4):
+    """
+    Vectorized equivalent of float("{0:.4f}".format(value)) over a 
+    pandas.Series. numpy rounding only disagrees with exact decimal rounding 
+    for values within floating point error of a tie, so only those are 
+    rounded through string formatting.
+    """
+    result = values.round(decimals)
+    scaled = values.values * 10**decimals
+    ties = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1.0E-6
+    if ties.any():
+        fmt = "{0:." + str(decimals) + "f}"
+        result[ties] = [float(fmt.format(value)) for value in values.values[ties]]
+    return result
@@ -21,15 +21,20 @@ import logging
 import pandas as pds
 
 from sssparser import SSSParserError
+from .CompiledDataset import CompiledDataset
 from .DataConfig import DEFAULT_SCENARIO_DATA_DIRNAME
+from .DatasetCache import DatasetCache
+from .GenmixCube import GenmixCube
 from .ParseScenarios import parse_dataset
+from .Regions import REGIONS, expand_geographies
 
 logger = logging.getLogger(__name__)
 
 class ScenariosDataset(object):
     GENMIX_ATTRIBUTES = ['capacity','generation']
 
-    def __init__(self,dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME):
+    def __init__(self,dataset_dir,scenario_data_dirname=DEFAULT_SCENARIO_DATA_DIRNAME,
+                 use_compiled=True,use_genmix_cube=False,use_cache=True,cache_dir=None):
         """
         Parameters
         ----------
@@ -38,15 +43,68 @@ class ScenariosDataset(object):
             'NREL Standard Scenarios 2016'
         scenario_data_dirname : str
             Directory that holds all of the datasets of interest (e.g. sssmatch/sssmixes)
+        use_compiled : bool
+            If True and an up-to-date compiled version of the dataset exists 
+            (see sssparser.CompiledDataset.compile_dataset), data is read 
+            from it rather than from the csv files
+        use_genmix_cube : bool
+            If True, the first call to get_genmix reads all of the generation 
+            mix data into a GenmixCube, which is then used to answer all 
+            get_genmix calls
+        use_cache : bool
+            If True and compiled data is not being used, parsed copies of the 
+            data files are kept in and reused from a user-level cache 
+            directory (see sssparser.DatasetCache)
+        cache_dir : None or str
+            Cache directory to use if use_cache. Defaults to 
+            sssparser.DatasetCache.default_cache_dir().
         """
         config_set, grouped_files = parse_dataset(dataset_dir,scenario_data_dirname=scenario_data_dirname)
         self.__cache = {}
+        self.__metadata = None
+        self.compiled = None
+        if use_compiled:
+            self.compiled = CompiledDataset.load(dataset_dir,scenario_data_dirname=scenario_data_dirname)
+        self.reader = self.compiled
+        if (self.reader is None) and use_cache:
+            try:
+                self.reader = DatasetCache(config_set.scenario_data_dir,cache_dir=cache_dir)
+            except OSError as e:
+                logger.warning("Unable to use a dataset cache, so reading csv files directly: {}".format(e))
+        self.use_genmix_cube = use_genmix_cube
+        self.genmix_cube = None
         self.name = scenario_data_dirname
         self.config_set = config_set
         self.grouped_files = grouped_files
+        # files are only indexed here; each one is read the first time its 
+        # data is requested
+        self.__files = {}
+        self.__scenario_ids = {}
+        self.__scenario_files = {}
         for group in self.grouped_files:
+            scenario_files = []
             for f in group:
-                f.read()
+                key = (f.scenario_id,f.attribute_id,f.temporal_resolution_id,f.spatial_resolution_id)
+                self.__files[key] = f
+                scenario_files.append((key,f))
+            self.__scenario_files[group[0].scenario_id] = scenario_files
+            self.__scenario_ids[group[0].scenario_id] = group[0].scenario_id
+            self.__scenario_ids[group[0].scenario['label']] = group[0].scenario_id
+
+    @property
+    def metadata(self):
+        """
+        Dict of the dataset's 'gentypes', 'years', 'scenarios', and 
+        'geographies'. Built once per ScenariosDataset, or taken from the 
+        compiled dataset's manifest if available, in which case no data files 
+        need to be read.
+        """
+        if self.__metadata is None:
+            if (self.compiled is not None) and ('metadata' in self.compiled.manifest):
+                self.__metadata = self.compiled.manifest['metadata']
+            else:
+                self.__metadata = self._build_metadata()
+        return self.__metadata
 
     @property
     def gentypes(self):
@@ -59,49 +117,133 @@ class ScenariosDataset(object):
         list
             List of generator types found in the ScenariosDataset
         """
-        gentypes = set()
-        for group in self.grouped_files:
-            for f in group:
-                if f.attribute_id == 'capacity' and f.spatial_resolution_id == 'national':
-                    gentypes.update(f.get_data().keys())
-        return sorted(list(gentypes))
+        return list(self.metadata['gentypes'])
 
     @property
     def years(self):
-        result = None
-        for group in self.grouped_files:
-            for f in group:
-                if f.attribute_id == 'capacity' and f.spatial_resolution_id == 'national':
-                    data = f.get_data()
-                    result = list(data[list(data.keys())[0]].keys())
-                    break
-            if result:
-                break
-        return result
+        years = self.metadata['years']
+        return list(years) if years is not None else None
 
     @property
     def scenarios(self):
-        result = []
-        for group in self.grouped_files:
-            result.append(group[0].scenario_id)
-        return result
+        return list(self.metadata['scenarios'])
 
     @property
     def geographies(self):
-        result = ['national']
+        return list(self.metadata['geographies'])
+
+    def _build_metadata(self):
+        gentypes = set(); years = None
+        for f in self.find_files(attribute_id='capacity',spatial_resolution_id='national'):
+            data = self._get_series(f)
+            gentype_level = f.additional_columns[0]
+            gentypes.update(data.index.get_level_values(gentype_level))
+            if years is None:
+                first_gentype = data.index.get_level_values(gentype_level).min()
+                years = data.xs(first_gentype,level=gentype_level).index.get_level_values('time').tolist()
+
+        scenarios = []
         for group in self.grouped_files:
-            for f in group:
-                if f.attribute_id == 'capacity' and f.spatial_resolution_id == 'states':
-                    data = f.get_data()
-                    result.extend(list(data.keys()))
-                    break
-            if len(result) > 1:
-                break
+            scenarios.append(group[0].scenario_id)
+
+        geographies = ['national']
+        for f in self.find_files(attribute_id='capacity',spatial_resolution_id='states'):
+            geographies.extend(sorted(self._get_series(f).index.get_level_values('gid').unique()))
+            break
+
+        self._flush_reader()
+        return {'gentypes': sorted(list(gentypes)),
+                'years': years,
+                'scenarios': scenarios,
+                'geographies': geographies}
+
+    def find_files(self,scenario_id=None,attribute_id=None,
+                   temporal_resolution_id=None,spatial_resolution_id=None):
+        """
+        Returns the ScenarioFiles that match all of the ids provided, in 
+        self.grouped_files order. Files are not read by this method. 
+        scenario_id may be a scenario id or label.
+        """
+        if scenario_id is not None:
+            scenario_id = self.__scenario_ids.get(scenario_id)
+            if scenario_id is None:
+                return []
+            candidates = self.__scenario_files[scenario_id]
+        else:
+            candidates = self.__files.items()
+        result = []
+        for key, f in candidates:
+            if (attribute_id is None or key[1] == attribute_id) and \
+               (temporal_resolution_id is None or key[2] == temporal_resolution_id) and \
+               (spatial_resolution_id is None or key[3] == spatial_resolution_id):
+                result.append(f)
         return result
 
+    def build_genmix_cube(self):
+        """
+        Reads all of the generation mix data into self.genmix_cube and 
+        returns it.
+        """
+        self.genmix_cube = GenmixCube.from_dataset(self)
+        self._flush_reader()
+        return self.genmix_cube
+
+    def _flush_reader(self):
+        """
+        Writes out the reader's record of the files it has read, if it keeps 
+        one (see DatasetCache.flush).
+        """
+        if hasattr(self.reader,'flush'):
+            self.reader.flush()
+
+    def _get_series(self,scenario_file):
+        if not scenario_file.is_read:
+            scenario_file.read(reader=self.reader)
+        return scenario_file.get_series()
+
+    def _parse_geography_ids(self,geography_ids):
+        """
+        Returns (national, states, region), where national is True if 
+        'national' is in geography_ids, states is the list of states 
+        otherwise requested, and region is the region name if geography_ids 
+        is a single region in REGIONS. States are checked against the data 
+        as it is read, see _check_states, so that no other files need to be 
+        read to validate them.
+        """
+        if 'national' in geography_ids:
+            return True, [], None
+        states = expand_geographies(geography_ids)
+        region = geography_ids[0] if (len(geography_ids) == 1) and (geography_ids[0] in REGIONS) else None
+        return False, states, region
+
+    def _check_states(self,states,available):
+        """
+        Raises an SSSParserError if any of states are not in available, the 
+        geographies of the data being read.
+        """
+        unknown = [state for state in states if state not in available]
+        if unknown:
+            raise SSSParserError("Unknown geography_ids {}. Available geographies are {}, ".format(unknown,sorted(available)) + 
+                                 "and the regions {}.".format(list(REGIONS.keys())))
+
+    def _get_region_series(self,scenario_file,region):
+        """
+        Returns scenario_file's state-level data summed over the states in 
+        REGIONS[region]. The result is cached.
+        """
+        key = (scenario_file.scenario_id,scenario_file.attribute_id,
+               scenario_file.temporal_resolution_id,scenario_file.spatial_resolution_id,region)
+        if key not in self.__cache:
+            data = self._get_series(scenario_file)
+            data = data[data.index.get_level_values('gid').isin(REGIONS[region])]
+            self.__cache[key] = data.groupby(level=[name for name in data.index.names if name != 'gid']).sum()
+        return self.__cache[key]
+
     def _get_data(self,scenario_file):
-        key = (scenario_file.scenario_id,scenario_file.attribute_id,scenario_file.spatial_resolution_id)
+        key = (scenario_file.scenario_id,scenario_file.attribute_id,
+               scenario_file.temporal_resolution_id,scenario_file.spatial_resolution_id)
         if key not in self.__cache:
+            self._get_series(scenario_file)
             self.__cache[key] = scenario_file.get_data()
         return self.__cache[key]
 
@@ -112,56 +254,54 @@ class ScenariosDataset(object):
         Arguments:
             - year (string) - a year in self.years
             - scenario_id (string) - a scenario in self.scenarios
-            - geogrpahy_id (list of strings) - a subset of self.geographies
+            - geogrpahy_id (list of strings) - a subset of self.geographies, 
+              and/or names of regions in sssparser.Regions.REGIONS
         """
         def attribute_label(scenario_file):
             return "{} ({})".format(scenario_file.attribute['label'],
                                     scenario_file.attribute['units'])
 
         def get_national_data(scenario_file):
-            data = self._get_data(scenario_file)
-            tmp = []; index = []
-            for gen_type, values in data.items():
-                tmp.append(values[year])
-                index.append(gen_type)
-            return pds.Series(tmp,index=index,name=attribute_label(scenario_file))
+            data = self._get_series(scenario_file).xs(year,level='time')
+            return data.sort_index().rename(attribute_label(scenario_file))
 
         def get_states_data(scenario_file,states):
-            data = self._get_data(scenario_file)
-            result = None
-            for state in states:
-                state_data = data[state]
-                extra_key = list(state_data.keys())[0]
-                tmp = []; index = []
-                for gen_type, values in state_data[extra_key].items():
-                    tmp.append(values[year])
-                    index.append(gen_type)
-                tmp = pds.Series(tmp,index=index,name=attribute_label(scenario_file))
-                if result is None:
-                    result = tmp
-                    continue
-                result = result.add(tmp,fill_value=0.0)
-            return result
+            if region is not None:
+                data = self._get_region_series(scenario_file,region).xs(year,level='time')
+            else:
+                data = self._get_series(scenario_file)
+                self._check_states(states,set(data.index.get_level_values('gid')))
+                data = data[data.index.get_level_values('gid').isin(states) & 
+                            (data.index.get_level_values('time') == year)]
+                data = data.groupby(level=scenario_file.additional_columns[0]).sum()
+            return data.sort_index().rename(attribute_label(scenario_file))
 
         result = []
-        national = False; states = []
-        if 'national' in geography_ids:
-            national = True
+        national, states, region = self._parse_geography_ids(geography_ids)
+        if self.use_genmix_cube:
+            if self.genmix_cube is None:
+                self.build_genmix_cube()
+            if not national and region is None:
+                self._check_states(states,set(self.genmix_cube.geographies[1:]))
+            try:
+                result = self.genmix_cube.get_genmix(year,
+                    self.__scenario_ids.get(scenario_id,scenario_id),
+                    ['national'] if national else states)
+            except KeyError:
+                result = None
+            if (result is None) or result.columns.empty:
+                raise SSSParserError("No generation mix availabale for year '{}', scenario_id '{}', geography_ids = '{}'".format(year,scenario_id,geography_ids))
         else:
-            assert 'national' not in geography_ids
-            states = geography_ids
-        for group in self.grouped_files:
-            if (group[0].scenario_id != scenario_id) and (group[0].scenario['label'] != scenario_id):
-                continue
-            for f in group:
+            for f in self.find_files(scenario_id=scenario_id):
                 if f.attribute_id in self.GENMIX_ATTRIBUTES:
                     if national and f.spatial_resolution_id == 'national':
                         result.append(get_national_data(f))
                     elif states and f.spatial_resolution_id == 'states':
                         result.append(get_states_data(f,states))
-        if not result:
-            raise SSSParserError("No generation mix availabale for year '{}', scenario_id '{}', geography_ids = '{}'".format(year,scenario_id,geography_ids))
-        result = pds.concat(result,axis=1)
+            if not result:
+                raise SSSParserError("No generation mix availabale for year '{}', scenario_id '{}', geography_ids = '{}'".format(year,scenario_id,geography_ids))
+            result = pds.concat(result,axis=1)
+            self._flush_reader()
         # calculate fractions
         original_columns = result.columns
         for col in original_columns:
@@ -175,32 +315,89 @@ class ScenariosDataset(object):
 
     def get_timeseries(self,scenario_id,geography_ids):
         """
-        Calls self.get_genmix for every year in self.years. Returns a 
-        pandas.Series indexed by ['dataset','scenario','geography','year',
-        'gentype','variable']. The geography key is ','.join(geography_ids).
-        """
-        data = []
-        for yr in self.years:
-            mix = self.get_genmix(yr,scenario_id,geography_ids)
-            mix.index.name = 'gentype'
-            value_vars = mix.columns
-            mix = mix.reset_index()
-            mix['dataset'] = self.name
+        Returns the same data as calling self.get_genmix for every year in 
+        self.years, computed in one pass per data file. scenario_id may be a 
+        single scenario or a list of scenarios.
+
+        Returns a pandas.DataFrame with one column, 'value', indexed by 
+        ['dataset','scenario','geography','year','gentype','variable']. 
+        The geography key is ','.join(geography_ids). For a single scenario 
+        the rows are the same, and in the same order, as in earlier 
+        versions, which built them one year at a time. For a list of 
+        scenarios the result is the concatenation of the results for each 
+        scenario, in the order given.
+        """
+        scenario_ids = [scenario_id] if isinstance(scenario_id,str) else list(scenario_id)
+
+        national, states, region = self._parse_geography_ids(geography_ids)
+
+        data = []; variables = []
+        for scenario_id in scenario_ids:
+            columns = []
+            for f in self.find_files(scenario_id=scenario_id):
+                if f.attribute_id not in self.GENMIX_ATTRIBUTES:
+                    continue
+                label = "{} ({})".format(f.attribute['label'],f.attribute['units'])
+                gentype_level = f.additional_columns[0]
+                if national and f.spatial_resolution_id == 'national':
+                    tmp = self._get_series(f)
+                elif states and f.spatial_resolution_id == 'states':
+                    if region is not None:
+                        tmp = self._get_region_series(f,region)
+                    else:
+                        tmp = self._get_series(f)
+                        self._check_states(states,set(tmp.index.get_level_values('gid')))
+                        tmp = tmp[tmp.index.get_level_values('gid').isin(states)]
+                        tmp = tmp.groupby(level=[gentype_level,'time']).sum()
+                else:
+                    continue
+                columns.append(tmp.rename_axis(['gentype','year']).rename(label))
+            if not columns:
+                raise SSSParserError("No generation mix availabale for scenario_id '{}', geography_ids = '{}'".format(scenario_id,geography_ids))
+            mix = pds.concat(columns,axis=1)
+            mix = mix[mix.index.get_level_values('year').isin(self.years)]
+            # get_genmix lists the gentypes of its first column, then those 
+            # only found in later columns
+            first_column = mix.notna().values.argmax(axis=1)
             mix['scenario'] = scenario_id
-            mix['geography'] = ','.join(geography_ids)
-            mix['year'] = int(yr)
-            mix = pds.melt(mix,
-                           id_vars=['dataset','scenario','geography','year','gentype'],
-                           value_vars=value_vars)
-            mix = multi_index(mix,['dataset','scenario','geography','year','gentype','variable'])
-            data.append(mix)
-        return pds.concat(data)
-
-# Helpers
-
-def multi_index(df, cols):
-    result = df.copy()
-    result.index = result[cols[0]] if len(cols) == 1 else pds.MultiIndex.from_tuples(list(zip(*[result[col].tolist() for col in cols])),names = cols)
-    for col in cols:
-        del result[col]
-    return result
+            mix['first_column'] = first_column
+            data.append(mix.reset_index())
+            # get_genmix's columns: this scenario's attributes in file order, 
+            # then their fractions
+            labels = [col.name for col in columns]
+            labels += [label.split(' ')[0] + ' Fraction' for label in labels]
+            variables += [(scenario_id,label,i) for i, label in enumerate(labels)]
+        data = pds.concat(data,ignore_index=True)
+        self._flush_reader()
+
+        # calculate fractions and totals by scenario and year
+        id_vars = ['scenario','year','gentype','first_column']
+        value_vars = [col for col in data.columns if col not in id_vars]
+        grouped = data.groupby(['scenario','year'])
+        for col in value_vars:
+            attribute_name = col.split(' ')[0]
+            data[attribute_name + ' Fraction'] = data[col] / grouped[col].transform('sum')
+        value_vars = [col for col in data.columns if col not in id_vars]
+        totals = data.groupby(['scenario','year'])[value_vars].sum().reset_index()
+        totals['gentype'] = 'TOTAL'
+        data = pds.concat([data,totals],ignore_index=True)
+
+        data['dataset'] = self.name
+        data['geography'] = ','.join(geography_ids)
+        data['year'] = data['year'].astype(int)
+        data = pds.melt(data,
+                        id_vars=['dataset','scenario','geography','year','gentype','first_column'],
+                        value_vars=value_vars)
+        # keep only the variables get_genmix reports for each scenario
+        data = data.merge(pds.DataFrame(variables,columns=['scenario','variable','variable_order']),
+                          on=['scenario','variable'])
+        # order the rows as get_genmix would, one year at a time: by 
+        # variable, then by gentype in get_genmix's row order with TOTAL last
+        order = pds.DataFrame({'scenario': data['scenario'].map({sid: i for i, sid in enumerate(scenario_ids)}),
+                               'year': data['year'],
+                               'variable': data['variable_order'],
+                               'total': data['gentype'] == 'TOTAL',
+                               'first_column': data['first_column'],
+                               'gentype': data['gentype']})
+        data = data.loc[order.sort_values(list(order.columns)).index].drop(columns=['first_column','variable_order'])
+        return data.set_index(['dataset','scenario','geography','year','gentype','variable'])
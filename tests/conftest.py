@@ -0,0 +1,124 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sssmatch import datasets_dir
+from sssmatch.request import Model, ProblemArrays, Request
+from sssparser.ScenariosDataset import ScenariosDataset
+
+RE_TYPES = ['Land-based Wind','Utility PV','Rooftop PV','Hydro','Geothermal','CSP','Offshore Wind']
+SMALL_DATASET_SCENARIOS = ['Central_scenario','Low_NG_Price']
+GENERATOR_TYPES = ['Coal','NG-CC','NG-CT','Nuclear','Land-based Wind','Hydro','Utility PV','Storage']
+
+
+def dataset_path(year):
+    return os.path.join(datasets_dir,'NREL Standard Scenarios {}'.format(year))
+
+
+@pytest.fixture(scope='session')
+def small_dataset_dir(tmp_path_factory):
+    """
+    Copy of the 2016 dataset with the data files of two scenarios only.
+    """
+    src = dataset_path(2016)
+    dst = str(tmp_path_factory.mktemp('datasets') / os.path.basename(src))
+    shutil.copytree(src,dst,ignore=shutil.ignore_patterns('CompiledData','*.csv'))
+    for filename in os.listdir(src):
+        if filename.endswith('.csv'):
+            shutil.copy2(os.path.join(src,filename),dst)
+    for filename in os.listdir(os.path.join(src,'ScenarioData')):
+        if filename.split('.')[0] in SMALL_DATASET_SCENARIOS:
+            shutil.copy2(os.path.join(src,'ScenarioData',filename),os.path.join(dst,'ScenarioData'))
+    return dst
+
+
+@pytest.fixture(scope='session')
+def cache_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('sss_cache'))
+
+
+@pytest.fixture(scope='session')
+def dataset(cache_dir):
+    return ScenariosDataset(dataset_path(2018),cache_dir=cache_dir)
+
+
+def make_system(num_nodes=30,seed=0,int_ids=False):
+    """
+    Returns (nodes, generators) for a small random system in the format 
+    expected by sssmatch.request.Request.
+    """
+    rng = np.random.default_rng(seed)
+    ids = list(range(100,100 + num_nodes)) if int_ids else ['n{}'.format(i) for i in range(num_nodes)]
+    nodes = pd.DataFrame({'node_id': ids,
+                          'latitude': rng.uniform(30,45,num_nodes),
+                          'longitude': rng.uniform(-120,-80,num_nodes),
+                          'peak load (MW)': rng.uniform(10,100,num_nodes),
+                          'annual load (GWh)': rng.uniform(100,600,num_nodes)})
+    for re_type in RE_TYPES:
+        nodes[re_type] = rng.uniform(0,400,num_nodes)
+    gens = []
+    for node_id in ids:
+        for gentype in rng.choice(GENERATOR_TYPES,3,replace=False):
+            gens.append([node_id,str(gentype),float(rng.uniform(10,300))])
+    gens = pd.DataFrame(gens,columns=Request.generators_columns())
+    return nodes, gens
+
+
+@pytest.fixture
+def make_request(dataset):
+    def _make(year='2030',scenario='Mid_Case',**kwargs):
+        nodes, gens = make_system(**kwargs)
+        mix = dataset.get_genmix(year,scenario,['national'])
+        return Request(nodes,gens,dataset,mix)
+    return _make
+
+
+def dense(results,name,shape):
+    codes, values = results.arrays(name)
+    result = np.zeros(shape)
+    np.add.at(result,codes,values)
+    return result
+
+
+def check_solution(request,problem=None,gendists=None,tolerance=1.0E-6):
+    """
+    Asserts that the results registered with request satisfy the 
+    constraints of the match model, and that request.distance is their 
+    objective value.
+    """
+    p = problem if problem is not None else ProblemArrays(request,*Model.problem_inputs(request,gendists))
+    results = request.sparse_results
+    N, G = len(p.nodes), len(p.gentypes)
+    capacity = dense(results,'capacity',(N,G))
+    added = dense(results,'capacity_added',(N,G))
+    kept = dense(results,'capacity_kept',(N,G))
+    removed = dense(results,'capacity_removed',(N,G))
+    swapped = dense(results,'capacity_swapped',(N,G,G))
+    assert np.allclose(capacity.sum(axis=0),p.desired,atol=tolerance)
+    assert np.allclose(kept + swapped.sum(axis=2) + removed,p.current,atol=tolerance)
+    assert np.allclose(capacity,kept + swapped.sum(axis=1) + added,atol=tolerance)
+    assert (capacity[:,~p.indep] <= p.maximum[:,~p.indep] + tolerance).all()
+    assert (capacity[:,p.indep].sum(axis=1) <= p.current_indep + tolerance).all()
+    distance = added.sum() + removed.sum() + (swapped * p.dist[np.newaxis,:,:]).sum()
+    assert request.distance == pytest.approx(distance)
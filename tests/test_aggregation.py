@@ -0,0 +1,62 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import numpy as np
+import pytest
+
+from sssmatch import AML
+from sssmatch.aggregation import NodeAggregation
+
+from conftest import check_solution
+
+
+def test_clusters(make_request):
+    request = make_request(num_nodes=60)
+    request.preprocess()
+    aggregation = NodeAggregation(request,0.2)
+    assert aggregation.num_clusters <= 12
+    assert len(aggregation.labels) == len(request.nodes)
+    assert sorted(np.unique(aggregation.labels)) == list(range(aggregation.num_clusters))
+
+    reduced = aggregation.reduced_request()
+    assert sorted(reduced.nodes['node_id']) == sorted(aggregation.cluster_ids)
+    assert reduced.nodes['annual load (GWh)'].sum() == pytest.approx(request.nodes['annual load (GWh)'].sum())
+    assert reduced.generators['capacity (MW)'].sum() == pytest.approx(request.generators['capacity (MW)'].sum())
+
+    with pytest.raises(ValueError):
+        NodeAggregation(request,0.0)
+
+
+@pytest.mark.parametrize('aml',[AML.SCIPY,AML.NETWORK])
+def test_solve_aggregated(make_request,tmp_path,aml):
+    request = make_request(num_nodes=60)
+    request.fulfill(str(tmp_path),aml=aml,aggregation_ratio=0.2,report_gap=True)
+    # the disaggregated results respect every node's limits
+    check_solution(request)
+    report = request.aggregation_report
+    assert report['nodes'] == 60
+    assert report['disaggregated distance'] == pytest.approx(request.distance)
+    assert report['gap'] >= -1.0E-6
+
+
+def test_no_aggregation(make_request,tmp_path):
+    request = make_request()
+    request.fulfill(str(tmp_path / 'aggregated'),aml=AML.SCIPY,aggregation_ratio=1.0)
+    distance = request.distance
+    request.fulfill(str(tmp_path / 'full'),aml=AML.SCIPY)
+    assert distance == pytest.approx(request.distance)
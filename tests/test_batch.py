@@ -0,0 +1,67 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+
+import pytest
+
+from sssmatch import AML, OutputFormat
+from sssmatch.batch import MatchJob, match_batch, read_manifest
+from sssmatch.request import Request
+from sssmatch.results import RESULT_FILE_EXTENSIONS, load_result_tables
+
+from conftest import make_system
+
+
+def test_read_manifest(tmp_path):
+    filename = str(tmp_path / 'manifest.csv')
+    with open(filename,'w') as f:
+        f.write("scenario_year,scenario,geography,outdir\n")
+        f.write("2030,,,\n")
+        f.write("2040,Low_NG_Price,CO; UT,co_ut\n")
+    jobs = read_manifest(filename,'Mid_Case','national')
+    assert jobs == [MatchJob('2030','Mid_Case',['national'],'2030_Mid_Case_national'),
+                    MatchJob('2040','Low_NG_Price',['CO','UT'],'co_ut')]
+
+
+@pytest.mark.parametrize('workers',[1,2])
+def test_match_batch(dataset,tmp_path,workers):
+    nodes, gens = make_system()
+    jobs = [MatchJob('2030','Mid_Case',['national'],'a'),
+            MatchJob('2050','Mid_Case',['national'],'b'),
+            MatchJob('2030','No_Such_Scenario',['national'],'c')]
+    result = match_batch(nodes,gens,dataset,jobs,str(tmp_path),aml=AML.SCIPY,workers=workers)
+    assert list(result['status']) == ['ok','ok','failed']
+    assert os.path.exists(os.path.join(str(tmp_path),'batch_summary.csv'))
+    for job, distance in zip(jobs[:2],result['distance']):
+        assert os.path.exists(os.path.join(str(tmp_path),job.outdir,'new_generators.csv'))
+        request = Request(nodes,gens,dataset,dataset.get_genmix(job.scenario_year,job.scenario,job.geography))
+        request.fulfill(aml=AML.SCIPY)
+        assert distance == pytest.approx(request.distance)
+
+
+def test_match_batch_store(dataset,tmp_path):
+    pytest.importorskip('pyarrow')
+    nodes, gens = make_system()
+    jobs = [MatchJob(year,'Mid_Case',['national'],year) for year in ['2030','2050']]
+    result = match_batch(nodes,gens,dataset,jobs,str(tmp_path),aml=AML.SCIPY,workers=1,
+                         output_format=OutputFormat.PARQUET)
+    store = os.path.join(str(tmp_path),'results' + RESULT_FILE_EXTENSIONS[OutputFormat.PARQUET])
+    for job, distance in zip(jobs,result['distance']):
+        key = [('scenario',job.scenario),('scenario_year',job.scenario_year),('geography','national')]
+        assert load_result_tables(store,OutputFormat.PARQUET,key=key)['distance'] == pytest.approx(distance)
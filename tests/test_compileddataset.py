@@ -0,0 +1,68 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from sssparser.CompiledDataset import CompiledDataset, compile_dataset
+from sssparser.ParseScenarios import list_scenario_data_files
+from sssparser.ScenariosDataset import ScenariosDataset
+
+
+@pytest.fixture
+def compiled_dataset_dir(small_dataset_dir,tmp_path):
+    dataset_dir = str(tmp_path / os.path.basename(small_dataset_dir))
+    shutil.copytree(small_dataset_dir,dataset_dir)
+    compile_dataset(dataset_dir)
+    return dataset_dir
+
+
+def test_read_matches_csv(compiled_dataset_dir):
+    compiled = CompiledDataset.load(compiled_dataset_dir)
+    assert compiled is not None
+    for filename in list_scenario_data_files(compiled.scenario_data_dir):
+        fp = os.path.join(compiled.scenario_data_dir,filename)
+        expected = pd.read_csv(fp)
+        result = compiled.read(fp)
+        assert list(result.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(result,expected,check_dtype=False)
+        for col in expected.columns:
+            assert pd.api.types.is_numeric_dtype(result[col]) == pd.api.types.is_numeric_dtype(expected[col])
+
+
+def test_stale(compiled_dataset_dir):
+    scenario_data_dir = os.path.join(compiled_dataset_dir,'ScenarioData')
+    fp = os.path.join(scenario_data_dir,sorted(os.listdir(scenario_data_dir))[0])
+    stat = os.stat(fp)
+    os.utime(fp,(stat.st_atime,stat.st_mtime + 10))
+    assert CompiledDataset.load(compiled_dataset_dir) is None
+    assert ScenariosDataset(compiled_dataset_dir,use_cache=False).compiled is None
+
+
+def test_dataset_uses_compiled(compiled_dataset_dir):
+    compiled = ScenariosDataset(compiled_dataset_dir)
+    assert compiled.compiled is not None
+    plain = ScenariosDataset(compiled_dataset_dir,use_compiled=False,use_cache=False)
+    # metadata comes from the manifest
+    assert compiled.metadata == plain.metadata
+    for geography in [['national'],['CO','UT']]:
+        pd.testing.assert_frame_equal(compiled.get_genmix('2030','Central_scenario',geography),
+                                      plain.get_genmix('2030','Central_scenario',geography))
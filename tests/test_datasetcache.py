@@ -0,0 +1,107 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import gc
+import json
+import os
+import shutil
+import weakref
+
+import pandas as pd
+import pytest
+
+from sssparser.DatasetCache import DatasetCache
+
+
+@pytest.fixture
+def scenario_data_dir(small_dataset_dir,tmp_path):
+    src = os.path.join(small_dataset_dir,'ScenarioData')
+    dst = str(tmp_path / 'ScenarioData')
+    os.mkdir(dst)
+    for filename in sorted(os.listdir(src))[:3]:
+        shutil.copy2(os.path.join(src,filename),dst)
+    return dst
+
+
+def data_files(scenario_data_dir):
+    return [os.path.join(scenario_data_dir,filename) for filename in sorted(os.listdir(scenario_data_dir))]
+
+
+def manifest_files(cache):
+    with open(cache.manifest_path) as f:
+        return json.load(f)['files']
+
+
+def test_read(scenario_data_dir,tmp_path):
+    cache = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    for fp in data_files(scenario_data_dir):
+        pd.testing.assert_frame_equal(cache.read(fp),pd.read_csv(fp))
+    # the manifest is only written on flush
+    assert not os.path.exists(cache.manifest_path)
+    cache.flush()
+    assert sorted(manifest_files(cache)) == sorted(os.listdir(scenario_data_dir))
+    assert len(os.listdir(cache.objects_dir)) == 3
+
+    # a new cache reads the parsed copies
+    cache = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    for fp in data_files(scenario_data_dir):
+        pd.testing.assert_frame_equal(cache.read(fp),pd.read_csv(fp))
+    assert not cache.changed
+
+
+def test_changed_files(scenario_data_dir,tmp_path):
+    cache = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    touched, edited = data_files(scenario_data_dir)[:2]
+    for fp in [touched,edited]:
+        cache.read(fp)
+    cache.flush()
+
+    # same contents, new modification time: rehashed, but not parsed again
+    stat = os.stat(touched)
+    os.utime(touched,(stat.st_atime,stat.st_mtime + 10))
+    df = pd.read_csv(edited)
+    df['value'] = df['value'] * 2.0
+    df.to_csv(edited,index=False)
+
+    cache = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(cache.read(touched),pd.read_csv(touched))
+    pd.testing.assert_frame_equal(cache.read(edited),pd.read_csv(edited))
+    assert sorted(cache.changed) == sorted(os.path.basename(fp) for fp in [touched,edited])
+    assert len(os.listdir(cache.objects_dir)) == 3
+
+
+def test_flushed_when_collected(scenario_data_dir,tmp_path):
+    cache = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    manifest_path = cache.manifest_path
+    cache.read(data_files(scenario_data_dir)[0])
+    ref = weakref.ref(cache)
+    del cache
+    gc.collect()
+    # nothing else keeps the cache alive, and its manifest was written
+    assert ref() is None
+    with open(manifest_path) as f:
+        assert len(json.load(f)['files']) == 1
+
+
+def test_concurrent_caches_merge(scenario_data_dir,tmp_path):
+    fps = data_files(scenario_data_dir)
+    a = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    b = DatasetCache(scenario_data_dir,cache_dir=str(tmp_path / 'cache'))
+    a.read(fps[0]); b.read(fps[1])
+    a.flush(); b.flush()
+    assert sorted(manifest_files(b)) == sorted(os.path.basename(fp) for fp in fps[:2])
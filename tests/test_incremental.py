@@ -0,0 +1,81 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import pandas as pd
+import pytest
+
+from sssmatch import AML
+from sssmatch.incremental import RequestDiff
+from sssmatch.request import Request
+
+from conftest import check_solution, make_system
+
+
+@pytest.fixture
+def previous(dataset):
+    nodes, gens = make_system()
+    request = Request(nodes,gens,dataset,dataset.get_genmix('2030','Mid_Case',['national']))
+    request.fulfill(aml=AML.SCIPY)
+    return request
+
+
+def edited(previous,dataset,node_ids,year='2030'):
+    gens = previous.generators.copy()
+    at = gens['node_id'].isin(node_ids)
+    gens.loc[at,'capacity (MW)'] *= 1.5
+    request = Request(previous.nodes,gens,dataset,dataset.get_genmix(year,'Mid_Case',['national']))
+    request.preprocess()
+    return request
+
+
+def test_diff(previous,dataset):
+    request = edited(previous,dataset,['n3','n7'])
+    diff = RequestDiff(previous,request)
+    assert sorted(diff.affected_nodes) == ['n3','n7']
+    assert not diff.full_solve_needed
+    changed = set(previous.generators.loc[previous.generators['node_id'].isin(['n3','n7']),'generator type'])
+    assert set(diff.affected_gentypes) == changed
+
+    diff = RequestDiff(previous,edited(previous,dataset,['n3'],year='2050'))
+    assert diff.reason == "the desired capacity changed"
+
+
+def test_rematch(previous,dataset):
+    request = edited(previous,dataset,['n3','n7'])
+    request.fulfill(aml=AML.SCIPY,previous=previous)
+    assert request.solver_statistics['rematched_nodes'] == 2
+    check_solution(request)
+    # unaffected nodes are left as they were
+    for name in ['capacity','capacity_kept','capacity_swapped']:
+        before = getattr(previous,name); after = getattr(request,name)
+        before = before[~before['node_id'].isin(['n3','n7'])].reset_index(drop=True)
+        after = after[~after['node_id'].isin(['n3','n7'])].reset_index(drop=True)
+        pd.testing.assert_frame_equal(after,before)
+
+    # not necessarily optimal
+    full = edited(previous,dataset,['n3','n7'])
+    full.fulfill(aml=AML.SCIPY)
+    assert request.distance >= full.distance - 1.0E-6
+    assert 'rematched_nodes' not in full.solver_statistics
+
+
+def test_unchanged(previous,dataset):
+    request = edited(previous,dataset,[])
+    request.fulfill(aml=AML.SCIPY,previous=previous)
+    assert request.solver_statistics.get('rematched_nodes') == 0
+    assert request.distance == pytest.approx(previous.distance)
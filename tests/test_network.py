@@ -0,0 +1,85 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import pandas as pd
+import pytest
+
+from sssmatch import AML, SSSMatchError
+from sssmatch.mincostflow import min_cost_flow
+from sssmatch.request import NetworkFlowModel, ScipyModel
+
+from conftest import check_solution
+
+
+def solve(request,model_class,outdir,gendists=None):
+    model = model_class(request,str(outdir))
+    model.setup(gendists=gendists)
+    model.run()
+    assert model.collect_results()
+    return model
+
+
+@pytest.mark.parametrize('year',['2020','2050'])
+def test_network_matches_scipy(make_request,tmp_path,year):
+    request = make_request(year=year)
+    request.preprocess()
+    solve(request,ScipyModel,tmp_path / 'scipy')
+    optimum = request.distance
+    model = solve(request,NetworkFlowModel,tmp_path / 'network')
+    check_solution(request,model.problem)
+    # flows are rounded down to 10^-3 MW, which may cost a little
+    assert optimum - 1.0E-6 <= request.distance <= optimum + 1.0E-3 * model.problem.current.size
+
+
+def test_network_pooled(make_request,tmp_path):
+    request = make_request()
+    request.preprocess()
+    gendists = pd.read_csv(request.DEFAULT_GENTYPE_DISTANCE_FILE)
+    indep = gendists['g'].isin(request.RESOURCE_INDEPENDENT)
+    indep_gg = gendists['gg'].isin(request.RESOURCE_INDEPENDENT)
+    gendists.loc[indep & indep_gg,'Value'] = 0.0
+    gendists.loc[~indep & indep_gg,'Value'] = 0.25
+    gendists_file = str(tmp_path / 'pooled_gendists.csv')
+    gendists.to_csv(gendists_file,index=False)
+
+    solve(request,ScipyModel,tmp_path / 'scipy',gendists=gendists_file)
+    optimum = request.distance
+    model = solve(request,NetworkFlowModel,tmp_path / 'network',gendists=gendists_file)
+    assert model.pooled and (model.fallback is None)
+    check_solution(request,model.problem)
+    assert request.distance == pytest.approx(optimum,abs=1.0E-3 * model.problem.current.size)
+
+
+def test_network_timeout(make_request,tmp_path):
+    request = make_request()
+    request.preprocess()
+    with pytest.raises(SSSMatchError,match='did not finish within'):
+        request.fulfill(str(tmp_path),aml=AML.NETWORK,timeout=1.0E-9)
+
+
+def test_min_cost_flow():
+    # two paths from 0 to 3: through 1 at cost 1 + 1, capacity 2, and 
+    # through 2 at cost 3 + 1, capacity 5
+    tails = [0,1,0,2]; heads = [1,3,2,3]
+    costs = [1.0,1.0,3.0,1.0]; capacities = [2,2,5,5]
+    flows, flow_value, cost = min_cost_flow(4,tails,heads,costs,capacities,0,3)
+    assert flow_value == 7
+    assert list(flows) == [2,2,5,5]
+    assert cost == pytest.approx(24.0)
+    with pytest.raises(TimeoutError):
+        min_cost_flow(4,tails,heads,costs,capacities,0,3,time_limit=0.0)
@@ -0,0 +1,66 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import functools
+import os
+
+from sssparser.DataConfig import ConfigSet
+from sssparser.ParseScenarios import (ScenarioFileGroups, group_file_info, 
+    group_scenario_files, list_scenario_data_files, parse_dataset, parse_file_name)
+
+from conftest import SMALL_DATASET_SCENARIOS
+
+
+def scenario_files(dataset_dir):
+    config_set = ConfigSet(dataset_dir)
+    return [parse_file_name(filename,config_set) for filename in 
+            sorted(list_scenario_data_files(config_set.scenario_data_dir))]
+
+
+def test_parse_file_name(small_dataset_dir):
+    config_set = ConfigSet(small_dataset_dir)
+    f = parse_file_name('Low_NG_Price.capacity.bi_annual.states.csv',config_set)
+    assert f.scenario_id == 'Low_NG_Price'
+    assert f.attribute_id == 'capacity'
+    assert f.temporal_resolution_id == 'bi_annual'
+    assert f.spatial_resolution_id == 'states'
+    assert f.fp == os.path.join(config_set.scenario_data_dir,'Low_NG_Price.capacity.bi_annual.states.csv')
+
+
+def test_group_scenario_files(small_dataset_dir):
+    files = scenario_files(small_dataset_dir)
+    groups = group_scenario_files(files)
+    assert isinstance(groups,ScenarioFileGroups)
+    assert [group[0].scenario_id for group in groups] == sorted(SMALL_DATASET_SCENARIOS)
+    for group in groups:
+        assert group == [f for f in files if f.scenario_id == group[0].scenario_id]
+
+
+def test_group_file_info(small_dataset_dir):
+    files = scenario_files(small_dataset_dir)
+    expected = group_scenario_files(files)
+    assert functools.reduce(group_file_info,files,[]) == expected
+    # an existing list of groups is extended
+    first = [f for f in files if f.scenario_id == expected[0][0].scenario_id]
+    assert functools.reduce(group_file_info,files[len(first):],[first]) == expected
+
+
+def test_parse_dataset(small_dataset_dir):
+    config_set, groups = parse_dataset(small_dataset_dir)
+    assert sum(len(group) for group in groups) == len(list_scenario_data_files(config_set.scenario_data_dir))
+    assert sorted(group[0].scenario_id for group in groups) == SMALL_DATASET_SCENARIOS
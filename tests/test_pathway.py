@@ -0,0 +1,80 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+
+import pandas as pd
+import pytest
+
+from sssmatch import AML
+from sssmatch.pathway import PATHWAY_SUMMARY_COLUMNS, match_pathway, new_capacity
+from sssmatch.request import Request
+
+from conftest import make_system
+
+YEARS = ['2010','2012','2020','2050']
+
+
+def capacity_by_node(df):
+    return df.groupby(['node_id','generator type'])['capacity (MW)'].sum()
+
+
+@pytest.mark.parametrize('aml',[AML.SCIPY,AML.NETWORK])
+def test_pathway(dataset,tmp_path,aml):
+    nodes, gens = make_system()
+    result = match_pathway(nodes,gens,dataset,YEARS,'Mid_Case',['national'],str(tmp_path),aml=aml)
+    assert list(result.columns) == PATHWAY_SUMMARY_COLUMNS
+    assert list(result['scenario_year']) == YEARS
+    assert os.path.exists(os.path.join(str(tmp_path),'pathway_summary.csv'))
+    # without persist_added every year is matched from the original system
+    for year, distance in zip(YEARS,result['distance']):
+        request = Request(nodes,gens,dataset,dataset.get_genmix(year,'Mid_Case',['national']))
+        request.fulfill(aml=aml)
+        assert distance == pytest.approx(request.distance)
+
+
+def test_pathway_persist_added(dataset,tmp_path):
+    nodes, gens = make_system()
+    requests = []
+    original = Request.__init__
+
+    def record(self,*args,**kwargs):
+        original(self,*args,**kwargs)
+        requests.append(self)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(Request,'__init__',record)
+        result = match_pathway(nodes,gens,dataset,YEARS,'Mid_Case',['national'],str(tmp_path),
+                               persist_added=True,aml=AML.SCIPY)
+    assert len(result) == len(YEARS)
+
+    assert requests[0].minimum_capacity is None
+    for previous, request in zip(requests[:-1],requests[1:]):
+        # every year is matched from the original generators
+        pd.testing.assert_series_equal(capacity_by_node(request.generators),capacity_by_node(gens))
+        # what the previous year built is required ...
+        minimum = capacity_by_node(request.minimum_capacity)
+        built = capacity_by_node(new_capacity(previous))
+        assert (minimum.reindex(built.index,fill_value=0.0) >= built - 1.0E-6).all()
+        # ... and kept, as far as the desired capacity of its type allows
+        final = capacity_by_node(request.capacity).reindex(minimum.index,fill_value=0.0)
+        desired = request.summary['Desired Capacity (MW)']
+        required = minimum.groupby(level='generator type').sum()
+        fits = minimum.index.get_level_values('generator type').map(
+            lambda g: required[g] <= round(desired[g]))
+        assert (final[fits] >= minimum[fits] - 1.0E-6).all()
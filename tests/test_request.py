@@ -0,0 +1,138 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sssmatch import AML, SSSMatchError
+from sssmatch.request import GamsModel, Model, ProblemArrays, ScipyModel
+from sssmatch.results import SparseResults
+
+
+def test_scipy_timeout(make_request,tmp_path):
+    request = make_request(num_nodes=200)
+    request.preprocess()
+    with pytest.raises(SSSMatchError,match='did not finish within'):
+        request.fulfill(str(tmp_path),aml=AML.SCIPY,timeout=1e-6)
+
+
+def test_feasibility_report(make_request):
+    request = make_request()
+    request.preprocess()
+    report = request.feasibility_report
+    assert list(report.columns) == request.FEASIBILITY_COLUMNS
+    assert report.index[0] == request.RESOURCE_INDEPENDENT_ROW
+    assert report['Feasible'].all()
+
+    # too little resource-independent capacity
+    request = make_request()
+    indep = request.generators['generator type'].isin(request.RESOURCE_INDEPENDENT)
+    request.generators.loc[indep,'capacity (MW)'] *= 0.01
+    with pytest.raises(SSSMatchError,match=request.RESOURCE_INDEPENDENT_ROW):
+        request.preprocess()
+    assert not request.feasibility_report.loc[request.RESOURCE_INDEPENDENT_ROW,'Feasible']
+    assert request.feasibility_report.loc[request.RESOURCE_INDEPENDENT_ROW,'Shortfall (MW)'] > 0.0
+
+
+def test_presolve(make_request,tmp_path,monkeypatch):
+    request = make_request()
+    request.preprocess()
+    gendists = pd.read_csv(request.DEFAULT_GENTYPE_DISTANCE_FILE)
+    gendists.loc[gendists['g'] == 'Coal','Value'] = 3.0
+    gendists_file = str(tmp_path / 'gendists.csv')
+    gendists.to_csv(gendists_file,index=False)
+
+    request.fulfill(str(tmp_path / 'presolved'),gendists=gendists_file,aml=AML.SCIPY)
+    presolved = request.distance
+    model = ScipyModel(request,str(tmp_path))
+    model.setup(gendists=gendists_file)
+    assert (model.problem.dist[model.swap_g,model.swap_gg] < ProblemArrays.DOMINATED_DISTANCE).all()
+    num_swaps = len(model.swap_n)
+
+    # keeping the dominated swaps grows the model, but does not change the 
+    # optimum
+    monkeypatch.setattr(ProblemArrays,'DOMINATED_DISTANCE',np.inf)
+    model = ScipyModel(request,str(tmp_path))
+    model.setup(gendists=gendists_file)
+    assert len(model.swap_n) > num_swaps
+    request.fulfill(str(tmp_path / 'full'),gendists=gendists_file,aml=AML.SCIPY)
+    assert request.distance == pytest.approx(presolved)
+
+
+def test_result_summary(make_request):
+    request = make_request()
+    request.fulfill(aml=AML.SCIPY)
+    summary = request.result_summary
+    totals = request.capacity.groupby('generator type')['capacity (MW)'].sum()
+    pd.testing.assert_series_equal(summary['final (MW)'].drop('TOTAL').loc[totals.index],totals,
+                                   check_names=False)
+    assert summary['final (MW)'].drop('TOTAL').values == pytest.approx(summary['Desired Capacity (MW)'].drop('TOTAL').round().values,abs=1.0E-6)
+    assert summary.loc['TOTAL'].values == pytest.approx(summary.drop('TOTAL').sum().values)
+
+
+def test_gams_results_node_ids(make_request,tmp_path,monkeypatch):
+    """
+    GamsModel.collect_results maps the UELs in the result gdx file back to 
+    the request's node ids, whatever the UEL order.
+    """
+    request = make_request(int_ids=True)
+    request.fulfill(aml=AML.SCIPY)
+    expected = {name: getattr(request,name).copy() for name in SparseResults.NAMES}
+    distance = request.distance
+
+    model = GamsModel(request,str(tmp_path))
+    Model.setup(model)
+    uels = model.node_labels()[::-1] + list(model.problem.gentypes)
+    variables = {'Capacity': 'capacity','CapacityAdded': 'capacity_added',
+                 'CapacityKept': 'capacity_kept','CapacitySwapped': 'capacity_swapped',
+                 'CapacityRemoved': 'capacity_removed'}
+
+    class FakeGdxReader(object):
+        def __init__(self,filename):
+            self.uels = uels
+        def __enter__(self):
+            return self
+        def __exit__(self,*args):
+            pass
+        def read_scalar_level(self,name):
+            return distance
+        def read_levels(self,name,dims):
+            df = expected[variables[name]]
+            labels = [df.iloc[:,0].astype(str)] + [df.iloc[:,i] for i in range(1,dims)]
+            keys = np.column_stack([pd.Index(uels).get_indexer(l) for l in labels]).reshape(-1,dims)
+            return keys, df.iloc[:,-1].values
+
+    monkeypatch.setattr('sssmatch.gdxio.GdxReader',FakeGdxReader)
+    open(os.path.join(str(tmp_path),'MatchGenerationMix_p.gdx'),'w').close()
+    assert model.collect_results()
+    for name in SparseResults.NAMES:
+        pd.testing.assert_frame_equal(getattr(request,name),expected[name])
+    assert pd.api.types.is_integer_dtype(request.capacity['node_id'])
+
+
+@pytest.mark.parametrize('aml',[AML.GAMS,AML.GAMS_API])
+def test_gams(make_request,tmp_path,aml):
+    pytest.importorskip('gams')
+    request = make_request()
+    request.fulfill(aml=AML.SCIPY)
+    optimum = request.distance
+    request.fulfill(str(tmp_path),aml=aml)
+    assert request.distance == pytest.approx(optimum)
@@ -0,0 +1,60 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+
+import pandas as pd
+import pytest
+
+from sssmatch import AML, OutputFormat
+from sssmatch.request import Request
+from sssmatch.results import RESULT_FILE_EXTENSIONS, SparseResults, load_result_tables
+
+from conftest import make_system
+
+MODULES = {OutputFormat.PARQUET: 'pyarrow',
+           OutputFormat.HDF5: 'tables'}
+
+
+@pytest.fixture(scope='module')
+def match_results(dataset,tmp_path_factory):
+    results = {}
+    mix = dataset.get_genmix('2030','Mid_Case',['national'])
+    for int_ids in [False,True]:
+        nodes, gens = make_system(int_ids=int_ids)
+        request = Request(nodes,gens,dataset,mix)
+        request.preprocess()
+        results[int_ids] = request.fulfill(str(tmp_path_factory.mktemp('match')),aml=AML.SCIPY)
+    return results
+
+
+@pytest.mark.parametrize('output_format',[OutputFormat.PARQUET,OutputFormat.HDF5])
+@pytest.mark.parametrize('int_ids',[False,True])
+def test_save_load(match_results,tmp_path,output_format,int_ids):
+    pytest.importorskip(MODULES[output_format])
+    result = match_results[int_ids]
+    result.save(str(tmp_path),output_format=output_format)
+    filename = os.path.join(str(tmp_path),'results' + RESULT_FILE_EXTENSIONS[output_format])
+    loaded = load_result_tables(filename,output_format)
+    for name in SparseResults.NAMES:
+        expected = getattr(result,name)
+        pd.testing.assert_frame_equal(loaded[name].reset_index(drop=True),expected,check_dtype=False)
+        if len(expected):
+            assert pd.api.types.is_integer_dtype(loaded[name]['node_id']) == int_ids
+    assert loaded['distance'] == pytest.approx(result.distance)
+    pd.testing.assert_frame_equal(loaded['result_summary'],result.result_summary,check_dtype=False)
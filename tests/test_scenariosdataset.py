@@ -0,0 +1,92 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sssparser import SSSParserError
+from sssparser.Regions import REGIONS
+from sssparser.ScenarioFile import ScenarioFile, round_values
+from sssparser.ScenariosDataset import ScenariosDataset
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    reads = []
+    original = ScenarioFile.read
+
+    def read(self,reader=None):
+        reads.append(self.fp)
+        return original(self,reader=reader)
+
+    monkeypatch.setattr(ScenarioFile,'read',read)
+    return reads
+
+
+def test_lazy_loading(small_dataset_dir,count_reads):
+    dataset = ScenariosDataset(small_dataset_dir,use_compiled=False,use_cache=False)
+    assert not count_reads
+    dataset.get_genmix('2030','Central_scenario',['national'])
+    # capacity and generation
+    assert len(count_reads) == 2
+    dataset.get_genmix('2040','Central_scenario',['national'])
+    assert len(count_reads) == 2
+    dataset.get_genmix('2030','Central_scenario',['CO'])
+    assert len(count_reads) == 4
+
+
+def test_metadata(small_dataset_dir,count_reads):
+    dataset = ScenariosDataset(small_dataset_dir,use_compiled=False,use_cache=False)
+    assert sorted(dataset.scenarios) == ['Central_scenario','Low_NG_Price']
+    assert dataset.geographies[0] == 'national'
+    assert 'CO' in dataset.geographies
+    assert '2030' in dataset.years
+    assert 'Coal' in dataset.gentypes
+    reads = len(count_reads)
+    # built once
+    assert dataset.metadata is dataset.metadata
+    dataset.years; dataset.gentypes; dataset.geographies
+    assert len(count_reads) == reads
+
+
+def test_unknown_geography(small_dataset_dir):
+    dataset = ScenariosDataset(small_dataset_dir,use_compiled=False,use_cache=False)
+    with pytest.raises(SSSParserError,match='XX'):
+        dataset.get_genmix('2030','Central_scenario',['CO','XX'])
+
+
+def test_region(small_dataset_dir):
+    dataset = ScenariosDataset(small_dataset_dir,use_compiled=False,use_cache=False)
+    region = dataset.get_genmix('2030','Central_scenario',['WECC'])
+    states = dataset.get_genmix('2030','Central_scenario',REGIONS['WECC'])
+    pd.testing.assert_frame_equal(region,states,check_exact=False)
+
+
+def test_scenario_label(small_dataset_dir):
+    dataset = ScenariosDataset(small_dataset_dir,use_compiled=False,use_cache=False)
+    f = dataset.find_files(scenario_id='Central_scenario')[0]
+    pd.testing.assert_frame_equal(dataset.get_genmix('2030',f.scenario['label'],['national']),
+                                  dataset.get_genmix('2030','Central_scenario',['national']))
+
+
+def test_round_values():
+    values = pd.Series(np.random.default_rng(0).uniform(-100,100,1000).round(6))
+    values = pd.concat([values,pd.Series([0.00005,1.23445,-2.50005,0.12345])],ignore_index=True)
+    expected = [float("{0:.4f}".format(value)) for value in values]
+    assert round_values(values).tolist() == expected
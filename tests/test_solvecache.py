@@ -0,0 +1,82 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import os
+
+import pandas as pd
+
+from sssmatch import AML
+from sssmatch.request import Model, ProblemArrays
+from sssmatch.results import SparseResults
+from sssmatch.solvecache import SolveCache
+
+
+def problem(request,gendists=None,precision=0):
+    return ProblemArrays(request,*Model.problem_inputs(request,gendists,precision))
+
+
+def test_key(make_request):
+    request = make_request()
+    request.preprocess()
+    key = SolveCache.key(problem(request),AML.SCIPY)
+    assert key == SolveCache.key(problem(request),AML.SCIPY)
+    assert key != SolveCache.key(problem(request),AML.NETWORK)
+    assert key != SolveCache.key(problem(request,precision=1),AML.SCIPY)
+    other = make_request(year='2050')
+    other.preprocess()
+    assert key != SolveCache.key(problem(other),AML.SCIPY)
+
+
+def test_fulfill_cached(make_request,tmp_path):
+    cache = SolveCache(cache_dir=str(tmp_path / 'cache'))
+    first = make_request()
+    first.fulfill(str(tmp_path / 'first'),aml=AML.SCIPY,solve_cache=cache)
+    assert not first.solver_statistics['cached']
+    assert len(os.listdir(cache.solves_dir)) == 1
+
+    second = make_request()
+    second.fulfill(str(tmp_path / 'second'),aml=AML.SCIPY,solve_cache=cache)
+    assert second.solver_statistics['cached']
+    # no model files are written on a cache hit
+    assert not os.path.exists(os.path.join(str(tmp_path / 'second'),'match_generators.gms'))
+    assert second.distance == first.distance
+    for name in SparseResults.NAMES:
+        pd.testing.assert_frame_equal(getattr(second,name),getattr(first,name))
+
+
+def test_evict(tmp_path):
+    cache = SolveCache(cache_dir=str(tmp_path),max_entries=2)
+    for i in range(3):
+        cache.put('key{}'.format(i),i)
+        os.utime(os.path.join(cache.solves_dir,'key{}.pkl'.format(i)),(i,i))
+    cache.evict()
+    assert cache.get('key0') is None
+    assert cache.get('key1') == 1
+    assert cache.get('key2') == 2
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert not os.listdir(cache.solves_dir)
+
+
+def test_unreadable_entry(tmp_path):
+    cache = SolveCache(cache_dir=str(tmp_path))
+    with open(os.path.join(cache.solves_dir,'bad.pkl'),'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get('bad') is None
+    assert cache.get('missing') is None
@@ -0,0 +1,66 @@
+# [LICENSE]
+# Copyright (c) 2018 Alliance for Sustainable Energy, LLC. All rights reserved.
+# 
+# NOTICE: This software was developed at least in part by Alliance for Sustainable Energy, LLC ("Alliance") under Contract No. DE-AC36-08GO28308 with the U.S. Department of Energy and the U.S. Government retains for itself and others acting on its behalf a nonexclusive, paid-up, irrevocable worldwide license in the software to reproduce, prepare derivative works, distribute copies to the public, perform publicly and display publicly, and to permit others to do so.
+# 
+# Redistribution and use in source and binary forms, with or without modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice, the above government rights notice, this list of conditions and the following disclaimer in the documentation and/or other materials provided with the distribution.
+# 
+# 3.  Redistribution of this software, without modification, must refer to the software by the same designation. Redistribution of a modified version of this software (i) may not refer to the modified version by the same designation, or by any confusingly similar designation, and (ii) must refer to the underlying software originally provided by Alliance as "sssmatch". Except to comply with the foregoing, the term "sssmatch", or any confusingly similar designation may not be used to refer to any modified version of this software or any modified version of the underlying software originally provided by Alliance without the prior written consent of Alliance.
+# 
+# 4.  The name of the copyright holder, contributors, the United States Government, the United States Department of Energy, or any of their employees may not be used to endorse or promote products derived from this software without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER, CONTRIBUTORS, UNITED STATES GOVERNMENT OR UNITED STATES DEPARTMENT OF ENERGY, NOR ANY OF THEIR EMPLOYEES, BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+# [/LICENSE]
+
+import pandas as pd
+import pytest
+
+from sssparser.ScenariosDataset import ScenariosDataset, SSSParserError
+
+from conftest import dataset_path
+
+
+def timeseries_from_genmix(dataset,scenario_id,geography_ids):
+    data = []
+    for year in dataset.years:
+        mix = dataset.get_genmix(year,scenario_id,geography_ids)
+        mix.index.name = 'gentype'
+        mix = pd.melt(mix.reset_index(),id_vars=['gentype'])
+        mix['dataset'] = dataset.name
+        mix['scenario'] = scenario_id
+        mix['geography'] = ','.join(geography_ids)
+        mix['year'] = int(year)
+        data.append(mix)
+    data = pd.concat(data,ignore_index=True)
+    return data.set_index(['dataset','scenario','geography','year','gentype','variable'])
+
+
+@pytest.mark.parametrize('dataset_year,geography_ids',[
+    (2016,['national']),
+    (2017,['national']),
+    (2018,['national']),
+    (2017,['CO','UT']),
+    (2018,['WECC'])])
+def test_timeseries_matches_genmix(dataset_year,geography_ids,cache_dir):
+    dataset = ScenariosDataset(dataset_path(dataset_year),cache_dir=cache_dir)
+    scenario_id = dataset.scenarios[0]
+    expected = timeseries_from_genmix(dataset,scenario_id,geography_ids)
+    result = dataset.get_timeseries(scenario_id,geography_ids)
+    pd.testing.assert_index_equal(result.index,expected.index)
+    pd.testing.assert_series_equal(result['value'],expected['value'],check_exact=False)
+
+
+def test_timeseries_several_scenarios(dataset):
+    scenario_ids = dataset.scenarios[:2]
+    result = dataset.get_timeseries(scenario_ids,['national'])
+    expected = pd.concat([dataset.get_timeseries(scenario_id,['national']) for scenario_id in scenario_ids])
+    pd.testing.assert_frame_equal(result,expected)
+
+
+def test_unknown_state(dataset):
+    with pytest.raises(SSSParserError):
+        dataset.get_timeseries(dataset.scenarios[0],['XX'])